@@ -1,20 +1,19 @@
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QPushButton,
-    QStatusBar, QMenu, QMessageBox, QHBoxLayout, QSpacerItem, QSizePolicy,
-    QStackedWidget
+    QStatusBar, QMenu, QMessageBox, QHBoxLayout, QSpacerItem, QSizePolicy
 )
-from PyQt6.QtGui import QFont, QAction, QCloseEvent, QPixmap, QShowEvent
+from PyQt6.QtGui import QFont, QAction, QCloseEvent, QShowEvent
 from PyQt6.QtCore import Qt, QPoint
 
 import config #
-from app.src.pages.about_page import AboutDialog #
-from app.src.pages.system_access_dialog import SystemAccessDialog #
-from app.src.pages.camera_settings_dialog import CameraSettingsDialog #
-from app.src.pages.system_settings_dialog import SystemSettingsDialog #
+from app.src.utils.asset_cache import get_asset_cache
+from app.src.utils.startup_profiler import get_startup_profiler
+from app.src.utils.tracing import format_readout, get_tracer
+from app.src.utils.ui_timers import ManagedTimer
+from app.src.widgets.lazy_page_stack import LazyPageStack
 
-from app.src.modes.data_collection_mode import DataCollectionModePage
-from app.src.modes.test_mode import TestModePage
-from app.src.modes.production_mode import ProductionModePage
+# Mode pages and dialogs are imported where they are first built: they pull in
+# NumPy, OpenCV, camera SDKs and model runtimes, none of which the home page needs.
 
 
 class MainWindow(QMainWindow):
@@ -37,16 +36,21 @@ class MainWindow(QMainWindow):
         self.current_operation_mode_id = config.DEFAULT_OPERATION_MODE_ID #
 
         # --- UI Setup ---
-        self._create_menu_bar()
+        self.profiler = get_startup_profiler()
+        with self.profiler.span("MainWindow menu bar"):
+            self._create_menu_bar()
 
-        self.stacked_widget = QStackedWidget()
+        self.stacked_widget = LazyPageStack()
         self.setCentralWidget(self.stacked_widget)
 
-        self._create_home_page()
+        with self.profiler.span("Home page", "page"):
+            self._create_home_page()
         self._create_mode_pages()
 
-        self.statusBar = QStatusBar()
-        self.setStatusBar(self.statusBar)
+        with self.profiler.span("MainWindow status bar"):
+            self.statusBar = QStatusBar()
+            self.setStatusBar(self.statusBar)
+            self._create_latency_readout()
 
         self._update_ui_for_user_level()
         self.center_on_screen()
@@ -66,10 +70,9 @@ class MainWindow(QMainWindow):
 
         self.logo_label = QLabel()
         self.logo_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        pixmap = QPixmap(config.LOGO_PATH) #
+        pixmap = get_asset_cache().pixmap(config.LOGO_PATH, width=400) #
         if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaledToWidth(400, Qt.TransformationMode.SmoothTransformation)
-            self.logo_label.setPixmap(scaled_pixmap)
+            self.logo_label.setPixmap(pixmap)
         else:
             self.logo_label.setText("Logo N/A")
             self.logo_label.setFont(QFont("Arial", 28, QFont.Weight.Bold))
@@ -97,18 +100,35 @@ class MainWindow(QMainWindow):
         self.stacked_widget.addWidget(self.home_page_widget)
 
     def _create_mode_pages(self):
-        self.data_collection_page = DataCollectionModePage(main_window_ref=self) #
-        self.test_page = TestModePage()
-        self.production_page = ProductionModePage()
-
+        # Only placeholders here; each page is built on first navigation.
+        self.data_collection_page = None
+        self.test_page = None
+        self.production_page = None
+        self.stacked_widget.add_lazy_page(self._build_data_collection_page)
+        self.stacked_widget.add_lazy_page(self._build_test_page)
+        self.stacked_widget.add_lazy_page(self._build_production_page)
+
+    def _build_data_collection_page(self):
+        with self.profiler.span("DataCollectionModePage", "page"):
+            from app.src.modes.data_collection_mode import DataCollectionModePage
+            self.data_collection_page = DataCollectionModePage(main_window_ref=self) #
         self.data_collection_page.go_back_signal.connect(self.go_to_home_page)
+        return self.data_collection_page
+
+    def _build_test_page(self):
+        with self.profiler.span("TestModePage", "page"):
+            from app.src.modes.test_mode import TestModePage
+            self.test_page = TestModePage()
         self.test_page.go_back_signal.connect(self.go_to_home_page)
+        return self.test_page
+
+    def _build_production_page(self):
+        with self.profiler.span("ProductionModePage", "page"):
+            from app.src.modes.production_mode import ProductionModePage
+            self.production_page = ProductionModePage(main_window_ref=self)
         self.production_page.go_back_signal.connect(self.go_to_home_page)
+        return self.production_page
 
-        self.stacked_widget.addWidget(self.data_collection_page)
-        self.stacked_widget.addWidget(self.test_page)            
-        self.stacked_widget.addWidget(self.production_page)      
-        
     def _start_automation_task(self):
         if self.current_operation_mode_id == 1: #
             self.stacked_widget.setCurrentIndex(self.DATA_COLLECTION_PAGE_INDEX)
@@ -140,6 +160,21 @@ class MainWindow(QMainWindow):
         if self.statusBar:
              self.statusBar.showMessage(status_text, 0)
 
+    def _create_latency_readout(self):
+        # Live per-stage p50/p99 frame latency, next to the mode/user text.
+        self.tracer = get_tracer()
+        self.latency_label = QLabel()
+        self.latency_label.setFont(QFont("Arial", 10))
+        self.statusBar.addPermanentWidget(self.latency_label)
+        self.latency_timer = ManagedTimer(self.latency_label)
+        self.latency_timer.timeout.connect(self._update_latency_readout)
+        if self.tracer.enabled:
+            self.latency_timer.start(config.TRACING_READOUT_INTERVAL_MS) #
+
+    def _update_latency_readout(self):
+        recent = self.tracer.take_recent()
+        self.latency_label.setText(f"Latency p50/p99 ms: {format_readout(recent)}" if recent else "")
+
     def _update_ui_for_user_level(self):
         access_menu_title = f"Access: {self.current_user_level.capitalize()}"
         self.system_access_menu.setTitle(access_menu_title)
@@ -170,6 +205,10 @@ class MainWindow(QMainWindow):
         self.system_settings_action.setEnabled(can_access_system)
         self.system_settings_action.setToolTip(
             "Configure system parameters" if can_access_system else "Requires Admin access")
+
+        self.classify_archive_action.setEnabled(can_access_camera)
+        self.classify_archive_action.setToolTip(
+            "Classify stored images" if can_access_camera else "Requires Admin or Maintenance access")
             
         self._update_operation_mode_display()
 
@@ -187,6 +226,10 @@ class MainWindow(QMainWindow):
         self.system_settings_action = QAction("System Settings", self)
         self.system_settings_action.triggered.connect(self._open_system_settings_dialog_with_mode_handling)
         self.options_menu.addAction(self.system_settings_action)
+
+        self.classify_archive_action = QAction("Classify Archive...", self)
+        self.classify_archive_action.triggered.connect(self._open_classification_backfill_dialog)
+        self.options_menu.addAction(self.classify_archive_action)
         
         self.help_menu = menu_bar.addMenu("&Help")
         about_action = QAction("&About", self)
@@ -200,6 +243,7 @@ class MainWindow(QMainWindow):
 
     # --- Dialog Handling and Actions ---
     def _show_about_dialog(self):
+        from app.src.pages.about_page import AboutDialog
         dialog = AboutDialog(self) #
         dialog.exec()
 
@@ -208,6 +252,7 @@ class MainWindow(QMainWindow):
              QMessageBox.information(self, "User Level Change", "Please return to the home screen to change user level.")
              return
 
+        from app.src.pages.system_access_dialog import SystemAccessDialog
         dialog = SystemAccessDialog(self) #
         if dialog.exec():
             selected_user_raw = dialog.get_selected_user_level()
@@ -227,9 +272,21 @@ class MainWindow(QMainWindow):
         if self.current_user_level not in [self.ADMIN_LEVEL, self.MAINTENANCE_LEVEL]:
             QMessageBox.warning(self, "Access Denied", "You do not have permission to access Camera Settings.")
             return
+        from app.src.pages.camera_settings_dialog import CameraSettingsDialog
         dialog = CameraSettingsDialog(self) #
         dialog.exec()
 
+    def _open_classification_backfill_dialog(self):
+        if self.stacked_widget.currentIndex() != self.HOME_PAGE_INDEX:
+             QMessageBox.information(self, "Classify Archive", "The archive can only be classified from the home screen.")
+             return
+        if self.current_user_level not in [self.ADMIN_LEVEL, self.MAINTENANCE_LEVEL]:
+            QMessageBox.warning(self, "Access Denied", "You do not have permission to classify the archive.")
+            return
+        from app.src.pages.classification_backfill_dialog import ClassificationBackfillDialog
+        dialog = ClassificationBackfillDialog(self)
+        dialog.exec()
+
     def _open_system_settings_dialog_with_mode_handling(self):
         if self.stacked_widget.currentIndex() != self.HOME_PAGE_INDEX:
              QMessageBox.information(self, "Settings", "System settings can only be accessed from the home screen.")
@@ -238,6 +295,7 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Access Denied", "You do not have permission to access System Settings.")
             return
 
+        from app.src.pages.system_settings_dialog import SystemSettingsDialog
         dialog = SystemSettingsDialog(self, current_mode_id=self.current_operation_mode_id) #
         if dialog.exec():
             new_mode_id = dialog.get_selected_mode_id()
@@ -1,12 +1,15 @@
-import os
 import datetime
-import csv
+import numpy as np
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QSizePolicy, QGridLayout, QFrame)
-from PyQt6.QtGui import QFont, QPixmap, QImage
-from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+                             QSizePolicy, QGridLayout, QFrame, QComboBox, QSpinBox)
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, pyqtSignal
 
 import config #
+from app.src.utils.capture_modes import CaptureController
+from app.src.utils.collection_session import DataCollectionSession
+from app.src.utils.ui_timers import ManagedTimer
+from app.src.widgets.frame_preview import FramePreviewWidget
 
 class DataCollectionModePage(QWidget):
     go_back_signal = pyqtSignal()
@@ -16,25 +19,27 @@ class DataCollectionModePage(QWidget):
         self.main_window_ref = main_window_ref
         self.setObjectName("DataCollectionModePage")
 
-        # --- Session State ---
-        self.session_id = None
-        self.session_start_time = None
-        self.images_captured_count = 0
-        self.session_image_log = []
+        # --- Session State (capture and storage live in DataCollectionSession) ---
+        self.session = DataCollectionSession()
         self.current_user_level = "Unknown"
-        self.camera_active = False # Will be set true when camera is actually started
+
+        # --- Display State ---
+        self._preview_frame = None # Preallocated copy target for the live feed
+        self._captured_frame = None # Preallocated copy of the last captured frame
+        self._last_preview_sequence = -1
+        self._displayed_capture_count = 0
+        self._refusals_seen = 0
 
         # --- UI Elements ---
         self._setup_ui()
 
         # --- Timer for Session Duration Display ---
-        self.session_duration_timer = QTimer(self)
+        self.session_duration_timer = ManagedTimer(self)
         self.session_duration_timer.timeout.connect(self._update_session_duration_display)
 
-        # --- Ensure log directories exist (for offline mode) ---
-        if config.DATA_STORAGE_FLAG == 1: #
-            os.makedirs(config.SESSION_LOGS_PATH, exist_ok=True) #
-            os.makedirs(config.IMAGE_LOGS_PATH, exist_ok=True) #
+        # --- Timer for Live Feed Repaint (consumes newest frame only) ---
+        self.preview_timer = ManagedTimer(self)
+        self.preview_timer.timeout.connect(self._update_live_feed)
 
     def _setup_ui(self):
         main_layout = QHBoxLayout(self)
@@ -44,17 +49,15 @@ class DataCollectionModePage(QWidget):
         # --- Left Panel: Live Feed and Captured Image ---
         left_panel_layout = QVBoxLayout()
         
-        self.live_feed_label = QLabel("Live Feed Area (Camera Off)")
+        self.live_feed_label = FramePreviewWidget("Live Feed Area (Camera Off)")
         self.live_feed_label.setFont(QFont("Arial", 14))
-        self.live_feed_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.live_feed_label.setFrameStyle(QFrame.Shape.Panel | QFrame.Shadow.Sunken)
         self.live_feed_label.setMinimumSize(640, 360) 
         self.live_feed_label.setStyleSheet("background-color: black; color: white;")
         left_panel_layout.addWidget(self.live_feed_label, 1)
 
-        self.captured_image_label = QLabel("Last Captured Image")
+        self.captured_image_label = FramePreviewWidget("Last Captured Image", scaling_mode="smooth")
         self.captured_image_label.setFont(QFont("Arial", 12))
-        self.captured_image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.captured_image_label.setFrameStyle(QFrame.Shape.Panel | QFrame.Shadow.Sunken)
         self.captured_image_label.setMinimumSize(320, 180) 
         self.captured_image_label.setStyleSheet("background-color: #333; color: white;")
@@ -77,6 +80,10 @@ class DataCollectionModePage(QWidget):
         self.session_time_label.setFont(QFont("Arial", 14))
         self.storage_mode_label = QLabel(f"Storage: {'Offline (Local)' if config.DATA_STORAGE_FLAG == 1 else 'Online (Cloud)'}") #
         self.storage_mode_label.setFont(QFont("Arial", 14))
+        self.preview_stats_label = QLabel("Preview: -")
+        self.preview_stats_label.setFont(QFont("Arial", 12))
+        self.writer_status_label = QLabel("Writer Queue: -")
+        self.writer_status_label.setFont(QFont("Arial", 12))
 
         info_grid.addWidget(QLabel("Counter:"), 0, 0)
         info_grid.addWidget(self.image_counter_label, 0, 1)
@@ -84,10 +91,46 @@ class DataCollectionModePage(QWidget):
         info_grid.addWidget(self.session_time_label, 1, 1)
         info_grid.addWidget(QLabel("Mode:"), 2, 0)
         info_grid.addWidget(self.storage_mode_label, 2, 1)
+        info_grid.addWidget(QLabel("Preview:"), 3, 0)
+        info_grid.addWidget(self.preview_stats_label, 3, 1)
+        info_grid.addWidget(QLabel("Saving:"), 4, 0)
+        info_grid.addWidget(self.writer_status_label, 4, 1)
         right_panel_layout.addLayout(info_grid)
         
         right_panel_layout.addStretch(1)
 
+        # --- Capture Mode Controls ---
+        capture_mode_grid = QGridLayout()
+        self.capture_mode_combo = QComboBox()
+        self.capture_mode_combo.setFont(QFont("Arial", 12))
+        self.capture_mode_combo.addItem("Single Image", userData=CaptureController.MODE_IDLE)
+        self.capture_mode_combo.addItem("Burst", userData=CaptureController.MODE_BURST)
+        self.capture_mode_combo.addItem("Continuous", userData=CaptureController.MODE_CONTINUOUS)
+        self.capture_mode_combo.currentIndexChanged.connect(self._on_capture_mode_changed)
+
+        self.burst_count_spinbox = QSpinBox()
+        self.burst_count_spinbox.setRange(1, config.BURST_MAX_FRAMES)
+        self.burst_count_spinbox.setValue(min(config.BURST_DEFAULT_FRAMES, config.BURST_MAX_FRAMES))
+        self.burst_count_spinbox.setSuffix(" frames")
+        self.burst_rate_spinbox = QSpinBox()
+        self.burst_rate_spinbox.setRange(1, max(1, config.CAMERA_FPS))
+        self.burst_rate_spinbox.setValue(min(config.BURST_DEFAULT_RATE_HZ, max(1, config.CAMERA_FPS)))
+        self.burst_rate_spinbox.setSuffix(" fps")
+        self.continuous_every_k_spinbox = QSpinBox()
+        self.continuous_every_k_spinbox.setRange(1, 1000)
+        self.continuous_every_k_spinbox.setValue(config.CONTINUOUS_DEFAULT_EVERY_K)
+        self.continuous_every_k_spinbox.setPrefix("every ")
+        self.continuous_every_k_spinbox.setSuffix(" frames")
+
+        capture_mode_grid.addWidget(QLabel("Capture Mode:"), 0, 0)
+        capture_mode_grid.addWidget(self.capture_mode_combo, 0, 1)
+        capture_mode_grid.addWidget(QLabel("Burst:"), 1, 0)
+        capture_mode_grid.addWidget(self.burst_count_spinbox, 1, 1)
+        capture_mode_grid.addWidget(self.burst_rate_spinbox, 2, 1)
+        capture_mode_grid.addWidget(QLabel("Continuous:"), 3, 0)
+        capture_mode_grid.addWidget(self.continuous_every_k_spinbox, 3, 1)
+        right_panel_layout.addLayout(capture_mode_grid)
+
         self.capture_button = QPushButton("Capture Image")
         self.capture_button.setFont(QFont("Arial", 16, QFont.Weight.Bold))
         self.capture_button.setMinimumHeight(60)
@@ -104,13 +147,35 @@ class DataCollectionModePage(QWidget):
         main_layout.addLayout(left_panel_layout, 2)
         main_layout.addLayout(right_panel_layout, 1)
         self.setLayout(main_layout)
+        self._on_capture_mode_changed()
+
+    def _on_capture_mode_changed(self):
+        mode = self.capture_mode_combo.currentData()
+        self.burst_count_spinbox.setEnabled(mode == CaptureController.MODE_BURST)
+        self.burst_rate_spinbox.setEnabled(mode == CaptureController.MODE_BURST)
+        self.continuous_every_k_spinbox.setEnabled(mode == CaptureController.MODE_CONTINUOUS)
+        self._update_capture_button()
+
+    def _update_capture_button(self):
+        mode = self.capture_mode_combo.currentData()
+        capture_controller = self.session.capture_controller
+        controller_busy = capture_controller is not None and capture_controller.busy
+        if mode == CaptureController.MODE_BURST:
+            if controller_busy:
+                filled, target = capture_controller.burst_progress
+                self.capture_button.setText(f"Burst {filled}/{target}...")
+            else:
+                self.capture_button.setText("Capture Burst")
+        elif mode == CaptureController.MODE_CONTINUOUS:
+            self.capture_button.setText("Stop Continuous" if controller_busy else "Start Continuous")
+        else:
+            self.capture_button.setText("Capture Image")
+        self.capture_mode_combo.setEnabled(not controller_busy)
 
     # --- Session Management ---
     def start_session(self):
-        self.session_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.session_start_time = datetime.datetime.now()
-        self.images_captured_count = 0
-        self.session_image_log = []
+        self._displayed_capture_count = 0
+        self._refusals_seen = 0
         if self.main_window_ref:
             self.current_user_level = self.main_window_ref.current_user_level.capitalize()
         else:
@@ -120,174 +185,160 @@ class DataCollectionModePage(QWidget):
         self.session_time_label.setText("Session Time: 0s")
         self.captured_image_label.setText("Last Captured Image")
         self.live_feed_label.setText("Initializing Camera...")
-        
-        print(f"Session {self.session_id} started. User: {self.current_user_level}")
-        print(f"Attempting to use Camera Config: W:{config.CAMERA_RESOLUTION_WIDTH}, H:{config.CAMERA_RESOLUTION_HEIGHT}, FPS:{config.CAMERA_FPS}, RotationOpt:{config.CAMERA_ROTATION_OPTION}") #
-
-        # --- TODO: Implement Actual Camera Initialization Here ---
-        # Example:
-        # try:
-        #     self.camera = initialize_realsense_camera(config.CAMERA_RESOLUTION_WIDTH, ...)
-        #     self.camera_active = True
-        #     self.live_feed_label.setText("Camera Active")
-        #     self.capture_button.setEnabled(True)
-        #     # Start a thread or QTimer to fetch frames and update self.live_feed_label
-        # except Exception as e:
-        #     self.live_feed_label.setText(f"Failed to start camera: {e}")
-        #     self.camera_active = False
-        #     self.capture_button.setEnabled(False)
-        
-        # For now, simulate camera becoming active for UI testing:
-        self.camera_active = True # Assume camera started successfully for now
-        self.live_feed_label.setText("Camera Feed (Implement Update)")
+
+        if not self.session.start(self.current_user_level):
+            self.live_feed_label.setText(f"Failed to start camera: {self.session.camera_error}")
+            self.capture_button.setEnabled(False)
+            return
+
+        frame_shape = self.session.ring_buffer.frame_shape
+        if self._preview_frame is None or self._preview_frame.shape != frame_shape:
+            self._preview_frame = np.empty(frame_shape, dtype=np.uint8)
+            self._captured_frame = np.empty(frame_shape, dtype=np.uint8)
+        self._last_preview_sequence = -1
+        self.preview_timer.start(config.PREVIEW_REFRESH_INTERVAL_MS)
+        self.live_feed_label.setText("Camera Active")
         self.capture_button.setEnabled(True)
+        self._update_capture_button()
+        self._update_writer_status_display()
+        self.session_duration_timer.start(1000) # Update duration every second
 
-        if self.camera_active:
-            if not self.session_duration_timer.isActive():
-                self.session_duration_timer.start(1000) # Update duration every second
-        print("Data collection session started.")
+    # --- Frame Display ---
+    def _update_live_feed(self):
+        if not self.session.camera_active:
+            return
+        frame_info = self.session.ring_buffer.copy_latest_into(self._preview_frame, newer_than=self._last_preview_sequence)
+        if frame_info is None:
+            if self.session.source_exhausted:
+                self.preview_timer.stop()
+                self.live_feed_label.setText("Frame source finished")
+            return
+        self._last_preview_sequence = frame_info[0]
+        self.live_feed_label.set_frame(self._preview_frame)
+        self._refresh_capture_progress()
 
     def _update_session_duration_display(self):
-        if self.session_start_time and self.camera_active: # Only update if session is ongoing
-            duration = datetime.datetime.now() - self.session_start_time
+        if self.session.session_start_time and self.session.camera_active: # Only update if session is ongoing
+            duration = datetime.datetime.now() - self.session.session_start_time
             self.session_time_label.setText(f"Session Time: {int(duration.total_seconds())}s")
+            self._update_writer_status_display()
+            preview_stats = self.live_feed_label.stats()
+            self.preview_stats_label.setText(f"{preview_stats['preview_fps']:.0f} fps, {preview_stats['preview_gui_ms_per_frame']:.1f} ms/frame")
 
     # --- Image Handling ---
     def _capture_image(self):
-        if not self.camera_active or not self.session_id:
+        if not self.session.camera_active or not self.session.session_id:
             # This case should ideally be prevented by disabling the capture button
             print("Capture attempt failed: Camera not active or session not started.")
             return
 
-        self.images_captured_count += 1
-        capture_time = datetime.datetime.now()
-        image_filename_base = f"session_{self.session_id}_img_{self.images_captured_count:04d}"
-        
-        # --- TODO: Implement Actual Image Capture from Camera Frame Here ---
-        # Example:
-        # captured_frame_data = self.camera.get_current_frame_for_saving() # Your method
-        # if captured_frame_data is None:
-        #     print("Failed to capture frame.")
-        #     return
-        
-        # --- TODO: Implement Display of Captured Image ---
-        # Example:
-        # q_image = QImage(captured_frame_data, width, height, QImage.Format...)
-        # pixmap = QPixmap.fromImage(q_image)
-        # self.captured_image_label.setPixmap(pixmap.scaled(
-        #     self.captured_image_label.width(), self.captured_image_label.height(),
-        #     Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        # ))
-        self.captured_image_label.setText(f"Captured: {image_filename_base}.png\n(Display Not Implemented)")
-        
-        image_path_or_link = "" # Will be the actual path or cloud link
-
-        if config.DATA_STORAGE_FLAG == 1: # Offline
-            image_filename = f"{image_filename_base}.png"
-            image_full_path = os.path.join(config.IMAGE_LOGS_PATH, image_filename) #
-            
-            # --- TODO: Implement Actual Image Saving to File ---
-            # Example using OpenCV (cv2):
-            # import cv2
-            # cv2.imwrite(image_full_path, captured_frame_data) 
-            print(f"Image would be saved to: {image_full_path}")
-            image_path_or_link = image_full_path
-        else: # Online
-            # --- TODO: Implement Upload to Google Drive ---
-            # This would involve Google Drive API calls
-            print(f"Image {image_filename_base} would be prepared for Google Drive upload.")
-            image_path_or_link = f"gdrive_placeholder_link_for_{image_filename_base}"
-
-        self.session_image_log.append({
-            "filename": image_filename_base + (".png" if config.DATA_STORAGE_FLAG == 1 else ""),
-            "path_or_link": image_path_or_link,
-            "timestamp": capture_time.isoformat(),
-            "classification_placeholder": "N/A", # To be filled later
-            "classification_log_link_placeholder": "N/A" # To be filled later
-        })
+        capture_controller = self.session.capture_controller
+        mode = self.capture_mode_combo.currentData()
+        if mode == CaptureController.MODE_BURST:
+            if capture_controller.arm_burst(self.burst_count_spinbox.value(), self.burst_rate_spinbox.value()):
+                print(f"Burst armed: {self.burst_count_spinbox.value()} frames at {self.burst_rate_spinbox.value()} fps.")
+            self._update_capture_button()
+            return
+        if mode == CaptureController.MODE_CONTINUOUS:
+            if capture_controller.busy:
+                capture_controller.disarm()
+                print("Continuous capture stopped.")
+            elif capture_controller.arm_continuous(self.continuous_every_k_spinbox.value()):
+                print(f"Continuous capture started: every {self.continuous_every_k_spinbox.value()} frames.")
+            self._update_capture_button()
+            return
+
+        frame_info = self.session.ring_buffer.copy_latest_into(self._captured_frame)
+        if frame_info is None:
+            print("Failed to capture frame: no frame acquired yet.")
+            return
+        sequence, acquired_at = frame_info
+        stored = self.session.store_frame(self._captured_frame, sequence, acquired_at)
+        if stored is None:
+            print("Capture skipped: near-duplicate of a recent image.")
+            self.writer_status_label.setText("Duplicate skipped")
+            return
+        if not stored:
+            print(f"Capture refused: image writer queue full ({self.session.image_writer.queue_size} pending).")
+            self._update_writer_status_display()
+            return
+
+        self.captured_image_label.set_frame(self._captured_frame)
+        self._displayed_capture_count = self.session.images_captured_count
         self._update_image_counter_display()
-        print(f"Image {self.images_captured_count} captured and logged.")
+        self._update_writer_status_display()
+        print(f"Image {self.session.images_captured_count} captured and logged.")
+
+    def _refresh_capture_progress(self):
+        # Burst/continuous captures happen off the GUI thread; reflect them here.
+        # The panel shows the frame that was actually stored, looked up by its
+        # sequence; once the ring has overwritten it there is nothing to show.
+        if self.session.images_captured_count != self._displayed_capture_count:
+            sequence = self.session.last_stored_sequence
+            if sequence is not None and self.session.ring_buffer.copy_sequence_into(self._captured_frame, sequence) is not None:
+                self.captured_image_label.set_frame(self._captured_frame)
+            else:
+                self.captured_image_label.setText("Last Captured Image")
+            self._displayed_capture_count = self.session.images_captured_count
+            self._update_image_counter_display()
+        if self.session.capture_controller is not None and self.capture_mode_combo.currentData() != CaptureController.MODE_IDLE:
+            self._update_capture_button()
+
+    def _update_writer_status_display(self):
+        image_writer = self.session.image_writer
+        if image_writer is None:
+            self.writer_status_label.setText("Writer Queue: -")
+            return
+        text = f"Writer Queue: {image_writer.in_flight}/{image_writer.queue_size}"
+        refused = image_writer.refused > self._refusals_seen
+        self._refusals_seen = image_writer.refused
+        if refused:
+            self.writer_status_label.setText(f"{text} - FULL, capture refused")
+            self.writer_status_label.setStyleSheet("color: red; font-weight: bold;")
+        else:
+            self.writer_status_label.setText(text)
+            self.writer_status_label.setStyleSheet("")
 
     def _update_image_counter_display(self):
-        self.image_counter_label.setText(f"Images Captured: {self.images_captured_count}")
+        self.image_counter_label.setText(f"Images Captured: {self.session.images_captured_count}")
+
+    def _stop_camera(self):
+        self.preview_timer.stop()
+        self.session_duration_timer.stop()
+        self.capture_button.setEnabled(False)
+        self.session.stop_acquisition()
 
     def _end_session(self):
-        if not self.session_start_time:
+        if not self.session.session_start_time:
             self.go_back_signal.emit()
             return
-            
-        self.camera_active = False
-        self.capture_button.setEnabled(False)
-        if self.session_duration_timer.isActive():
-            self.session_duration_timer.stop()
-        
-        # --- TODO: Implement Actual Camera Shutdown/Release Here ---
-        # Example:
-        # if hasattr(self, 'camera') and self.camera:
-        #     self.camera.release() # Or your camera object's equivalent
+
+        self._stop_camera()
+        self.live_feed_label.clear()
         self.live_feed_label.setText("Camera Off")
-        print("Camera resources released (implementation pending).")
-
-        session_end_time = datetime.datetime.now()
-        total_session_time_delta = session_end_time - self.session_start_time
-        total_session_time_seconds = int(total_session_time_delta.total_seconds())
-
-        session_summary = {
-            "session_id": self.session_id,
-            "mode": "Data Collection",
-            "permission_level": self.current_user_level,
-            "start_time": self.session_start_time.isoformat(),
-            "end_time": session_end_time.isoformat(),
-            "total_duration_seconds": total_session_time_seconds,
-            "images_captured": self.images_captured_count,
-            "data_storage_mode": "Offline" if config.DATA_STORAGE_FLAG == 1 else "Online", #
-            "images_details_count": len(self.session_image_log)
-        }
-        print(f"Session {self.session_id} ended. Duration: {total_session_time_seconds}s. Images: {self.images_captured_count}.")
-
-        if config.DATA_STORAGE_FLAG == 1: # Offline - Save to CSV
-            session_log_filename = os.path.join(config.SESSION_LOGS_PATH, f"summary_{self.session_id}.csv") #
-            image_details_log_filename = os.path.join(config.SESSION_LOGS_PATH, f"images_{self.session_id}.csv") #
-
-            try:
-                with open(session_log_filename, 'w', newline='') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(session_summary.keys())
-                    writer.writerow(session_summary.values())
-                print(f"Session summary saved to: {session_log_filename}")
-
-                if self.session_image_log:
-                    with open(image_details_log_filename, 'w', newline='') as f:
-                        fieldnames = self.session_image_log[0].keys()
-                        writer = csv.DictWriter(f, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(self.session_image_log)
-                    print(f"Image details saved to: {image_details_log_filename}")
-            except IOError as e:
-                print(f"Error writing local log files: {e}")
-        else: # Online
-            # --- TODO: Implement Saving session_summary to SQL Database ---
-            print("Session summary (and image details) would be saved to online SQL database.")
-        
-        self.session_start_time = None 
+        self.session.end()
+        self._update_writer_status_display()
         self.go_back_signal.emit()
 
     # --- Qt Event Handlers ---
+    # Only navigation (and the window closing) starts and stops the camera.
+    # Minimizing and restoring the window send spontaneous events; the session
+    # keeps running and the preview timers suspend on their own.
     def showEvent(self, event):
         super().showEvent(event)
-        self.start_session()
+        if not event.spontaneous():
+            self.start_session()
 
     def hideEvent(self, event):
         super().hideEvent(event)
+        if event.spontaneous():
+            return
         # If the page is hidden and a session was active, ensure it's properly ended.
         # This might happen if user navigates away by means other than "End Session" button
         # (e.g. closing window, though main_window's closeEvent should handle that).
-        if self.session_start_time and self.camera_active: # Check if session was actually running
+        if self.session.session_start_time and self.session.camera_active: # Check if session was actually running
             print("DataCollectionModePage hidden during active session. Consider auto-ending or prompting.")
             # For now, we'll rely on the explicit "End Session" button.
             # You might want to stop the camera here regardless.
-            self.camera_active = False # Mark as inactive
-            self.capture_button.setEnabled(False)
-            if self.session_duration_timer.isActive():
-                self.session_duration_timer.stop()
-            # self._end_session() # Potentially auto-end, but could lead to data loss if not intended.
\ No newline at end of file
+            self._stop_camera()
+            # self._end_session() # Potentially auto-end, but could lead to data loss if not intended.
@@ -1,39 +1,196 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QSizePolicy
+import numpy as np
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy,
+                             QGridLayout, QFrame)
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, pyqtSignal
 
+import config #
+from app.src.utils.production_run import ProductionRun
+from app.src.utils.ui_timers import ManagedTimer
+from app.src.widgets.frame_preview import FramePreviewWidget
+
 class ProductionModePage(QWidget):
     go_back_signal = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, main_window_ref=None, parent=None):
         super().__init__(parent)
+        self.main_window_ref = main_window_ref
+
+        # --- Production Run State (pipeline lives in ProductionRun) ---
+        self.run = ProductionRun()
+        self._preview_frame = None
+        self._last_preview_sequence = -1
+
+        self._setup_ui()
+
+        # --- Timers: live feed repaint and pipeline statistics ---
+        self.preview_timer = ManagedTimer(self)
+        self.preview_timer.timeout.connect(self._update_live_feed)
+        self.stats_timer = ManagedTimer(self)
+        self.stats_timer.timeout.connect(self._update_stats_display)
+
+    def _setup_ui(self):
+        main_layout = QHBoxLayout(self)
+        main_layout.setContentsMargins(10, 10, 10, 10)
+        main_layout.setSpacing(10)
 
-        layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(20)
+        self.live_feed_label = FramePreviewWidget("Line Camera (Stopped)")
+        self.live_feed_label.setFont(QFont("Arial", 14))
+        self.live_feed_label.setFrameStyle(QFrame.Shape.Panel | QFrame.Shadow.Sunken)
+        self.live_feed_label.setMinimumSize(640, 360)
+        self.live_feed_label.setStyleSheet("background-color: black; color: white;")
+        main_layout.addWidget(self.live_feed_label, 1)
+
+        right_panel_layout = QVBoxLayout()
+        right_panel_layout.setSpacing(15)
 
         title_label = QLabel("Production Mode")
-        title_font = QFont("Arial", 28, QFont.Weight.Bold)
+        title_font = QFont("Arial", 22, QFont.Weight.Bold)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        right_panel_layout.addWidget(title_label)
+
+        self.decision_label = QLabel("-")
+        self.decision_label.setFont(QFont("Arial", 28, QFont.Weight.Bold))
+        self.decision_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        right_panel_layout.addWidget(self.decision_label)
+
+        info_grid = QGridLayout()
+        self.throughput_label = QLabel("-")
+        self.throughput_label.setFont(QFont("Arial", 14))
+        self.latency_label = QLabel("-")
+        self.latency_label.setFont(QFont("Arial", 14))
+        self.processed_label = QLabel("-")
+        self.processed_label.setFont(QFont("Arial", 12))
+        self.dropped_label = QLabel("-")
+        self.dropped_label.setFont(QFont("Arial", 12))
+        self.dropped_label.setWordWrap(True)
+        self.model_label = QLabel("-")
+        self.model_label.setFont(QFont("Arial", 12))
+        self.batching_label = QLabel("-")
+        self.batching_label.setFont(QFont("Arial", 12))
+        self.load_label = QLabel("-")
+        self.load_label.setFont(QFont("Arial", 12))
+        self.load_label.setWordWrap(True)
+
+        info_grid.addWidget(QLabel("Throughput:"), 0, 0)
+        info_grid.addWidget(self.throughput_label, 0, 1)
+        info_grid.addWidget(QLabel("Latency:"), 1, 0)
+        info_grid.addWidget(self.latency_label, 1, 1)
+        info_grid.addWidget(QLabel("Decisions:"), 2, 0)
+        info_grid.addWidget(self.processed_label, 2, 1)
+        info_grid.addWidget(QLabel("Dropped:"), 3, 0)
+        info_grid.addWidget(self.dropped_label, 3, 1)
+        info_grid.addWidget(QLabel("Model:"), 4, 0)
+        info_grid.addWidget(self.model_label, 4, 1)
+        info_grid.addWidget(QLabel("Batching:"), 5, 0)
+        info_grid.addWidget(self.batching_label, 5, 1)
+        info_grid.addWidget(QLabel("Load:"), 6, 0)
+        info_grid.addWidget(self.load_label, 6, 1)
+        right_panel_layout.addLayout(info_grid)
+
+        right_panel_layout.addStretch(1)
 
-        placeholder_label = QLabel("This is the placeholder for the main Production Mode interface.")
-        placeholder_font = QFont("Arial", 16)
-        placeholder_label.setFont(placeholder_font)
-        placeholder_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.run_button = QPushButton("Start Line")
+        self.run_button.setFont(QFont("Arial", 16, QFont.Weight.Bold))
+        self.run_button.setMinimumHeight(60)
+        self.run_button.clicked.connect(self._toggle_run)
+        right_panel_layout.addWidget(self.run_button)
 
         self.back_button = QPushButton("Back to Home")
         self.back_button.setFont(QFont("Arial", 12))
         self.back_button.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
         self.back_button.setMinimumWidth(200)
-        self.back_button.clicked.connect(self.go_back_signal.emit)
+        self.back_button.clicked.connect(self._stop_and_go_back)
+        right_panel_layout.addWidget(self.back_button, 0, Qt.AlignmentFlag.AlignCenter)
+
+        main_layout.addLayout(right_panel_layout, 0)
+        self.setLayout(main_layout)
+
+    # --- Production Run Management ---
+    def _toggle_run(self):
+        if not self.run.running:
+            self.start_run()
+        else:
+            self.stop_run()
+
+    def start_run(self):
+        if self.run.running:
+            return
+        permission_level = self.main_window_ref.current_user_level.capitalize() if self.main_window_ref else "N/A"
+        try:
+            self.run.start(permission_level)
+        except Exception as e:
+            self.live_feed_label.setText(f"Failed to start camera: {e}")
+            return
+        frame_shape = self.run.ring_buffer.frame_shape
+        if self._preview_frame is None or self._preview_frame.shape != frame_shape:
+            self._preview_frame = np.empty(frame_shape, dtype=np.uint8)
+        self._last_preview_sequence = -1
+
+        self.model_label.setText(self.run.model_name)
+        self.live_feed_label.setText("Camera Active")
+        self.run_button.setText("Stop Line")
+        self.preview_timer.start(config.PREVIEW_REFRESH_INTERVAL_MS)
+        self.stats_timer.start(config.PRODUCTION_STATS_REFRESH_MS)
+
+    def stop_run(self):
+        if not self.run.running:
+            return
+        self.preview_timer.stop()
+        self.stats_timer.stop()
+        self._update_stats_display()
+        self.run.stop()
+
+        self.live_feed_label.clear()
+        self.live_feed_label.setText("Line Camera (Stopped)")
+        self.run_button.setText("Start Line")
+
+    def _stop_and_go_back(self):
+        self.stop_run()
+        self.go_back_signal.emit()
+
+    # --- Display Updates ---
+    def _update_live_feed(self):
+        frame_info = self.run.ring_buffer.copy_latest_into(self._preview_frame, newer_than=self._last_preview_sequence)
+        if frame_info is None:
+            return
+        self._last_preview_sequence = frame_info[0]
+        self.live_feed_label.set_frame(self._preview_frame)
+
+    def _update_stats_display(self):
+        stats = self.run.pipeline_stats()
+        self.throughput_label.setText(f"{stats['throughput_fps']:.1f} frames/s")
+        self.latency_label.setText(f"p50 {stats['latency_p50_ms']:.1f} ms, p95 {stats['latency_p95_ms']:.1f} ms")
+        decisions = ", ".join(f"{label}: {count}" for label, count in sorted(stats["decisions"].items()))
+        self.processed_label.setText(f"{stats['frames_completed']} ({decisions})" if decisions else "0")
+        drops = ", ".join(f"{reason} {count}" for reason, count in sorted(stats["drops"].items()))
+        self.dropped_label.setText(f"{stats['frames_dropped']} of {stats['frames_in']}" + (f" ({drops})" if drops else ""))
+        if self.run.process_pool is not None:
+            pool_stats = self.run.model_stats()
+            self.batching_label.setText(f"{pool_stats['pool_workers_alive']}/{pool_stats['pool_workers']} workers, "
+                                        f"task p95 {pool_stats['pool_task_p95_ms']:.1f} ms, restarts {pool_stats['pool_worker_restarts']}")
+        else:
+            batch_stats = self.run.model_stats()
+            self.batching_label.setText(f"mean {batch_stats['batch_mean_size']:.1f} of max {batch_stats['batch_max_size']}, "
+                                        f"wait {batch_stats['batch_mean_wait_ms']:.1f} ms (max {batch_stats['batch_max_wait_ms']} ms)")
+        governor = self.run.governor
+        if governor is not None:
+            self.load_label.setText(governor.describe() + (f" ({governor.last_reason})" if governor.last_reason else ""))
+        if stats["last_decision"]:
+            self.decision_label.setText(stats["last_decision"].upper())
+            self.decision_label.setStyleSheet("color: red;" if stats["last_decision"] == "cut" else "color: green;")
 
-        layout.addStretch(1)
-        layout.addWidget(title_label)
-        layout.addWidget(placeholder_label)
-        layout.addStretch(1)
-        layout.addWidget(self.back_button, 0, Qt.AlignmentFlag.AlignCenter)
-        layout.addStretch(0)
+    # --- Qt Event Handlers ---
+    # The run follows navigation to and from this page (and the window
+    # closing). Minimizing and restoring the window send spontaneous events,
+    # which leave the line running; the preview timers suspend on their own.
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not event.spontaneous():
+            self.start_run()
 
-        self.setLayout(layout)
\ No newline at end of file
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if not event.spontaneous():
+            self.stop_run()
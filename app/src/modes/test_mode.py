@@ -1,39 +1,184 @@
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton, QSizePolicy
+import os
+import threading
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSizePolicy,
+                             QGridLayout, QComboBox, QCheckBox, QPlainTextEdit)
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt, pyqtSignal
 
+import config #
+from app.src.utils.frame_sources import list_recorded_sessions
+from app.src.utils.replay_benchmark import (ReplayBenchmark, compare_runs, format_comparison, format_run,
+                                            list_runs, load_run)
+from app.src.utils.ui_timers import ManagedTimer
+
 class TestModePage(QWidget):
     go_back_signal = pyqtSignal()
 
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        # --- Benchmark State ---
+        self.benchmark = None
+        self._benchmark_thread = None
+        self._benchmark_result = None
+        self._benchmark_error = None
+        self._last_run_path = None
+
         layout = QVBoxLayout(self)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(20)
+        layout.setSpacing(15)
 
         title_label = QLabel("Test Mode")
         title_font = QFont("Arial", 28, QFont.Weight.Bold)
         title_label.setFont(title_font)
         title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title_label)
+
+        subtitle_label = QLabel("Replay a recorded session through capture, inference and storage.")
+        subtitle_label.setFont(QFont("Arial", 14))
+        subtitle_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(subtitle_label)
+
+        # --- Benchmark Controls ---
+        controls_grid = QGridLayout()
+        self.session_combo = QComboBox()
+        self.session_combo.setFont(QFont("Arial", 12))
+        self.speed_combo = QComboBox()
+        self.speed_combo.setFont(QFont("Arial", 12))
+        self.speed_combo.addItem("Original speed", userData=True)
+        self.speed_combo.addItem("As fast as possible", userData=False)
+        self.storage_checkbox = QCheckBox("Include image storage")
+        self.storage_checkbox.setChecked(True)
+        self.baseline_combo = QComboBox()
+        self.baseline_combo.setFont(QFont("Arial", 12))
 
-        placeholder_label = QLabel("This is the placeholder for Test Mode features and diagnostics.")
-        placeholder_font = QFont("Arial", 16)
-        placeholder_label.setFont(placeholder_font)
-        placeholder_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        controls_grid.addWidget(QLabel("Recorded Session:"), 0, 0)
+        controls_grid.addWidget(self.session_combo, 0, 1)
+        controls_grid.addWidget(QLabel("Replay Speed:"), 1, 0)
+        controls_grid.addWidget(self.speed_combo, 1, 1)
+        controls_grid.addWidget(self.storage_checkbox, 2, 1)
+        controls_grid.addWidget(QLabel("Compare With:"), 3, 0)
+        controls_grid.addWidget(self.baseline_combo, 3, 1)
+        layout.addLayout(controls_grid)
+
+        buttons_layout = QHBoxLayout()
+        self.run_button = QPushButton("Run Benchmark")
+        self.run_button.setFont(QFont("Arial", 14, QFont.Weight.Bold))
+        self.run_button.setMinimumHeight(45)
+        self.run_button.clicked.connect(self._toggle_benchmark)
+        self.compare_button = QPushButton("Compare")
+        self.compare_button.setFont(QFont("Arial", 14))
+        self.compare_button.setMinimumHeight(45)
+        self.compare_button.clicked.connect(self._compare_with_baseline)
+        buttons_layout.addWidget(self.run_button)
+        buttons_layout.addWidget(self.compare_button)
+        layout.addLayout(buttons_layout)
+
+        self.status_label = QLabel("Idle")
+        self.status_label.setFont(QFont("Arial", 12))
+        layout.addWidget(self.status_label)
+
+        self.results_view = QPlainTextEdit()
+        self.results_view.setReadOnly(True)
+        self.results_view.setFont(QFont("Courier New", 11))
+        layout.addWidget(self.results_view, 1)
 
         self.back_button = QPushButton("Back to Home")
         self.back_button.setFont(QFont("Arial", 12))
         self.back_button.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Fixed)
         self.back_button.setMinimumWidth(200)
-        self.back_button.clicked.connect(self.go_back_signal.emit)
-
-        layout.addStretch(1)
-        layout.addWidget(title_label)
-        layout.addWidget(placeholder_label)
-        layout.addStretch(1)
+        self.back_button.clicked.connect(self._cancel_and_go_back)
         layout.addWidget(self.back_button, 0, Qt.AlignmentFlag.AlignCenter)
-        layout.addStretch(0)
 
-        self.setLayout(layout)
\ No newline at end of file
+        self.setLayout(layout)
+
+        # --- Timer polling the background benchmark ---
+        self.progress_timer = ManagedTimer(self)
+        self.progress_timer.timeout.connect(self._check_benchmark)
+
+    # --- Session and Run Lists ---
+    def _refresh_lists(self):
+        current_session = self.session_combo.currentData()
+        self.session_combo.clear()
+        for session_id in reversed(list_recorded_sessions()):
+            self.session_combo.addItem(session_id, userData=session_id)
+        if current_session is not None and self.session_combo.findData(current_session) >= 0:
+            self.session_combo.setCurrentIndex(self.session_combo.findData(current_session))
+        self.run_button.setEnabled(self.session_combo.count() > 0 or self.benchmark is not None)
+        if self.session_combo.count() == 0:
+            self.status_label.setText(f"No recorded sessions in {config.IMAGE_LOGS_PATH}") #
+
+        self.baseline_combo.clear()
+        for path in reversed(list_runs()):
+            self.baseline_combo.addItem(os.path.basename(path), userData=path)
+        self.compare_button.setEnabled(self.baseline_combo.count() > 0)
+
+    # --- Benchmark Execution ---
+    def _toggle_benchmark(self):
+        if self.benchmark is not None:
+            self.benchmark.cancel()
+            self.status_label.setText("Cancelling...")
+            return
+        self.benchmark = ReplayBenchmark(self.session_combo.currentData(), realtime=self.speed_combo.currentData(),
+                                         include_storage=self.storage_checkbox.isChecked())
+        self._benchmark_result = None
+        self._benchmark_error = None
+        self._benchmark_thread = threading.Thread(target=self._run_benchmark, args=(self.benchmark,),
+                                                  name="ReplayBenchmark", daemon=True)
+        self._benchmark_thread.start()
+        self.run_button.setText("Cancel")
+        self.status_label.setText("Starting...")
+        self.progress_timer.start(250)
+
+    def _run_benchmark(self, benchmark):
+        # Runs on the benchmark thread; results are picked up by _check_benchmark.
+        try:
+            run = benchmark.run()
+            self._last_run_path = benchmark.save_run(run)
+            self._benchmark_result = run
+        except Exception as e:
+            self._benchmark_error = e
+
+    def _check_benchmark(self):
+        acquired, total = self.benchmark.progress
+        if self._benchmark_thread.is_alive():
+            if total:
+                self.status_label.setText(f"Replaying: {acquired}/{total} frames")
+            return
+        self.progress_timer.stop()
+        self.benchmark = None
+        self.run_button.setText("Run Benchmark")
+        if self._benchmark_error is not None:
+            self.status_label.setText(f"Benchmark failed: {self._benchmark_error}")
+            return
+        self.status_label.setText(f"Saved {os.path.basename(self._last_run_path)}")
+        self.results_view.setPlainText(format_run(self._benchmark_result))
+        self._refresh_lists()
+        if self.baseline_combo.count() > 1:
+            self.baseline_combo.setCurrentIndex(1) # Previous run, for a quick before/after
+
+    def _compare_with_baseline(self):
+        baseline_path = self.baseline_combo.currentData()
+        candidate_path = self._last_run_path or (list_runs() or [None])[-1]
+        if not baseline_path or not candidate_path:
+            return
+        baseline, candidate = load_run(baseline_path), load_run(candidate_path)
+        rows = compare_runs(baseline, candidate)
+        regressions = sum(1 for row in rows if row["regression"])
+        differing = [key for key in ("session_id", "realtime", "include_storage", "classifier")
+                     if baseline["settings"].get(key) != candidate["settings"].get(key)]
+        note = f"Note: runs differ in {', '.join(differing)}\n\n" if differing else ""
+        self.results_view.setPlainText(
+            f"Baseline:  {os.path.basename(baseline_path)}\nCandidate: {os.path.basename(candidate_path)}\n\n"
+            + note + format_comparison(rows)
+            + f"\n\n{regressions} regression(s) beyond {config.BENCHMARK_REGRESSION_TOLERANCE_PERCENT}%") #
+
+    def _cancel_and_go_back(self):
+        if self.benchmark is not None:
+            self.benchmark.cancel()
+        self.go_back_signal.emit()
+
+    # --- Qt Event Handlers ---
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._refresh_lists()
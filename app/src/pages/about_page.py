@@ -1,10 +1,11 @@
 from PyQt6.QtWidgets import (
     QDialog, QLabel, QVBoxLayout, QDialogButtonBox, QTextBrowser, QFrame
 )
-from PyQt6.QtGui import QFont, QPixmap
+from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt
 
 import config 
+from app.src.utils.asset_cache import get_asset_cache
 
 class AboutDialog(QDialog):
     def __init__(self, parent=None):
@@ -20,9 +21,9 @@ class AboutDialog(QDialog):
 
         # --- Logo ---
         logo_label = QLabel(self)
-        pixmap = QPixmap(config.LOGO_PATH)
+        pixmap = get_asset_cache().pixmap(config.LOGO_PATH, width=200)
         if not pixmap.isNull():
-            logo_label.setPixmap(pixmap.scaledToWidth(200, Qt.TransformationMode.SmoothTransformation))
+            logo_label.setPixmap(pixmap)
         else:
             logo_label.setText("Logo N/A")
         logo_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
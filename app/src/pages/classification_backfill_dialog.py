@@ -0,0 +1,99 @@
+from PyQt6.QtWidgets import QDialog, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QProgressBar, QCheckBox
+from PyQt6.QtCore import Qt
+
+from app.src.utils.offline_classification import ClassificationBackfill
+from app.src.utils.ui_timers import ManagedTimer
+
+
+class ClassificationBackfillDialog(QDialog):
+    # Front end for ClassificationBackfill: starts a back-fill of every
+    # session's unclassified images and polls its progress. Closing the
+    # dialog stops the run after its in-flight batches; a later run resumes.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Classify Archive")
+        self.setMinimumSize(460, 240)
+        self.backfill = None
+
+        layout = QVBoxLayout(self)
+
+        title_label = QLabel("Classify Stored Images")
+        title_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        font = title_label.font()
+        font.setPointSize(16)
+        font.setBold(True)
+        title_label.setFont(font)
+        layout.addWidget(title_label)
+
+        description_label = QLabel("Classifies every stored image that has no classification yet, or whose file "
+                                   "changed since it was classified, using all processor cores.")
+        description_label.setWordWrap(True)
+        layout.addWidget(description_label)
+
+        self.force_checkbox = QCheckBox("Reclassify all images")
+        layout.addWidget(self.force_checkbox)
+
+        self.progress_bar = QProgressBar()
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("Not started.")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        layout.addStretch(1)
+
+        button_layout = QHBoxLayout()
+        self.start_button = QPushButton("Start")
+        self.start_button.clicked.connect(self._start)
+        button_layout.addWidget(self.start_button)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self._stop)
+        button_layout.addWidget(self.stop_button)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.reject)
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.progress_timer = ManagedTimer(self)
+        self.progress_timer.timeout.connect(self._update_progress)
+
+    def _start(self):
+        self.backfill = ClassificationBackfill(force=self.force_checkbox.isChecked()).start()
+        self.start_button.setEnabled(False)
+        self.force_checkbox.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.status_label.setText("Finding images to classify...")
+        self.progress_timer.start(500)
+
+    def _stop(self):
+        if self.backfill is not None:
+            self.backfill.stop()
+            self.stop_button.setEnabled(False)
+            self.status_label.setText("Stopping after the batches in progress...")
+
+    def _update_progress(self):
+        backfill = self.backfill
+        self.progress_bar.setMaximum(max(backfill.total, 1))
+        self.progress_bar.setValue(backfill.done if backfill.total else 0)
+        if backfill.running:
+            if backfill.total:
+                eta = backfill.eta_seconds()
+                self.status_label.setText(f"{backfill.done} of {backfill.total} images, "
+                                          f"{backfill.images_per_second():.1f} images/s"
+                                          + (f", about {eta / 60.0:.0f} min left" if eta is not None else ""))
+            return
+        self.progress_timer.stop()
+        self.start_button.setEnabled(True)
+        self.force_checkbox.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        if backfill.error is not None:
+            self.status_label.setText(f"Failed: {backfill.error}")
+        else:
+            self.status_label.setText(f"Classified {backfill.classified} image(s), {backfill.failed} failed, "
+                                      f"{backfill.skipped} unchanged.")
+
+    def reject(self):
+        self._stop()
+        self.progress_timer.stop()
+        super().reject()
@@ -0,0 +1,154 @@
+import threading
+import time
+
+from app.src.utils.tracing import get_tracer
+
+
+class FrameAcquisitionWorker(threading.Thread):
+    # Pulls frames from a FrameSource into a FrameRingBuffer on its own thread,
+    # so a slow or blocking camera read can never stall the Qt event loop.
+    # Reads are paced at `fps` (0 leaves pacing to the source / runs flat out).
+    # Every committed frame is stamped with a sequence number and a monotonic
+    # acquisition time, then passed to frame_listeners(frame, sequence, timestamp)
+    # on this thread; listeners must be quick and copy what they keep.
+    # set_listener_fps() caps the rate frames reach the listeners (e.g. under
+    # load) while the ring buffer, and so the live preview, still gets all.
+    # With a depth_buffer, the source's depth frame is read after each color
+    # frame and committed to it first, so both rings hold the same sequence
+    # numbers and listeners can look the depth up by sequence.
+    # The source is released once the worker has stopped reading from it: by
+    # the worker thread as it exits, or by stop() if the thread never ran.
+
+    def __init__(self, source, ring_buffer, fps=None, depth_buffer=None):
+        super().__init__(name="FrameAcquisitionWorker", daemon=True)
+        self.source = source
+        self.ring_buffer = ring_buffer
+        self.depth_buffer = depth_buffer
+        self.fps = source.acquisition_fps if fps is None else fps
+        self.read_failures = 0
+        self.last_error = None
+        self.frame_listeners = []
+        self.tracer = get_tracer()
+        self.frames_decimated = 0
+        self._delivery_interval = 0.0
+        self._next_delivery = 0.0
+        # Inter-frame interval statistics (Welford running mean/variance)
+        self._last_frame_time = None
+        self._interval_count = 0
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+        self._interval_max = 0.0
+        self._stop_event = threading.Event()
+        self._release_lock = threading.Lock()
+        self._source_released = False
+        source.wait = self._stop_event.wait # Self-paced sources wake up on stop()
+
+    def run(self):
+        try:
+            self._acquire_frames()
+        finally:
+            self._release_source()
+
+    def _acquire_frames(self):
+        period = 1.0 / self.fps if self.fps and self.fps > 0 else 0.0
+        next_deadline = time.monotonic()
+        while not self._stop_event.is_set():
+            slot = self.ring_buffer.begin_write()
+            depth_slot = self.depth_buffer.begin_write() if self.depth_buffer is not None else None
+            read_started = time.monotonic()
+            try:
+                ok = self.source.read_into(slot) and (depth_slot is None or self.source.read_depth_into(depth_slot))
+            except Exception as e:
+                ok = False
+                self.last_error = e
+            acquired_at = time.monotonic()
+            if ok:
+                if depth_slot is not None:
+                    self.depth_buffer.commit(acquired_at)
+                sequence = self.ring_buffer.commit(acquired_at)
+                self.tracer.record("acquire", (acquired_at - read_started) * 1000.0)
+                self._record_interval(acquired_at)
+                if self._due_for_listeners(acquired_at):
+                    for listener in self.frame_listeners:
+                        try:
+                            listener(slot, sequence, acquired_at)
+                        except Exception as e:
+                            self.last_error = e
+            else:
+                self.ring_buffer.abort_write()
+                if depth_slot is not None:
+                    self.depth_buffer.abort_write()
+                if self.source.finished or self._stop_event.is_set():
+                    break
+                self.read_failures += 1
+                if not period:
+                    self._stop_event.wait(0.005) # Don't spin on a failing source
+
+            if period:
+                next_deadline += period
+                delay = next_deadline - time.monotonic()
+                if delay > 0:
+                    self._stop_event.wait(delay)
+                else:
+                    # Fell behind (slow camera read); resync instead of bursting.
+                    next_deadline = time.monotonic()
+
+    def set_listener_fps(self, fps):
+        # 0 passes every frame to the listeners.
+        self._delivery_interval = 1.0 / fps if fps else 0.0
+
+    def _due_for_listeners(self, acquired_at):
+        interval = self._delivery_interval
+        if not interval:
+            return True
+        # A quarter-interval tolerance absorbs source jitter, so e.g. 15 fps out
+        # of a 30 fps camera is every other frame rather than every third.
+        if acquired_at < self._next_delivery - interval * 0.25:
+            self.frames_decimated += 1
+            return False
+        self._next_delivery = max(self._next_delivery, acquired_at) + interval
+        return True
+
+    def _record_interval(self, acquired_at):
+        if self._last_frame_time is not None:
+            interval = acquired_at - self._last_frame_time
+            self._interval_count += 1
+            delta = interval - self._interval_mean
+            self._interval_mean += delta / self._interval_count
+            self._interval_m2 += delta * (interval - self._interval_mean)
+            self._interval_max = max(self._interval_max, interval)
+        self._last_frame_time = acquired_at
+
+    def interval_stats(self):
+        variance = self._interval_m2 / (self._interval_count - 1) if self._interval_count > 1 else 0.0
+        return {
+            "frame_interval_mean_ms": round(self._interval_mean * 1000.0, 3),
+            "frame_interval_jitter_ms": round(variance ** 0.5 * 1000.0, 3),
+            "frame_interval_max_ms": round(self._interval_max * 1000.0, 3),
+        }
+
+    @property
+    def source_exhausted(self):
+        return not self.is_alive() and self.source.finished
+
+    def _release_source(self):
+        with self._release_lock:
+            if self._source_released:
+                return
+            self._source_released = True
+        try:
+            self.source.release()
+        except Exception as e:
+            print(f"Warning: Error releasing frame source: {e}")
+
+    def stop(self, timeout=2.0):
+        # Returns False if the thread is still stuck in a read after `timeout`;
+        # it then releases the source itself when that read returns.
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+            if self.is_alive():
+                print(f"Warning: Frame acquisition did not stop within {timeout:.1f}s; the source is released when its read returns.")
+                return False
+        self._release_source()
+        return True
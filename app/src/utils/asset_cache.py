@@ -0,0 +1,131 @@
+import hashlib
+import os
+import threading
+
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from PyQt6.QtCore import Qt
+
+import config
+
+_resolved_paths = {}
+_resolved_paths_lock = threading.Lock()
+
+
+def resolve_asset_path(path):
+    # `path` as it exists on disk, matching each missing component
+    # case-insensitively (assets named on Windows, e.g. Mwlogo.png for
+    # MwLogo.png, still load on Linux). None when there is no match.
+    with _resolved_paths_lock:
+        if path in _resolved_paths:
+            return _resolved_paths[path]
+    resolved = os.path.abspath(path)
+    if not os.path.exists(resolved):
+        missing = []
+        existing = resolved
+        while not os.path.exists(existing):
+            existing, component = os.path.split(existing)
+            missing.append(component)
+        resolved = existing
+        for component in reversed(missing):
+            try:
+                matches = [name for name in os.listdir(resolved) if name.lower() == component.lower()]
+            except OSError:
+                matches = []
+            if not matches:
+                resolved = None
+                break
+            resolved = os.path.join(resolved, sorted(matches)[0])
+        if resolved is not None:
+            print(f"Note: Asset {path} resolved case-insensitively to {resolved}")
+    with _resolved_paths_lock:
+        _resolved_paths[path] = resolved
+    return resolved
+
+
+class AssetCache:
+    # Decoded, scaled static images (logo etc.), shared by every widget that
+    # shows them. pixmap() keys each variant by resolved path, source mtime
+    # and size, target size and transformation mode, and keeps it in Qt's
+    # process-wide QPixmapCache (an LRU bounded by ASSET_PIXMAP_CACHE_KB).
+    # Scaled variants are also saved as PNGs under ASSET_DISK_CACHE_PATH, so
+    # a later launch loads the small pre-scaled image instead of decoding
+    # and smooth-scaling the original again. GUI thread only, as QPixmap is.
+
+    def __init__(self, disk_cache_dir=None):
+        if disk_cache_dir is None and config.ASSET_DISK_CACHE_ENABLED:
+            disk_cache_dir = config.ASSET_DISK_CACHE_PATH
+        self.disk_cache_dir = disk_cache_dir
+        if QPixmapCache.cacheLimit() < config.ASSET_PIXMAP_CACHE_KB:
+            QPixmapCache.setCacheLimit(config.ASSET_PIXMAP_CACHE_KB)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def pixmap(self, path, width=None, height=None, transform=Qt.TransformationMode.SmoothTransformation):
+        # The image at `path`, scaled to fit width x height keeping its aspect
+        # ratio (or to width / height alone). A null QPixmap if it is missing.
+        resolved = resolve_asset_path(path)
+        if resolved is None:
+            return QPixmap()
+        try:
+            stat = os.stat(resolved)
+        except OSError:
+            return QPixmap()
+        key = f"asset|{resolved}|{stat.st_mtime_ns}|{stat.st_size}|{width}x{height}|{transform.value}"
+        pixmap = QPixmapCache.find(key)
+        if pixmap is not None and not pixmap.isNull():
+            self.memory_hits += 1
+            return pixmap
+
+        pixmap = self._load(resolved, key, width, height, transform)
+        if not pixmap.isNull():
+            QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    def _load(self, resolved, key, width, height, transform):
+        scaled = width is not None or height is not None
+        disk_path = None
+        if scaled and self.disk_cache_dir:
+            disk_path = os.path.join(self.disk_cache_dir, hashlib.sha1(key.encode()).hexdigest() + ".png")
+            if os.path.exists(disk_path):
+                pixmap = QPixmap(disk_path)
+                if not pixmap.isNull():
+                    self.disk_hits += 1
+                    return pixmap
+
+        self.misses += 1
+        pixmap = QPixmap(resolved)
+        if pixmap.isNull() or not scaled:
+            return pixmap
+        if width is not None and height is not None:
+            pixmap = pixmap.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, transform)
+        elif width is not None:
+            pixmap = pixmap.scaledToWidth(width, transform)
+        else:
+            pixmap = pixmap.scaledToHeight(height, transform)
+
+        if disk_path is not None:
+            try:
+                os.makedirs(self.disk_cache_dir, exist_ok=True)
+                temp_path = f"{disk_path}.tmp"
+                if pixmap.save(temp_path, "PNG"):
+                    os.replace(temp_path, disk_path)
+            except OSError as e:
+                print(f"Warning: Could not save scaled asset to {disk_path}: {e}")
+        return pixmap
+
+    def stats(self):
+        return {"asset_memory_hits": self.memory_hits, "asset_disk_hits": self.disk_hits, "asset_misses": self.misses}
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_asset_cache():
+    # Process-wide asset cache shared by the splash, main window and dialogs.
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = AssetCache()
+        return _shared_cache
@@ -0,0 +1,163 @@
+import threading
+
+import numpy as np
+
+import config
+
+
+class CaptureController:
+    # Burst and continuous capture driven from the acquisition thread.
+    # on_frame() is registered as a FrameAcquisitionWorker listener and sees
+    # every acquired frame with its sequence number and monotonic timestamp.
+    #   burst:      `count` frames spaced at `rate_hz`, copied into a
+    #               preallocated burst buffer, then handed to store_frame on a
+    #               helper thread (blocking, so no burst frame is lost)
+    #   continuous: every k-th frame while armed, handed straight to
+    #               store_frame without blocking; refusals count as skipped
+    # store_frame(frame, sequence, timestamp, block, depth=None) is supplied by
+    # the owner and must be thread-safe. It returns True when stored, False
+    # when refused and None when it deliberately dropped the frame (e.g. a
+    # duplicate). With a depth_buffer (see set_depth_buffer), burst frames
+    # keep a copy of their depth frame too, since by the time the burst is
+    # flushed the depth ring has moved on.
+
+    MODE_IDLE = "idle"
+    MODE_BURST = "burst"
+    MODE_CONTINUOUS = "continuous"
+
+    def __init__(self, frame_shape, store_frame, burst_capacity=None):
+        self.store_frame = store_frame
+        self.frame_shape = tuple(frame_shape)
+        self.burst_capacity = burst_capacity or config.BURST_MAX_FRAMES
+        self._burst_frames = np.empty((self.burst_capacity,) + tuple(frame_shape), dtype=np.uint8)
+        self._burst_sequence = np.zeros(self.burst_capacity, dtype=np.int64)
+        self._burst_timestamps = np.zeros(self.burst_capacity, dtype=np.float64)
+        self._lock = threading.Lock()
+        self.mode = self.MODE_IDLE
+        self._flush_thread = None
+        self.depth_buffer = None
+        self._burst_depth = None
+        self._burst_has_depth = np.zeros(self.burst_capacity, dtype=bool)
+
+        self._burst_target = 0
+        self._burst_filled = 0
+        self._burst_period = 0.0
+        self._burst_next_due = None
+        self._every_k = 1
+        self._continuous_start_sequence = 0
+
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.bursts_completed = 0
+        self.continuous_stored = 0
+        self.continuous_skipped = 0
+
+    def set_depth_buffer(self, depth_buffer):
+        # Called between sessions; None stops keeping depth with burst frames.
+        with self._lock:
+            self.depth_buffer = depth_buffer
+            if depth_buffer is not None and (self._burst_depth is None or
+                                             self._burst_depth.shape[1:] != depth_buffer.frame_shape):
+                self._burst_depth = np.empty((self.burst_capacity,) + depth_buffer.frame_shape, dtype=np.uint16)
+
+    @property
+    def busy(self):
+        return self.mode != self.MODE_IDLE
+
+    @property
+    def burst_progress(self):
+        return self._burst_filled, self._burst_target
+
+    # --- Arming (GUI thread) ---
+    def arm_burst(self, count, rate_hz):
+        with self._lock:
+            if self.busy:
+                return False
+            self._burst_target = max(1, min(int(count), self.burst_capacity))
+            self._burst_filled = 0
+            self._burst_period = 1.0 / rate_hz if rate_hz > 0 else 0.0
+            self._burst_next_due = None
+            self.mode = self.MODE_BURST
+            return True
+
+    def arm_continuous(self, every_k):
+        with self._lock:
+            if self.busy:
+                return False
+            self._every_k = max(1, int(every_k))
+            self._continuous_start_sequence = None
+            self.mode = self.MODE_CONTINUOUS
+            return True
+
+    def disarm(self):
+        with self._lock:
+            if self.mode == self.MODE_CONTINUOUS:
+                self.mode = self.MODE_IDLE
+            elif self.mode == self.MODE_BURST and self._flush_thread is None:
+                if self._burst_filled == 0:
+                    self.mode = self.MODE_IDLE
+                    return
+                # Keep whatever part of the burst was already collected.
+                self._burst_target = self._burst_filled
+                self._start_burst_flush()
+
+    def wait_idle(self, timeout=None):
+        flush_thread = self._flush_thread
+        if flush_thread is not None:
+            flush_thread.join(timeout)
+
+    # --- Acquisition Thread ---
+    def on_frame(self, frame, sequence, timestamp):
+        mode = self.mode
+        if mode == self.MODE_BURST:
+            with self._lock:
+                if self.mode != self.MODE_BURST or self._flush_thread is not None:
+                    return
+                if self._burst_next_due is not None and timestamp < self._burst_next_due:
+                    return
+                index = self._burst_filled
+                np.copyto(self._burst_frames[index], frame)
+                self._burst_sequence[index] = sequence
+                self._burst_timestamps[index] = timestamp
+                self._burst_has_depth[index] = (self.depth_buffer is not None and
+                                                self.depth_buffer.copy_sequence_into(self._burst_depth[index], sequence) is not None)
+                self._burst_filled += 1
+                if self._burst_next_due is None or timestamp - self._burst_next_due > self._burst_period:
+                    self._burst_next_due = timestamp # Resync after a gap instead of catching up
+                self._burst_next_due += self._burst_period
+                if self._burst_filled >= self._burst_target:
+                    self._start_burst_flush()
+        elif mode == self.MODE_CONTINUOUS:
+            if self._continuous_start_sequence is None:
+                self._continuous_start_sequence = sequence
+            if (sequence - self._continuous_start_sequence) % self._every_k:
+                return
+            stored = self.store_frame(frame, sequence, timestamp, False)
+            if stored:
+                self.continuous_stored += 1
+            elif stored is False:
+                self.continuous_skipped += 1
+
+    # --- Burst Hand-off ---
+    def _start_burst_flush(self):
+        # Called with self._lock held.
+        self._flush_thread = threading.Thread(target=self._flush_burst, name="BurstFlush", daemon=True)
+        self._flush_thread.start()
+
+    def _flush_burst(self):
+        for index in range(self._burst_target):
+            self.store_frame(self._burst_frames[index], int(self._burst_sequence[index]),
+                             float(self._burst_timestamps[index]), True,
+                             depth=self._burst_depth[index] if self._burst_has_depth[index] else None)
+        with self._lock:
+            self.bursts_completed += 1
+            self._flush_thread = None
+            self.mode = self.MODE_IDLE
+
+    def stats(self):
+        return {
+            "bursts_completed": self.bursts_completed,
+            "continuous_frames_stored": self.continuous_stored,
+            "continuous_frames_skipped": self.continuous_skipped,
+        }
@@ -0,0 +1,393 @@
+import argparse
+import csv
+import datetime
+import glob
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+import config
+
+SESSION_COLUMNS = [
+    "session_id", "mode", "permission_level", "start_time", "end_time",
+    "total_duration_seconds", "images_captured", "data_storage_mode", "recovered", "summary_json",
+]
+IMAGE_COLUMNS = [
+    "session_id", "filename", "path_or_link", "timestamp", "frame_sequence", "acquired_monotonic_s",
+    "file_size_bytes", "classification", "classification_log_link",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    mode TEXT,
+    permission_level TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    total_duration_seconds INTEGER,
+    images_captured INTEGER,
+    data_storage_mode TEXT,
+    recovered INTEGER DEFAULT 0,
+    summary_json TEXT
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    path_or_link TEXT,
+    timestamp TEXT,
+    frame_sequence INTEGER,
+    acquired_monotonic_s REAL,
+    file_size_bytes INTEGER,
+    classification TEXT,
+    classification_log_link TEXT,
+    UNIQUE (session_id, filename)
+);
+CREATE TABLE IF NOT EXISTS imported_logs (
+    path TEXT PRIMARY KEY,
+    mtime REAL
+);
+CREATE TABLE IF NOT EXISTS classified_images (
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime REAL,
+    file_size_bytes INTEGER,
+    score REAL,
+    model TEXT,
+    classified_at TEXT,
+    log_synced INTEGER DEFAULT 0,
+    PRIMARY KEY (session_id, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON sessions (start_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_permission_start ON sessions (permission_level, start_time);
+CREATE INDEX IF NOT EXISTS idx_images_session ON images (session_id);
+CREATE INDEX IF NOT EXISTS idx_images_timestamp ON images (timestamp);
+CREATE INDEX IF NOT EXISTS idx_images_classification ON images (classification);
+"""
+
+
+def _blank_to_none(value):
+    return None if value in ("", "N/A") else value
+
+
+def image_row_from_log_entry(session_id, entry):
+    return (
+        session_id,
+        entry["filename"],
+        entry.get("path_or_link") or None,
+        entry.get("timestamp"),
+        _blank_to_none(entry.get("frame_sequence")),
+        _blank_to_none(entry.get("acquired_monotonic_s")),
+        _blank_to_none(entry.get("file_size_bytes")),
+        _blank_to_none(entry.get("classification_placeholder")),
+        _blank_to_none(entry.get("classification_log_link_placeholder")),
+    )
+
+
+def session_row_from_summary(summary):
+    return (
+        summary["session_id"],
+        summary.get("mode"),
+        summary.get("permission_level"),
+        summary.get("start_time"),
+        summary.get("end_time"),
+        _blank_to_none(summary.get("total_duration_seconds")),
+        _blank_to_none(summary.get("images_captured")),
+        summary.get("data_storage_mode"),
+        1 if str(summary.get("recovered", "")).lower() in ("1", "true") else 0,
+        json.dumps(summary, default=str),
+    )
+
+
+class SessionCatalog:
+    # Local SQLite index of every session and image, shared by the UI and
+    # tooling. WAL mode lets readers query while captures are being recorded.
+    # Image rows are buffered and inserted in batches (CATALOG_BATCH_SIZE rows
+    # or every CATALOG_FLUSH_INTERVAL_S) on a background thread.
+
+    def __init__(self, path=None, batch_size=None, flush_interval_s=None):
+        self.path = path or config.CATALOG_DB_PATH
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.created = not os.path.exists(self.path) # First run: existing CSV logs still need importing
+        self.batch_size = batch_size or config.CATALOG_BATCH_SIZE
+        self.flush_interval_s = flush_interval_s or config.CATALOG_FLUSH_INTERVAL_S
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self._pending_images = []
+        self._batch_ready = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="CatalogFlush", daemon=True)
+        self._flusher.start()
+
+    # --- Writes ---
+    def add_image(self, session_id, log_entry):
+        with self._lock:
+            self._pending_images.append(image_row_from_log_entry(session_id, log_entry))
+            if len(self._pending_images) >= self.batch_size:
+                self._batch_ready.set()
+
+    def upsert_session(self, summary):
+        with self._lock:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+                session_row_from_summary(summary))
+            self._flush_locked()
+
+    def update_image_link(self, session_id, filename, path_or_link):
+        # Back-fills the final location of an image, e.g. once its upload lands.
+        with self._lock:
+            self._flush_locked()
+            self._connection.execute(
+                "UPDATE images SET path_or_link = ? WHERE session_id = ? AND filename = ?",
+                (path_or_link, session_id, filename))
+            self._connection.commit()
+
+    def set_image_classifications(self, session_id, classifications):
+        # classifications: iterable of (filename, classification, classification_log_link).
+        with self._lock:
+            self._flush_locked()
+            self._connection.executemany(
+                "UPDATE images SET classification = ?, classification_log_link = ? WHERE session_id = ? AND filename = ?",
+                ((classification, log_link, session_id, filename) for filename, classification, log_link in classifications))
+            self._connection.commit()
+
+    def record_classifications(self, session_id, results, model, log_link=None):
+        # results: iterable of (filename, classification, score, mtime, file_size_bytes).
+        # Besides the label, keeps the file's mtime and size at the time it was
+        # classified, so back-fills can skip images that have not changed
+        # (classification_fingerprints) and images_<id>.csv can be brought up
+        # to date later (unsynced_log_sessions / mark_logs_synced).
+        results = list(results)
+        classified_at = datetime.datetime.now().isoformat()
+        with self._lock:
+            self._flush_locked()
+            self._connection.executemany(
+                "UPDATE images SET classification = ?, classification_log_link = ? WHERE session_id = ? AND filename = ?",
+                ((classification, log_link, session_id, filename) for filename, classification, _, _, _ in results))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO classified_images (session_id, filename, mtime, file_size_bytes, score, model, "
+                "classified_at, log_synced) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                ((session_id, filename, mtime, size, score, model, classified_at)
+                 for filename, _, score, mtime, size in results))
+            self._connection.commit()
+
+    def classification_fingerprints(self, session_id=None):
+        # {(session_id, filename): (mtime, file_size_bytes)} of classified images.
+        sql, params = "SELECT session_id, filename, mtime, file_size_bytes FROM classified_images", ()
+        if session_id:
+            sql, params = sql + " WHERE session_id = ?", (session_id,)
+        return {(row["session_id"], row["filename"]): (row["mtime"], row["file_size_bytes"])
+                for row in self._query(sql, params)}
+
+    def unsynced_log_sessions(self):
+        return [row["session_id"] for row in self._query(
+            "SELECT DISTINCT session_id FROM classified_images WHERE log_synced = 0", ())]
+
+    def mark_logs_synced(self, session_id, classified_before):
+        # Only rows already classified when the log was rewritten count as synced.
+        with self._lock:
+            self._connection.execute(
+                "UPDATE classified_images SET log_synced = 1 WHERE session_id = ? AND classified_at <= ?",
+                (session_id, _as_iso(classified_before)))
+            self._connection.commit()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._pending_images:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO images ({', '.join(IMAGE_COLUMNS)}) VALUES ({', '.join('?' * len(IMAGE_COLUMNS))})",
+                self._pending_images)
+            self._pending_images = []
+        self._connection.commit()
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._batch_ready.wait(self.flush_interval_s)
+            self._batch_ready.clear()
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Warning: Catalog flush failed: {e}")
+
+    def close(self):
+        self._closed = True
+        self._batch_ready.set()
+        self._flusher.join()
+        with self._lock:
+            self._flush_locked()
+            self._connection.close()
+
+    # --- CSV Import ---
+    def import_csv_logs(self, session_logs_dir=None, session_ids=None):
+        # Imports summary_*.csv / images_*.csv written before the catalog
+        # existed. Files already imported (same mtime) are skipped, so this
+        # is cheap to re-run. Returns the number of sessions imported.
+        session_logs_dir = session_logs_dir or config.SESSION_LOGS_PATH
+        if session_ids is None:
+            summary_paths = sorted(glob.glob(os.path.join(session_logs_dir, "summary_*.csv")))
+        else:
+            summary_paths = [os.path.join(session_logs_dir, f"summary_{session_id}.csv") for session_id in session_ids]
+
+        imported = 0
+        with self._lock:
+            already_imported = dict(self._connection.execute("SELECT path, mtime FROM imported_logs").fetchall())
+            for summary_path in summary_paths:
+                if not os.path.exists(summary_path):
+                    continue
+                mtime = os.path.getmtime(summary_path)
+                if already_imported.get(summary_path) == mtime:
+                    continue
+                with open(summary_path, newline='') as f:
+                    summaries = list(csv.DictReader(f))
+                if not summaries:
+                    continue
+                summary = summaries[0]
+                session_id = summary["session_id"]
+                self._connection.execute(
+                    f"INSERT OR REPLACE INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' * len(SESSION_COLUMNS))})",
+                    session_row_from_summary(summary))
+
+                images_path = os.path.join(session_logs_dir, f"images_{session_id}.csv")
+                if os.path.exists(images_path):
+                    with open(images_path, newline='') as f:
+                        self._connection.executemany(
+                            f"INSERT OR REPLACE INTO images ({', '.join(IMAGE_COLUMNS)}) VALUES ({', '.join('?' * len(IMAGE_COLUMNS))})",
+                            (image_row_from_log_entry(session_id, row) for row in csv.DictReader(f)))
+                self._connection.execute("INSERT OR REPLACE INTO imported_logs (path, mtime) VALUES (?, ?)", (summary_path, mtime))
+                imported += 1
+            self._connection.commit()
+        return imported
+
+    # --- Queries ---
+    def _query(self, sql, params):
+        with self._lock:
+            self._flush_locked()
+            return [dict(row) for row in self._connection.execute(sql, params).fetchall()]
+
+    def find_sessions(self, permission_level=None, mode=None, since=None, until=None, limit=None):
+        clauses, params = [], []
+        if permission_level:
+            clauses.append("permission_level = ?")
+            params.append(permission_level)
+        if mode:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if since:
+            clauses.append("start_time >= ?")
+            params.append(_as_iso(since))
+        if until:
+            clauses.append("start_time < ?")
+            params.append(_as_iso(until))
+        sql = "SELECT * FROM sessions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY start_time DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def find_images(self, session_id=None, permission_level=None, since=None, until=None,
+                    classification=None, unclassified=False, limit=None):
+        clauses, params = [], []
+        if session_id:
+            clauses.append("images.session_id = ?")
+            params.append(session_id)
+        if permission_level:
+            clauses.append("sessions.permission_level = ?")
+            params.append(permission_level)
+        if since:
+            clauses.append("images.timestamp >= ?")
+            params.append(_as_iso(since))
+        if until:
+            clauses.append("images.timestamp < ?")
+            params.append(_as_iso(until))
+        if classification:
+            clauses.append("images.classification = ?")
+            params.append(classification)
+        if unclassified:
+            clauses.append("images.classification IS NULL")
+        sql = ("SELECT images.*, sessions.permission_level, sessions.mode FROM images "
+               "LEFT JOIN sessions ON sessions.session_id = images.session_id")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY images.timestamp"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._query(sql, params)
+
+    def count_images(self, session_id=None):
+        if session_id:
+            return self._query("SELECT COUNT(*) AS n FROM images WHERE session_id = ?", (session_id,))[0]["n"]
+        return self._query("SELECT COUNT(*) AS n FROM images", ())[0]["n"]
+
+
+def _as_iso(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+_shared_catalog = None
+_shared_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    # Process-wide catalog instance shared by pages and tooling.
+    global _shared_catalog
+    with _shared_catalog_lock:
+        if _shared_catalog is None:
+            _shared_catalog = SessionCatalog()
+        return _shared_catalog
+
+
+# --- Command Line Tooling ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or populate the local session/image catalog.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("import", help="Import existing summary_*.csv / images_*.csv logs")
+    sessions_parser = subparsers.add_parser("sessions", help="List sessions")
+    images_parser = subparsers.add_parser("images", help="List images")
+    for sub in (sessions_parser, images_parser):
+        sub.add_argument("--user", help="Permission level, e.g. Maintenance")
+        sub.add_argument("--since", help="ISO date/time (inclusive)")
+        sub.add_argument("--until", help="ISO date/time (exclusive)")
+        sub.add_argument("--days", type=int, help="Shortcut for --since N days ago")
+        sub.add_argument("--limit", type=int)
+    images_parser.add_argument("--session")
+    images_parser.add_argument("--classification")
+    args = parser.parse_args(argv)
+
+    catalog = SessionCatalog()
+    try:
+        if args.command == "import":
+            print(f"Imported {catalog.import_csv_logs()} session(s) into {catalog.path}")
+            return 0
+        since = args.since
+        if args.days:
+            since = datetime.datetime.now() - datetime.timedelta(days=args.days)
+        if args.command == "sessions":
+            rows = catalog.find_sessions(permission_level=args.user, since=since, until=args.until, limit=args.limit)
+            columns = SESSION_COLUMNS[:-1]
+        else:
+            rows = catalog.find_images(session_id=args.session, permission_level=args.user, since=since,
+                                       until=args.until, classification=args.classification, limit=args.limit)
+            columns = IMAGE_COLUMNS + ["permission_level"]
+        writer = csv.DictWriter(sys.stdout, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        return 0
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,72 @@
+import os
+import time
+
+import cv2
+import numpy as np
+
+import config
+from app.src.utils.preprocess import preprocessor_for
+
+
+class PlaceholderClassifier:
+    # Stand-in until the trained rib-cut model ships. Scores each input from
+    # its mean brightness so decisions vary with the scene, and optionally
+    # sleeps to mimic the real model's cost (a fixed per-call overhead plus a
+    # per-frame cost), so pipeline timing behaves realistically.
+
+    name = "placeholder"
+
+    def __init__(self, call_overhead_ms=None, per_frame_ms=None):
+        self.call_overhead_ms = config.CLASSIFIER_SIMULATED_CALL_MS if call_overhead_ms is None else call_overhead_ms
+        self.per_frame_ms = config.CLASSIFIER_SIMULATED_FRAME_MS if per_frame_ms is None else per_frame_ms
+
+    def predict_batch(self, inputs):
+        # inputs: float32 array (N, ...) from preprocessing. Returns N scores in [0, 1].
+        simulated_s = (self.call_overhead_ms + self.per_frame_ms * len(inputs)) / 1000.0
+        if simulated_s > 0:
+            time.sleep(simulated_s)
+        return inputs.reshape(len(inputs), -1).mean(axis=1).clip(0.0, 1.0).astype(np.float32)
+
+
+class OpenCVDnnClassifier:
+    # Runs an exported model (e.g. ONNX) through cv2.dnn, so no extra runtime
+    # is needed on the line PCs. The model is expected to output one score per
+    # input (or class scores whose last column is the "cut" class).
+
+    def __init__(self, model_path):
+        self.name = os.path.basename(model_path)
+        self.net = cv2.dnn.readNet(model_path)
+
+    def predict_batch(self, inputs):
+        if config.PREPROCESS_LAYOUT == "hwc":
+            inputs = np.ascontiguousarray(inputs.transpose(0, 3, 1, 2)) # cv2.dnn expects NCHW
+        self.net.setInput(inputs)
+        output = self.net.forward().reshape(len(inputs), -1)
+        return output[:, -1].astype(np.float32)
+
+
+def load_classifier():
+    if config.CLASSIFIER_MODEL_PATH:
+        try:
+            return OpenCVDnnClassifier(config.CLASSIFIER_MODEL_PATH)
+        except cv2.error as e:
+            print(f"Warning: Could not load classifier model {config.CLASSIFIER_MODEL_PATH}: {e}. Using placeholder.")
+    return PlaceholderClassifier()
+
+
+def classifier_name():
+    # Name of the configured classifier, without loading it.
+    return os.path.basename(config.CLASSIFIER_MODEL_PATH) if config.CLASSIFIER_MODEL_PATH else PlaceholderClassifier.name
+
+
+def prepare_input(frame, out=None):
+    # BGR uint8 frame -> float32 model input (see FramePreprocessor). Without
+    # `out` a new array is returned, so the result may be kept.
+    preprocessor = preprocessor_for(frame.shape)
+    if out is None:
+        out = np.empty(preprocessor.output_shape, dtype=np.float32)
+    return preprocessor.process(frame, out=out)
+
+
+def label_for_score(score):
+    return "cut" if score >= config.PRODUCTION_DECISION_THRESHOLD else "pass"
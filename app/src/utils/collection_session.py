@@ -0,0 +1,314 @@
+import os
+import datetime
+import threading
+
+import numpy as np
+
+import config
+from app.src.utils.frame_buffer import FrameRingBuffer
+from app.src.utils.acquisition import FrameAcquisitionWorker
+from app.src.utils.frame_sources import create_frame_source
+from app.src.utils.image_writer import ImageWriterPool
+from app.src.utils.depth_store import DepthStoreWriter
+from app.src.utils.upload_spooler import get_upload_spooler
+from app.src.utils.capture_modes import CaptureController
+from app.src.utils.dedup import DuplicateFilter
+from app.src.utils.process_pool import get_process_pool
+from app.src.utils.tracing import get_tracer
+from app.src.utils.session_journal import SessionJournal, write_session_logs
+from app.src.utils.catalog import get_catalog
+from app.src.utils.db_sink import get_database_sink
+from app.src.utils.offline_classification import classify_session_images
+
+
+class DataCollectionSession:
+    # Session, capture and storage logic of data collection mode, free of Qt
+    # so it runs the same under DataCollectionModePage and headless.py.
+    # One instance can run sessions back to back: start() opens the journal
+    # and the camera, captures go through store_frame() (directly for single
+    # captures, via capture_controller for burst/continuous), and end()
+    # drains storage, writes the logs and returns the session summary.
+
+    def __init__(self):
+        # --- Session State ---
+        self.session_id = None
+        self.session_start_time = None
+        self.permission_level = "N/A"
+        self.images_captured_count = 0
+        self.last_stored_sequence = None # Frame sequence of the newest stored capture
+        self.session_journal = None # Image log rows stream to disk instead of memory
+        self.catalog = None
+        self.camera_active = False
+        self.camera_error = None
+
+        # --- Acquisition and Storage ---
+        self.frame_source = None
+        self.ring_buffer = None
+        self.acquisition_worker = None
+        self._acquisition_interval_stats = {}
+        self.image_writer = None
+        self.depth_buffer = None # Aligned depth, in lockstep with ring_buffer (DEPTH_CAPTURE_ENABLED)
+        self.depth_writer = None
+        self._depth_frame = None
+        self.capture_controller = None
+        self._capture_lock = threading.Lock() # Captures arrive from the GUI, acquisition and burst threads
+        self.duplicate_filter = DuplicateFilter()
+        self.process_pool = None # Shared worker pool for image quality checks
+        self.classification_thread = None # Background classification of the last ended session
+
+        # --- Ensure log directories exist (journal is always local) ---
+        os.makedirs(config.SESSION_LOGS_PATH, exist_ok=True) #
+        if config.DATA_STORAGE_FLAG == 1: #
+            os.makedirs(config.IMAGE_LOGS_PATH, exist_ok=True) #
+        else:
+            os.makedirs(config.UPLOAD_SPOOL_PATH, exist_ok=True)
+
+    # --- Session Management ---
+    def start(self, permission_level="N/A", frame_source=None):
+        # Returns True if the camera started; otherwise camera_error holds the
+        # reason and the session stays open (with no images) until end(). A
+        # session still open from an earlier start() is ended first, so its
+        # journal is closed and its logs are written.
+        if self.session_start_time:
+            print(f"Warning: Session {self.session_id} was still open; ending it before starting a new one.")
+            self.end()
+        self.session_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.session_start_time = datetime.datetime.now()
+        self.permission_level = permission_level
+        self.images_captured_count = 0
+        self.last_stored_sequence = None
+        self.camera_error = None
+        session_start_record = {
+            "session_id": self.session_id,
+            "mode": "Data Collection",
+            "permission_level": self.permission_level,
+            "start_time": self.session_start_time.isoformat(),
+            "data_storage_mode": "Offline" if config.DATA_STORAGE_FLAG == 1 else "Online", #
+        }
+        self.session_journal = SessionJournal(self.session_id)
+        self.session_journal.append("session_start", session_start_record)
+        get_tracer().start_session()
+        self.catalog = get_catalog()
+        self.catalog.upsert_session(session_start_record)
+        if config.DATA_STORAGE_FLAG == 0:
+            get_upload_spooler() # Starts the uploaders, resuming anything left in the spool
+            get_database_sink() # Starts sending anything still queued for the database
+
+        print(f"Session {self.session_id} started. User: {self.permission_level}")
+        print(f"Attempting to use Camera Config: W:{config.CAMERA_RESOLUTION_WIDTH}, H:{config.CAMERA_RESOLUTION_HEIGHT}, FPS:{config.CAMERA_FPS}, RotationOpt:{config.CAMERA_ROTATION_OPTION}, Source:{config.CAMERA_SOURCE}") #
+
+        try:
+            self._start_acquisition(frame_source or create_frame_source())
+            self.camera_active = True
+        except Exception as e:
+            self.camera_error = e
+            self.camera_active = False
+            return False
+
+        self.duplicate_filter.start_session()
+        if config.CAPTURE_QUALITY_CHECKS:
+            self.process_pool = get_process_pool(self.ring_buffer.frame_shape)
+            self.process_pool.reset_stats()
+        if self.image_writer is None:
+            self.image_writer = ImageWriterPool(self.ring_buffer.frame_shape)
+        if self.capture_controller is None or self.capture_controller.frame_shape != self.ring_buffer.frame_shape:
+            self.capture_controller = CaptureController(self.ring_buffer.frame_shape, self.store_frame)
+        else:
+            self.capture_controller.reset_stats()
+        self.capture_controller.set_depth_buffer(self.depth_buffer)
+        if self.depth_buffer is not None:
+            self.depth_writer = DepthStoreWriter(self.session_id, self.depth_buffer.frame_shape)
+            self._depth_frame = np.empty(self.depth_buffer.frame_shape, dtype=np.uint16)
+        self.acquisition_worker.frame_listeners.append(self.capture_controller.on_frame)
+        print("Data collection session started.")
+        return True
+
+    # --- Frame Acquisition ---
+    def _start_acquisition(self, frame_source):
+        frame_source.open()
+        height, width = frame_source.frame_shape[:2]
+        if self.ring_buffer is None or self.ring_buffer.frame_shape[:2] != (height, width):
+            self.ring_buffer = FrameRingBuffer(config.FRAME_BUFFER_CAPACITY, height, width)
+        else:
+            self.ring_buffer.reset_stats()
+
+        self.depth_buffer = None
+        if config.DEPTH_CAPTURE_ENABLED and frame_source.has_depth:
+            self.depth_buffer = FrameRingBuffer(config.FRAME_BUFFER_CAPACITY, height, width, channels=1, dtype=np.uint16)
+
+        self.frame_source = frame_source
+        self.acquisition_worker = FrameAcquisitionWorker(self.frame_source, self.ring_buffer, depth_buffer=self.depth_buffer)
+        print(f"Frame source: {self.frame_source.describe()}")
+        self.acquisition_worker.start()
+
+    def stop_acquisition(self):
+        self.camera_active = False
+        if self.capture_controller is not None:
+            self.capture_controller.disarm()
+        if self.acquisition_worker:
+            self.acquisition_worker.stop()
+            if self.acquisition_worker.read_failures:
+                print(f"Camera read failures this session: {self.acquisition_worker.read_failures} (last error: {self.acquisition_worker.last_error})")
+            self._acquisition_interval_stats = self.acquisition_worker.interval_stats()
+            self.acquisition_worker = None
+        self.frame_source = None
+
+    @property
+    def source_exhausted(self):
+        return self.acquisition_worker is not None and self.acquisition_worker.source_exhausted
+
+    # --- Image Handling ---
+    def store_frame(self, frame, sequence, acquired_at, block=None, depth=None):
+        # Logs one captured frame and queues it for storage. Thread-safe: called
+        # from the GUI thread, the acquisition thread (continuous) and the burst
+        # flush thread. Returns False if the writer refused the frame and None
+        # if it was skipped as a near-duplicate (DEDUP_MODE "skip").
+        # When depth is captured, the frame's depth (`depth`, or else looked up
+        # by sequence in depth_buffer) goes to the session's DepthStoreWriter.
+        with self._capture_lock:
+            if not self.session_id:
+                return False
+            phash, duplicate_of = self.duplicate_filter.check(frame)
+            if duplicate_of is not None and self.duplicate_filter.mode == DuplicateFilter.MODE_SKIP:
+                self.duplicate_filter.note_skipped()
+                return None
+            capture_time = datetime.datetime.now()
+            image_filename_base = f"session_{self.session_id}_img_{self.images_captured_count + 1:04d}"
+            log_entry = {
+                "filename": image_filename_base + ".png",
+                "path_or_link": "", # Will be the actual path or cloud link
+                "timestamp": capture_time.isoformat(),
+                "frame_sequence": sequence,
+                "acquired_monotonic_s": f"{acquired_at:.6f}",
+                "file_size_bytes": "", # Filled in once the background write finishes
+                "encode_ms": "",
+                "write_ms": "",
+                "phash": f"{phash:016x}" if phash is not None else "",
+                "duplicate_of": duplicate_of or "",
+                "sharpness": "", # Quality metrics, filled in from the process pool
+                "brightness": "",
+                "clipped_fraction": "",
+                "classification_placeholder": "N/A", # To be filled later
+                "classification_log_link_placeholder": "N/A" # To be filled later
+            }
+
+            # Offline images go straight to IMAGE_LOGS_PATH; online images are
+            # encoded into the upload spool and uploaded in the background.
+            image_dir = config.IMAGE_LOGS_PATH if config.DATA_STORAGE_FLAG == 1 else config.UPLOAD_SPOOL_PATH #
+            image_full_path = os.path.join(image_dir, log_entry["filename"])
+            quality = self.process_pool.submit("quality", frame) if self.process_pool is not None else None
+            accepted = self.image_writer.submit(
+                frame, image_full_path, block=block,
+                on_done=lambda result, entry=log_entry, session_id=self.session_id: self._on_image_written(session_id, entry, result, quality))
+            if not accepted:
+                return False
+            if self.depth_writer is not None:
+                if depth is None and self.depth_buffer.copy_sequence_into(self._depth_frame, sequence) is not None:
+                    depth = self._depth_frame
+                if depth is not None:
+                    self.depth_writer.submit(depth, sequence, log_entry["filename"], acquired_at, block=block)
+            self.duplicate_filter.record(phash, log_entry["filename"], duplicate_of)
+            # The final row is journaled once the write completes.
+            self.session_journal.append("capture", {
+                "filename": log_entry["filename"], "timestamp": log_entry["timestamp"], "frame_sequence": sequence})
+
+            self.images_captured_count += 1
+            self.last_stored_sequence = sequence
+            return True
+
+    def _on_image_written(self, session_id, log_entry, result, quality=None):
+        # Runs on an image writer thread; only touches this entry's own dict.
+        if quality is not None:
+            try:
+                log_entry.update(quality.result(timeout=config.PROCESS_POOL_TASK_TIMEOUT_S))
+            except Exception as e:
+                print(f"Quality check failed for {log_entry['filename']}: {e}")
+        if result["error"]:
+            print(f"Error writing image {result['path']}: {result['error']}")
+        else:
+            log_entry["path_or_link"] = result["path"]
+            log_entry["file_size_bytes"] = result["file_size_bytes"]
+            log_entry["encode_ms"] = result["encode_ms"]
+            log_entry["write_ms"] = result["write_ms"]
+        self.session_journal.append("image", log_entry)
+        self.catalog.add_image(session_id, log_entry)
+        if config.DATA_STORAGE_FLAG == 0 and not result["error"]:
+            # Online: the catalog's path_or_link is back-filled with the link once the upload lands.
+            get_upload_spooler().enqueue_file(result["path"], session_id=session_id, filename=log_entry["filename"])
+
+    # --- Session End ---
+    def end(self):
+        # Stops the camera, waits for every queued image, writes the session
+        # logs and returns the summary (None if no session was running).
+        if not self.session_start_time:
+            return None
+        self.stop_acquisition()
+        print("Camera resources released.")
+
+        if self.capture_controller is not None:
+            self.capture_controller.wait_idle() # Let a running burst finish queueing its frames
+        writer_stats = {}
+        if self.image_writer is not None:
+            self.image_writer.drain() # Every queued image must be on disk before the logs are written
+            writer_stats = self.image_writer.stats()
+            self.image_writer.shutdown()
+            self.image_writer = None
+        if self.depth_writer is not None:
+            writer_stats.update(self.depth_writer.close())
+            self.depth_writer = None
+
+        session_end_time = datetime.datetime.now()
+        total_session_time_delta = session_end_time - self.session_start_time
+        total_session_time_seconds = int(total_session_time_delta.total_seconds())
+
+        session_summary = {
+            "session_id": self.session_id,
+            "mode": "Data Collection",
+            "permission_level": self.permission_level,
+            "start_time": self.session_start_time.isoformat(),
+            "end_time": session_end_time.isoformat(),
+            "total_duration_seconds": total_session_time_seconds,
+            "images_captured": self.images_captured_count,
+            "data_storage_mode": "Offline" if config.DATA_STORAGE_FLAG == 1 else "Online", #
+            "images_details_count": self.session_journal.image_records
+        }
+        if self.ring_buffer is not None:
+            session_summary.update(self.ring_buffer.stats())
+            session_summary.update(self._acquisition_interval_stats)
+        if self.capture_controller is not None:
+            session_summary.update(self.capture_controller.stats())
+        session_summary.update(writer_stats)
+        self.duplicate_filter.end_session()
+        session_summary.update(self.duplicate_filter.stats())
+        if self.process_pool is not None:
+            session_summary.update(self.process_pool.stats())
+        if config.DATA_STORAGE_FLAG == 0:
+            session_summary.update(get_upload_spooler().stats())
+        print(f"Session {self.session_id} ended. Duration: {total_session_time_seconds}s. Images: {self.images_captured_count}.")
+        if self.ring_buffer is not None:
+            print(f"Frames acquired: {self.ring_buffer.frames_acquired}, dropped: {self.ring_buffer.frames_dropped}, buffer high-water mark: {self.ring_buffer.high_water_mark}/{self.ring_buffer.capacity}.")
+
+        self.session_journal.append("session_end", session_summary)
+        self.session_journal.close()
+        latency_path = get_tracer().end_session(self.session_id)
+        if latency_path:
+            print(f"Latency histograms saved to: {latency_path}")
+        self.catalog.upsert_session(session_summary)
+
+        if config.DATA_STORAGE_FLAG == 1: # Offline - Save to CSV
+            try:
+                write_session_logs(session_summary, self.session_journal.path, config.SESSION_LOGS_PATH) #
+            except IOError as e:
+                print(f"Error writing local log files: {e}")
+            if config.CLASSIFY_ON_SESSION_END and self.images_captured_count:
+                self.classification_thread = threading.Thread(target=classify_session_images, args=(self.session_id,),
+                                                              name="SessionClassification", daemon=True)
+                self.classification_thread.start()
+        else: # Online - Queued for the SQL database; sent in the background
+            get_database_sink().submit_session(session_summary)
+            print("Session summary (and image details) queued for the online SQL database.")
+
+        self.session_start_time = None
+        self.session_id = None
+        self.session_journal = None
+        return session_summary
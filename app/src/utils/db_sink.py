@@ -0,0 +1,287 @@
+import datetime
+import importlib
+import json
+import os
+import threading
+import time
+
+import config
+from app.src.utils.catalog import IMAGE_COLUMNS, SESSION_COLUMNS, session_row_from_summary
+
+# Portable DDL (SQLite, MySQL, PostgreSQL). Re-sent sessions replace their old
+# rows, so writes are idempotent and safe to retry.
+SCHEMA_STATEMENTS = [
+    """CREATE TABLE IF NOT EXISTS sessions (
+        session_id VARCHAR(64) PRIMARY KEY,
+        mode VARCHAR(64),
+        permission_level VARCHAR(64),
+        start_time VARCHAR(32),
+        end_time VARCHAR(32),
+        total_duration_seconds INTEGER,
+        images_captured INTEGER,
+        data_storage_mode VARCHAR(16),
+        recovered INTEGER,
+        summary_json TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS images (
+        session_id VARCHAR(64) NOT NULL,
+        filename VARCHAR(255) NOT NULL,
+        path_or_link TEXT,
+        timestamp VARCHAR(32),
+        frame_sequence BIGINT,
+        acquired_monotonic_s DOUBLE PRECISION,
+        file_size_bytes BIGINT,
+        classification VARCHAR(64),
+        classification_log_link TEXT,
+        PRIMARY KEY (session_id, filename)
+    )""",
+]
+
+# driver -> (DB-API module, parameter placeholder)
+DRIVERS = {
+    "sqlite": ("sqlite3", "?"),
+    "mysql": ("pymysql", "%s"),
+    "postgres": ("psycopg2", "%s"),
+}
+
+
+class DatabaseUnreachable(Exception):
+    # The database could not be reached, or the connection died during a
+    # send: nothing is known about the item, so it stays queued.
+    pass
+
+
+class DatabaseSink:
+    # Writes finished sessions and their image rows to the database named by
+    # ONLINE_DB_CONFIG. Calls from the GUI only drop a small item into a local
+    # outbox directory (the fallback queue) and return; a single background
+    # thread sends outbox items in order using batched multi-row inserts over
+    # one kept-open connection. While the database is unreachable items stay
+    # in the outbox and are retried every DB_RETRY_INTERVAL_S, including after
+    # a restart. An item that fails while the connection stays usable (bad
+    # data, constraint, deadlock, lock timeout) is rejected: it is skipped and retried with the next pass, and after
+    # DB_MAX_ITEM_ATTEMPTS moved to the dead-letter file, so it never holds up
+    # the items behind it. Image rows are read from the local catalog at send
+    # time, so links that were back-filled by the upload spooler are included
+    # (and a skipped link update is also carried by its session's next write).
+
+    def __init__(self, db_config=None, outbox_dir=None, batch_size=None, catalog=None, dead_letter_path=None):
+        self.db_config = dict(db_config or config.ONLINE_DB_CONFIG)
+        self.driver = self.db_config.get("driver", "mysql")
+        if self.driver not in DRIVERS:
+            raise ValueError(f"Unknown database driver '{self.driver}'.")
+        self.outbox_dir = outbox_dir or config.DB_OUTBOX_PATH
+        self.dead_letter_path = dead_letter_path or config.DB_DEAD_LETTER_PATH
+        self.batch_size = batch_size or config.DB_INSERT_BATCH_SIZE
+        self.placeholder = DRIVERS[self.driver][1]
+        self._connection = None # Sender thread only
+        self._drain_lock = threading.Lock()
+        self._catalog = catalog
+        self._schema_ready = False
+        self._wake = threading.Event()
+        self._closed = False
+        self._outbox_lock = threading.Lock()
+        self._next_item = 0
+        self.sessions_written = 0
+        self.rows_written = 0
+        self.items_dead_lettered = 0
+        self.last_error = None
+        os.makedirs(self.outbox_dir, exist_ok=True)
+        self._sender = threading.Thread(target=self._send_loop, name="DatabaseSink", daemon=True)
+        self._sender.start()
+
+    # --- Connections ---
+    def _connect(self):
+        module = importlib.import_module(DRIVERS[self.driver][0]) # Optional dependency for server drivers
+        if self.driver == "sqlite":
+            return module.connect(self.db_config["db_name"], timeout=config.DB_CONNECT_TIMEOUT_S)
+        if self.driver == "mysql":
+            return module.connect(host=self.db_config["host"], port=int(self.db_config.get("port", 3306)),
+                                  user=self.db_config["user"], password=self.db_config["password"],
+                                  database=self.db_config["db_name"], connect_timeout=config.DB_CONNECT_TIMEOUT_S)
+        return module.connect(host=self.db_config["host"], port=int(self.db_config.get("port", 5432)),
+                              user=self.db_config["user"], password=self.db_config["password"],
+                              dbname=self.db_config["db_name"], connect_timeout=config.DB_CONNECT_TIMEOUT_S)
+
+    def _connection_usable(self):
+        # Asked after a statement failed. Drivers raise the same exception
+        # classes (e.g. OperationalError) for server-side errors and lost
+        # connections, so the connection itself is checked instead.
+        connection = self._connection
+        if connection is None:
+            return False
+        try:
+            if self.driver == "mysql":
+                connection.ping(reconnect=False)
+            elif self.driver == "postgres":
+                return not connection.closed
+            else:
+                connection.execute("SELECT 1")
+        except Exception:
+            return False
+        return True
+
+    def _close_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    @property
+    def catalog(self):
+        if self._catalog is None:
+            from app.src.utils.catalog import get_catalog
+            self._catalog = get_catalog()
+        return self._catalog
+
+    # --- Outbox (GUI / worker threads) ---
+    def submit_session(self, session_summary):
+        self._enqueue({"kind": "session", "summary": session_summary})
+
+    def update_image_link(self, session_id, filename, path_or_link):
+        self._enqueue({"kind": "image_link", "session_id": session_id, "filename": filename, "path_or_link": path_or_link})
+
+    def _enqueue(self, item):
+        with self._outbox_lock:
+            self._next_item += 1
+            name = f"{time.time_ns():020d}_{self._next_item:06d}.json"
+        path = os.path.join(self.outbox_dir, name)
+        with open(path + ".part", "w") as f:
+            json.dump(item, f, default=str)
+        os.replace(path + ".part", path)
+        self._wake.set()
+
+    def pending_count(self):
+        return len(self._outbox_items())
+
+    def _outbox_items(self):
+        return sorted(name for name in os.listdir(self.outbox_dir) if name.endswith(".json"))
+
+    # --- Sending (background thread) ---
+    def _send_loop(self):
+        while not self._closed:
+            self._wake.clear()
+            self.drain_outbox()
+            self._wake.wait(config.DB_RETRY_INTERVAL_S)
+
+    def drain_outbox(self):
+        # Sends outbox items oldest first and stops at the first connection
+        # failure, so a link update is never applied before the session it
+        # belongs to. Returns False if the database could not be reached.
+        with self._drain_lock:
+            for name in self._outbox_items():
+                path = os.path.join(self.outbox_dir, name)
+                try:
+                    with open(path) as f:
+                        item = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Dropping unreadable database outbox item {name}: {e}")
+                    os.remove(path)
+                    continue
+                try:
+                    self._send(item)
+                except DatabaseUnreachable as e:
+                    if str(e) != str(self.last_error):
+                        print(f"Database unreachable, keeping {self.pending_count()} item(s) queued locally: {e}")
+                    self.last_error = e
+                    return False
+                except Exception as e:
+                    self._reject(path, name, item, e)
+                    continue
+                self.last_error = None
+                os.remove(path)
+            return True
+
+    def _reject(self, path, name, item, error):
+        # The database refused this item; count the attempt and give up on it
+        # (moving it to the dead-letter file) once it has used them all.
+        item["attempts"] = item.get("attempts", 0) + 1
+        if item["attempts"] < config.DB_MAX_ITEM_ATTEMPTS:
+            print(f"Warning: Database rejected outbox item {name} (attempt {item['attempts']}), retrying later: {error}")
+            with open(path + ".part", "w") as f:
+                json.dump(item, f, default=str)
+            os.replace(path + ".part", path)
+            return
+        record = {"item": item, "outbox_name": name, "error": repr(error),
+                  "failed_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+        with open(self.dead_letter_path, "a") as f:
+            f.write(json.dumps(record, default=str) + "\n")
+        os.remove(path)
+        self.items_dead_lettered += 1
+        print(f"Error: Database rejected outbox item {name} {item['attempts']} times; moved to {self.dead_letter_path}: {error}")
+
+    def _send(self, item):
+        if self._connection is None:
+            try:
+                self._connection = self._connect()
+            except Exception as e:
+                raise DatabaseUnreachable(e) from e
+        connection = self._connection
+        if not self._schema_ready:
+            try:
+                cursor = connection.cursor()
+                for statement in SCHEMA_STATEMENTS:
+                    cursor.execute(statement)
+                connection.commit()
+            except Exception as e:
+                self._close_connection()
+                # Not the item's fault: keep it queued whatever the error was.
+                raise DatabaseUnreachable(f"could not create the database schema: {e}") from e
+            self._schema_ready = True
+        try:
+            cursor = connection.cursor()
+            if item["kind"] == "session":
+                self._write_session(cursor, item["summary"])
+            else:
+                cursor.execute(
+                    f"UPDATE images SET path_or_link = {self.placeholder} WHERE session_id = {self.placeholder} AND filename = {self.placeholder}",
+                    (item["path_or_link"], item["session_id"], item["filename"]))
+            connection.commit()
+        except Exception as e:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+            if not self._connection_usable():
+                self._close_connection() # Reconnect on the next try
+                raise DatabaseUnreachable(e) from e
+            raise
+
+    def _write_session(self, cursor, summary):
+        session_id = summary["session_id"]
+        p = self.placeholder
+        cursor.execute(f"DELETE FROM images WHERE session_id = {p}", (session_id,))
+        cursor.execute(f"DELETE FROM sessions WHERE session_id = {p}", (session_id,))
+        cursor.execute(f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join([p] * len(SESSION_COLUMNS))})",
+                       session_row_from_summary(summary))
+        image_rows = [tuple(row[column] for column in IMAGE_COLUMNS) for row in self.catalog.find_images(session_id=session_id)]
+        row_sql = "(" + ", ".join([p] * len(IMAGE_COLUMNS)) + ")"
+        for start in range(0, len(image_rows), self.batch_size):
+            batch = image_rows[start:start + self.batch_size]
+            cursor.execute(f"INSERT INTO images ({', '.join(IMAGE_COLUMNS)}) VALUES {', '.join([row_sql] * len(batch))}",
+                           [value for row in batch for value in row])
+        self.sessions_written += 1
+        self.rows_written += 1 + len(image_rows)
+
+    def close(self, timeout=None):
+        self._closed = True
+        self._wake.set()
+        self._sender.join(timeout)
+        if not self._sender.is_alive():
+            self._close_connection()
+
+
+_shared_sink = None
+_shared_sink_lock = threading.Lock()
+
+
+def get_database_sink():
+    # Process-wide sink for online storage mode.
+    global _shared_sink
+    with _shared_sink_lock:
+        if _shared_sink is None:
+            _shared_sink = DatabaseSink()
+        return _shared_sink
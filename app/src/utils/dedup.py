@@ -0,0 +1,187 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+HASH_BITS = 64
+
+
+def perceptual_hash(frame):
+    # 64-bit difference hash: the frame is downscaled to 9x8, reduced to luma
+    # and each pixel compared with its right-hand neighbour. Robust to sensor
+    # noise and small exposure changes. The bilinear pre-shrink to 72x64 keeps
+    # this well under a millisecond at 1280x720 (a direct INTER_AREA resize of
+    # the full frame costs ~4 ms).
+    small = cv2.resize(frame, (72, 64), interpolation=cv2.INTER_LINEAR)
+    small = cv2.resize(small, (9, 8), interpolation=cv2.INTER_AREA).astype(np.float32)
+    if small.ndim == 3:
+        small = small @ np.array([0.114, 0.587, 0.299], dtype=np.float32) # BGR -> luma
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+
+class HashIndex:
+    # Near-duplicate lookup over the most recent `capacity` hashes using
+    # multi-index hashing: the 64 bits are split into max_hamming + 1 bands,
+    # and by the pigeonhole principle any hash within max_hamming bits of a
+    # stored one matches it exactly in at least one band. A lookup therefore
+    # only compares against the few entries sharing a band value, and the ring
+    # eviction keeps buckets bounded, so lookups stay O(1) as sessions grow.
+    # That holds as long as callers store one representative per cluster of
+    # near-duplicates (DuplicateFilter never adds a hash that already matched).
+
+    def __init__(self, max_hamming, capacity):
+        self.max_hamming = max_hamming
+        self.capacity = capacity
+        band_count = max_hamming + 1
+        edges = np.linspace(0, HASH_BITS, band_count + 1).astype(int)
+        self._bands = [(int(lo), (1 << int(hi - lo)) - 1) for lo, hi in zip(edges[:-1], edges[1:])]
+        self._buckets = [{} for _ in self._bands]
+        self._hashes = [None] * capacity
+        self._labels = [None] * capacity
+        self._next = 0
+        self.size = 0
+
+    def _band_keys(self, value):
+        return [(value >> shift) & mask for shift, mask in self._bands]
+
+    def find(self, value):
+        # Returns (label, distance) of the closest stored hash within range, or None.
+        best = None
+        for buckets, key in zip(self._buckets, self._band_keys(value)):
+            for slot in buckets.get(key, ()):
+                distance = hamming_distance(value, self._hashes[slot])
+                if distance <= self.max_hamming and (best is None or distance < best[1]):
+                    best = (self._labels[slot], distance)
+                    if not distance:
+                        return best
+        return best
+
+    def add(self, value, label):
+        slot = self._next
+        if self._hashes[slot] is not None:
+            for buckets, key in zip(self._buckets, self._band_keys(self._hashes[slot])):
+                bucket = buckets[key]
+                bucket.discard(slot)
+                if not bucket:
+                    del buckets[key]
+        self._hashes[slot] = value
+        self._labels[slot] = label
+        for buckets, key in zip(self._buckets, self._band_keys(value)):
+            buckets.setdefault(key, set()).add(slot)
+        self._next = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def items(self):
+        # Oldest first.
+        for offset in range(self.capacity):
+            slot = (self._next + offset) % self.capacity
+            if self._hashes[slot] is not None:
+                yield self._hashes[slot], self._labels[slot]
+
+
+class DuplicateFilter:
+    # Per-session and cross-session near-duplicate detection for captures.
+    # check() hashes a frame and reports the earlier capture it duplicates, if
+    # any; record() adds a stored capture to the session index unless it
+    # duplicates an earlier one, so each index holds one hash per cluster of
+    # near-duplicates however long the line shows the same scene. The session's
+    # hashes are merged into the persistent cross-session history (the newest
+    # DEDUP_HISTORY_SIZE captures, kept in DEDUP_INDEX_PATH) by end_session().
+    # DEDUP_MODE "skip" drops duplicates, "flag" stores them with a
+    # duplicate_of note and "off" disables hashing altogether.
+
+    MODE_SKIP = "skip"
+    MODE_FLAG = "flag"
+    MODE_OFF = "off"
+
+    def __init__(self, mode=None, max_hamming=None, recent_window=None, history_size=None, index_path=None):
+        self.mode = mode or config.DEDUP_MODE
+        if self.mode not in (self.MODE_SKIP, self.MODE_FLAG, self.MODE_OFF):
+            raise ValueError(f"Unknown dedup mode '{self.mode}'.")
+        self.max_hamming = config.DEDUP_MAX_HAMMING if max_hamming is None else max_hamming
+        self.recent_window = recent_window or config.DEDUP_RECENT_WINDOW
+        self.index_path = index_path or config.DEDUP_INDEX_PATH
+        self.history = HashIndex(self.max_hamming, history_size or config.DEDUP_HISTORY_SIZE)
+        self._lock = threading.Lock()
+        if self.enabled:
+            self._load_history()
+        self.start_session()
+
+    @property
+    def enabled(self):
+        return self.mode != self.MODE_OFF
+
+    def start_session(self):
+        self.session = HashIndex(self.max_hamming, self.recent_window)
+        self.duplicates_skipped = 0
+        self.duplicates_flagged = 0
+
+    def check(self, frame):
+        # Returns (hash, duplicate_of_label_or_None).
+        if not self.enabled:
+            return None, None
+        value = perceptual_hash(frame)
+        with self._lock:
+            match = self.session.find(value) or self.history.find(value)
+        return value, match[0] if match else None
+
+    def record(self, value, label, duplicate_of=None):
+        if value is None:
+            return
+        with self._lock:
+            if duplicate_of is not None:
+                self.duplicates_flagged += 1
+                return # The capture it duplicates already represents it
+            self.session.add(value, label)
+
+    def note_skipped(self):
+        with self._lock:
+            self.duplicates_skipped += 1
+
+    def end_session(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            for value, label in self.session.items():
+                if self.history.find(value) is None:
+                    self.history.add(value, label)
+        self._save_history()
+
+    # --- Persistence ---
+    def _load_history(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with np.load(self.index_path) as data:
+                for value, label in zip(data["hashes"].tolist(), data["labels"].tolist()):
+                    if self.history.find(int(value)) is None: # Older files may hold whole clusters
+                        self.history.add(int(value), label)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not load duplicate index {self.index_path}: {e}")
+
+    def _save_history(self):
+        entries = list(self.history.items())
+        hashes = np.array([value for value, _ in entries], dtype=np.uint64)
+        labels = np.array([label for _, label in entries], dtype=str)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        temp_path = self.index_path + ".part.npz"
+        try:
+            np.savez(temp_path, hashes=hashes, labels=labels)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            print(f"Warning: Could not save duplicate index {self.index_path}: {e}")
+
+    def stats(self):
+        return {
+            "dedup_mode": self.mode,
+            "duplicates_skipped": self.duplicates_skipped,
+            "duplicates_flagged": self.duplicates_flagged,
+        }
@@ -0,0 +1,281 @@
+import mmap
+import os
+import queue
+import threading
+import time
+import zlib
+
+import numpy as np
+
+import config
+
+# Depth frames of a session live in DEPTH_LOGS_PATH/<session_id>/:
+#   chunk_00000.bin, chunk_00001.bin, ...  concatenated compressed frames,
+#                                          DEPTH_CHUNK_FRAMES per file
+#   index.bin                              _INDEX_MAGIC, then one INDEX_DTYPE
+#                                          record per frame
+# A frame is encoded as the horizontal delta of each row (uint16, wrapping),
+# split into a low-byte and a high-byte plane and deflated with the run-length
+# strategy. Depth surfaces are mostly smooth, so the deltas are small and the
+# high-byte plane is nearly constant; this is lossless and roughly as compact
+# as 16-bit PNG, while every frame still decodes on its own for random access.
+CODEC_DELTA_ZLIB_RLE = 1
+
+_INDEX_MAGIC = b"DEPTHIDX\x01\x00\x00\x00"
+INDEX_DTYPE = np.dtype([
+    ("frame_sequence", "<i8"),
+    ("timestamp", "<f8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("chunk", "<u4"),
+    ("height", "<u2"),
+    ("width", "<u2"),
+    ("codec", "u1"),
+    ("filename", "S63"), # Color image the depth frame belongs to
+])
+
+
+def depth_session_dir(session_id, directory=None):
+    return os.path.join(directory or config.DEPTH_LOGS_PATH, session_id)
+
+
+def encode_depth(depth):
+    height, width = depth.shape
+    delta = np.empty_like(depth)
+    delta[:, 0] = depth[:, 0]
+    np.subtract(depth[:, 1:], depth[:, :-1], out=delta[:, 1:])
+    planes = np.empty((2, height, width), dtype=np.uint8)
+    np.bitwise_and(delta, 0xFF, out=planes[0], casting="unsafe")
+    np.right_shift(delta, 8, out=planes[1], casting="unsafe")
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 15, 9, zlib.Z_RLE)
+    return compressor.compress(planes) + compressor.flush()
+
+
+def decode_depth(data, height, width, out=None):
+    planes = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(2, height, width)
+    delta = planes[1].astype(np.uint16)
+    delta <<= 8
+    delta |= planes[0]
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint16)
+    return np.cumsum(delta, axis=1, dtype=np.uint16, out=out)
+
+
+class DepthStoreWriter:
+    # Appends a session's depth frames to its chunk files on background
+    # threads. submit() copies the frame into one of DEPTH_WRITER_QUEUE_SIZE
+    # preallocated slots and returns; DEPTH_WRITER_THREADS threads encode in
+    # parallel (zlib releases the GIL) and append under a lock, chunk data
+    # first and then the index record, so a crash leaves at most an
+    # unreferenced tail in the last chunk. Index records are in completion
+    # order; frames are looked up by filename or frame sequence.
+    # When every slot is in flight, CAPTURE_BACKPRESSURE_POLICY (or `block`)
+    # decides between waiting and refusing the frame, as for ImageWriterPool.
+
+    def __init__(self, session_id, depth_shape, directory=None, chunk_frames=None, queue_size=None, num_threads=None):
+        self.session_id = session_id
+        self.depth_shape = tuple(depth_shape)
+        self.directory = depth_session_dir(session_id, directory)
+        self.chunk_frames = chunk_frames or config.DEPTH_CHUNK_FRAMES
+        os.makedirs(self.directory, exist_ok=True)
+        queue_size = queue_size or config.DEPTH_WRITER_QUEUE_SIZE
+        self._slots = np.empty((queue_size,) + self.depth_shape, dtype=np.uint16)
+        self._free_slots = queue.Queue()
+        for index in range(queue_size):
+            self._free_slots.put(index)
+        self._tasks = queue.Queue()
+
+        self._append_lock = threading.Lock()
+        index_path = os.path.join(self.directory, "index.bin")
+        if os.path.exists(index_path):
+            # Appending to an earlier store: cut any record torn by a crash.
+            self.frames_written = (os.path.getsize(index_path) - len(_INDEX_MAGIC)) // INDEX_DTYPE.itemsize
+            os.truncate(index_path, len(_INDEX_MAGIC) + self.frames_written * INDEX_DTYPE.itemsize)
+        else:
+            self.frames_written = 0
+        self._index_file = open(index_path, "ab")
+        if self._index_file.tell() == 0:
+            self._index_file.write(_INDEX_MAGIC)
+        self._frames_appended = 0 # This writer's share of frames_written
+        self._chunk_file = None
+        self._chunk_number = None
+        self.frames_refused = 0
+        self.write_errors = 0
+        self.bytes_raw = 0
+        self.bytes_written = 0
+        self._encode_s = 0.0
+
+        self._threads = [threading.Thread(target=self._worker_loop, name=f"DepthWriter-{index}", daemon=True)
+                         for index in range(num_threads or config.DEPTH_WRITER_THREADS)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, depth, frame_sequence, filename, timestamp, block=None):
+        if block is None:
+            block = config.CAPTURE_BACKPRESSURE_POLICY == "block"
+        try:
+            slot = self._free_slots.get() if block else self._free_slots.get_nowait()
+        except queue.Empty:
+            self.frames_refused += 1
+            return False
+        np.copyto(self._slots[slot], depth)
+        self._tasks.put((slot, int(frame_sequence), filename, float(timestamp)))
+        return True
+
+    def _worker_loop(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                self._tasks.task_done()
+                return
+            slot, frame_sequence, filename, timestamp = task
+            try:
+                started = time.monotonic()
+                data = encode_depth(self._slots[slot])
+                encode_s = time.monotonic() - started
+                self._free_slots.put(slot)
+                slot = None
+                self._append(data, frame_sequence, filename, timestamp, encode_s)
+            except Exception as e:
+                self.write_errors += 1
+                print(f"Error writing depth frame {frame_sequence} of session {self.session_id}: {e}")
+            finally:
+                if slot is not None:
+                    self._free_slots.put(slot)
+                self._tasks.task_done()
+
+    def _append(self, data, frame_sequence, filename, timestamp, encode_s):
+        with self._append_lock:
+            chunk_number = self.frames_written // self.chunk_frames
+            if chunk_number != self._chunk_number:
+                if self._chunk_file is not None:
+                    self._chunk_file.close()
+                self._chunk_file = open(os.path.join(self.directory, f"chunk_{chunk_number:05d}.bin"), "ab")
+                self._chunk_number = chunk_number
+            offset = self._chunk_file.tell()
+            self._chunk_file.write(data)
+            self._chunk_file.flush()
+            record = np.zeros(1, dtype=INDEX_DTYPE)
+            record[0] = (frame_sequence, timestamp, offset, len(data), chunk_number,
+                         self.depth_shape[0], self.depth_shape[1], CODEC_DELTA_ZLIB_RLE, filename.encode())
+            self._index_file.write(record.tobytes())
+            self._index_file.flush()
+            self.frames_written += 1
+            self._frames_appended += 1
+            self.bytes_raw += self._slots.itemsize * self._slots[0].size
+            self.bytes_written += len(data)
+            self._encode_s += encode_s
+
+    def drain(self):
+        self._tasks.join()
+
+    def close(self):
+        # Writes everything queued, closes the files and returns stats().
+        self.drain()
+        for _ in self._threads:
+            self._tasks.put(None)
+        for thread in self._threads:
+            thread.join()
+        with self._append_lock:
+            if self._chunk_file is not None:
+                self._chunk_file.close()
+                self._chunk_file = None
+            self._index_file.close()
+        return self.stats()
+
+    def stats(self):
+        return {
+            "depth_frames_written": self._frames_appended,
+            "depth_frames_refused": self.frames_refused,
+            "depth_write_errors": self.write_errors,
+            "depth_bytes_written": self.bytes_written,
+            "depth_compression_ratio": round(self.bytes_raw / self.bytes_written, 2) if self.bytes_written else 0.0,
+            "depth_encode_ms_mean": round(self._encode_s / self._frames_appended * 1000.0, 2) if self._frames_appended else 0.0,
+        }
+
+
+class DepthStore:
+    # Read side of a session's depth frames. The index is memory-mapped as a
+    # numpy record array and each chunk file is memory-mapped on first use,
+    # so opening a store is cheap and read(i) touches only that frame's bytes.
+    # Records whose data did not fully reach the disk are ignored.
+
+    def __init__(self, session_id, directory=None):
+        self.session_id = session_id
+        self.directory = depth_session_dir(session_id, directory)
+        index_path = os.path.join(self.directory, "index.bin")
+        with open(index_path, "rb") as f:
+            if f.read(len(_INDEX_MAGIC)) != _INDEX_MAGIC:
+                raise ValueError(f"{index_path} is not a depth index.")
+        count = (os.path.getsize(index_path) - len(_INDEX_MAGIC)) // INDEX_DTYPE.itemsize
+        self.index = (np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", offset=len(_INDEX_MAGIC), shape=(count,))
+                      if count else np.zeros(0, dtype=INDEX_DTYPE))
+        self._chunks = {}
+        self._by_filename = None
+        self._by_sequence = None
+        self._count = self._complete_count(count)
+
+    def _complete_count(self, count):
+        # Trailing records pointing past the end of their chunk are dropped.
+        while count:
+            record = self.index[count - 1]
+            chunk_path = os.path.join(self.directory, f"chunk_{int(record['chunk']):05d}.bin")
+            if os.path.exists(chunk_path) and int(record["offset"]) + int(record["length"]) <= os.path.getsize(chunk_path):
+                break
+            count -= 1
+        return count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self.read(index)
+
+    def _chunk(self, number):
+        chunk = self._chunks.get(number)
+        if chunk is None:
+            with open(os.path.join(self.directory, f"chunk_{number:05d}.bin"), "rb") as f:
+                chunk = self._chunks[number] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return chunk
+
+    def read(self, index, out=None):
+        # Depth frame `index` (in write order) as a (height, width) uint16 array.
+        if not -self._count <= index < self._count:
+            raise IndexError(f"Depth frame {index} out of range ({self._count} frames).")
+        record = self.index[index % self._count]
+        if record["codec"] != CODEC_DELTA_ZLIB_RLE:
+            raise ValueError(f"Unknown depth codec {record['codec']}.")
+        offset, length = int(record["offset"]), int(record["length"])
+        data = memoryview(self._chunk(int(record["chunk"])))[offset:offset + length]
+        try:
+            return decode_depth(data, int(record["height"]), int(record["width"]), out=out)
+        finally:
+            data.release()
+
+    def find(self, filename):
+        # Write-order index of the depth frame saved with a color image, or None.
+        if self._by_filename is None:
+            self._by_filename = {name.decode(): index for index, name in enumerate(self.index["filename"][:self._count])}
+        return self._by_filename.get(filename)
+
+    def find_sequence(self, frame_sequence):
+        if self._by_sequence is None:
+            self._by_sequence = {int(sequence): index
+                                 for index, sequence in enumerate(self.index["frame_sequence"][:self._count])}
+        return self._by_sequence.get(int(frame_sequence))
+
+    def close(self):
+        for chunk in self._chunks.values():
+            chunk.close()
+        self._chunks = {}
+        self.index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def has_depth_store(session_id, directory=None):
+    return os.path.exists(os.path.join(depth_session_dir(session_id, directory), "index.bin"))
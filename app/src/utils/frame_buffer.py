@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+
+
+class FrameRingBuffer:
+    # Fixed-size, preallocated ring of frames shared between the acquisition
+    # thread (producer) and the GUI / capture path (consumers).
+    # When every slot holds an unconsumed frame the oldest one is overwritten
+    # and counted as dropped, so the producer never blocks.
+
+    def __init__(self, capacity, height, width, channels=3, dtype=np.uint8):
+        if capacity < 2:
+            raise ValueError("FrameRingBuffer needs at least 2 slots.")
+        self.capacity = capacity
+        self.frame_shape = (height, width, channels) if channels > 1 else (height, width)
+        self._frames = np.zeros((capacity,) + self.frame_shape, dtype=dtype)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._sequence = np.full(capacity, -1, dtype=np.int64)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._head = 0          # next slot the producer writes into
+            self._pending = 0       # committed frames not yet consumed
+            self._next_sequence = 0
+            self._writing_slot = None
+            self.frames_acquired = 0
+            self.frames_dropped = 0
+            self.high_water_mark = 0
+
+    # --- Producer Side ---
+    def begin_write(self):
+        # Returns a writable view of the next slot. The slot is taken out of
+        # the readable set until commit() so consumers never see a torn frame.
+        with self._lock:
+            if self._writing_slot is not None:
+                raise RuntimeError("begin_write() called twice without commit().")
+            slot = self._head
+            if self._pending == self.capacity:
+                self._pending -= 1
+                self.frames_dropped += 1
+            self._sequence[slot] = -1
+            self._writing_slot = slot
+        return self._frames[slot]
+
+    def commit(self, timestamp=None):
+        with self._lock:
+            slot = self._writing_slot
+            if slot is None:
+                raise RuntimeError("commit() called without begin_write().")
+            self._timestamps[slot] = time.monotonic() if timestamp is None else timestamp
+            self._sequence[slot] = self._next_sequence
+            self._next_sequence += 1
+            self._head = (slot + 1) % self.capacity
+            self._writing_slot = None
+            self._pending += 1
+            self.frames_acquired += 1
+            if self._pending > self.high_water_mark:
+                self.high_water_mark = self._pending
+            return int(self._sequence[slot])
+
+    def abort_write(self):
+        with self._lock:
+            self._writing_slot = None
+
+    def push(self, frame, timestamp=None):
+        np.copyto(self.begin_write(), frame)
+        return self.commit(timestamp)
+
+    # --- Consumer Side ---
+    def _newest_slot(self):
+        if self._next_sequence == 0:
+            return None
+        slot = (self._head - 1) % self.capacity
+        if self._sequence[slot] < 0:
+            return None
+        return slot
+
+    def copy_latest_into(self, out, newer_than=-1):
+        # Copies the newest frame into a caller-owned array and marks every
+        # pending frame as consumed (older frames are superseded, not dropped).
+        # Returns (sequence, timestamp) or None if nothing newer is available.
+        with self._lock:
+            slot = self._newest_slot()
+            if slot is None or self._sequence[slot] <= newer_than:
+                return None
+            np.copyto(out, self._frames[slot])
+            self._pending = 0
+            return int(self._sequence[slot]), float(self._timestamps[slot])
+
+    def pop_oldest_into(self, out):
+        # FIFO consumption for paths that need every frame.
+        with self._lock:
+            if self._pending == 0:
+                return None
+            slot = (self._head - self._pending) % self.capacity
+            np.copyto(out, self._frames[slot])
+            self._pending -= 1
+            return int(self._sequence[slot]), float(self._timestamps[slot])
+
+    def copy_sequence_into(self, out, sequence):
+        # Copies a specific frame if it is still in the ring, without consuming
+        # anything (e.g. the depth frame matching a captured color frame).
+        # Returns its timestamp, or None if it has been overwritten.
+        with self._lock:
+            slot = int(np.argmax(self._sequence == sequence))
+            if self._sequence[slot] != sequence:
+                return None
+            np.copyto(out, self._frames[slot])
+            return float(self._timestamps[slot])
+
+    @property
+    def depth(self):
+        with self._lock:
+            return self._pending
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames_acquired": self.frames_acquired,
+                "frames_dropped": self.frames_dropped,
+                "buffer_high_water_mark": self.high_water_mark,
+                "buffer_capacity": self.capacity,
+            }
@@ -0,0 +1,361 @@
+import csv
+import datetime
+import glob
+import os
+import time
+
+import numpy as np
+
+import config
+
+
+def rotation_degrees_for_option(rotation_option):
+    return config.CAMERA_ROTATION_OPTIONS.get(rotation_option, 0)
+
+
+class FrameSource:
+    # Common interface for everything that can feed the acquisition worker.
+    # Frames are BGR uint8 arrays of shape frame_shape (rotation already applied).
+    # acquisition_fps is the rate the worker should pace reads at; 0 means the
+    # source paces itself (or should run flat out).
+    # Sources with has_depth also provide a uint16 depth frame (millimetres,
+    # 0 = no data) of shape depth_shape, aligned to the color frame: after
+    # each successful read_into(), read_depth_into() returns its depth.
+    # A source that paces itself waits with wait(seconds), which returns True
+    # when interrupted; the acquisition worker swaps in its stop event's
+    # wait(), so stopping it never waits out a long pause.
+
+    name = "base"
+    has_depth = False
+
+    def __init__(self, width=None, height=None, fps=None, rotation_option=None):
+        self.fps = config.CAMERA_FPS if fps is None else fps
+        self.rotation_option = config.CAMERA_ROTATION_OPTION if rotation_option is None else rotation_option
+        self.rotation_degrees = rotation_degrees_for_option(self.rotation_option)
+        self._set_resolution(width or config.CAMERA_RESOLUTION_WIDTH, height or config.CAMERA_RESOLUTION_HEIGHT)
+        self.wait = time.sleep
+
+    def _set_resolution(self, width, height):
+        # Native (unrotated) size; frame_shape is the size after rotation.
+        self.width = width
+        self.height = height
+        if self.rotation_degrees in (90, 270):
+            self.frame_shape = (self.width, self.height, 3)
+        else:
+            self.frame_shape = (self.height, self.width, 3)
+        self.depth_shape = self.frame_shape[:2]
+        self._native_scratch = None
+
+    @property
+    def acquisition_fps(self):
+        return self.fps
+
+    def open(self):
+        pass
+
+    def read_into(self, out):
+        raise NotImplementedError
+
+    def read_depth_into(self, out):
+        raise NotImplementedError(f"Frame source '{self.name}' has no depth stream.")
+
+    def release(self):
+        pass
+
+    @property
+    def finished(self):
+        return False
+
+    def describe(self):
+        return f"{self.name} {self.frame_shape[1]}x{self.frame_shape[0]}@{self.fps or 'max'}"
+
+    # --- Helpers for Subclasses ---
+    def _native_target(self, out):
+        # Where a subclass should write the unrotated frame: straight into `out`
+        # when no rotation is configured, otherwise a preallocated scratch buffer.
+        if self.rotation_degrees == 0:
+            return out
+        if self._native_scratch is None:
+            self._native_scratch = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        return self._native_scratch
+
+    def _finish_rotation(self, out):
+        if self.rotation_degrees:
+            np.copyto(out, np.rot90(self._native_scratch, k=-(self.rotation_degrees // 90)))
+
+    def _copy_depth(self, native_depth, out):
+        # Unrotated (height, width) depth into `out`, applying the rotation.
+        np.copyto(out, np.rot90(native_depth, k=-(self.rotation_degrees // 90)) if self.rotation_degrees else native_depth)
+
+
+class SyntheticFrameSource(FrameSource):
+    # Deterministic moving gradient. With fps > 0 the acquisition worker paces it
+    # to exactly that rate; with fps == 0 it runs as fast as the consumer allows.
+    # Depth is a tilted plane with a bump and a few holes moving with the
+    # gradient, like a carcass passing a fixed camera.
+
+    name = "synthetic"
+    has_depth = True
+
+    def __init__(self, width=None, height=None, fps=None, rotation_option=None):
+        super().__init__(width, height, fps, rotation_option)
+        self.frames_generated = 0
+        self._base = None
+        self._base_depth = None
+        self._depth_scratch = None
+
+    def open(self):
+        columns = np.arange(self.width, dtype=np.int32) * 256 // self.width
+        rows = np.arange(self.height, dtype=np.int32)[:, None] * 128 // self.height
+        self._base = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._base[..., 0] = (columns[None, :] + rows) % 256
+        self._base[..., 1] = columns[None, :]
+        self._base[..., 2] = 255 - columns[None, :]
+
+    def read_into(self, out):
+        if self._base is None:
+            self.open()
+        target = self._native_target(out)
+        shift = (self.frames_generated * 8) % self.width
+        target[:, :self.width - shift] = self._base[:, shift:]
+        target[:, self.width - shift:] = self._base[:, :shift]
+        self.frames_generated += 1
+        self._finish_rotation(out)
+        return True
+
+    def read_depth_into(self, out):
+        if self._base_depth is None:
+            rows, columns = np.mgrid[0:self.height, 0:self.width].astype(np.float32)
+            bump = np.exp(-((columns - self.width / 2) ** 2 + (rows - self.height / 2) ** 2) / (2 * (self.height / 4) ** 2))
+            depth = 900.0 + 0.25 * columns + 0.15 * rows - 150.0 * bump
+            depth[(rows.astype(np.int32) // 16 + columns.astype(np.int32) // 16) % 23 == 0] = 0 # Holes (no data)
+            self._base_depth = depth.astype(np.uint16)
+            self._depth_scratch = np.empty_like(self._base_depth)
+        shift = ((self.frames_generated - 1) * 8) % self.width # Matches the frame just read
+        self._depth_scratch[:, :self.width - shift] = self._base_depth[:, shift:]
+        self._depth_scratch[:, self.width - shift:] = self._base_depth[:, :shift]
+        self._copy_depth(self._depth_scratch, out)
+        return True
+
+
+class ReplayFrameSource(FrameSource):
+    # Streams a recorded data collection session back from IMAGE_LOGS_PATH
+    # (the most recent one unless session_id is given). Frame order and timing come from images_<session>.csv when present,
+    # otherwise from the PNG file modification times. Recorded images were
+    # saved after rotation, so no rotation is applied again by default.
+    # Frames replay at the recorded resolution, taken from the first image;
+    # passing width/height explicitly resizes every frame to that size
+    # instead (without keeping the aspect ratio). Without them, an image
+    # whose size differs from the first one is not read.
+    # If the session was recorded with depth (DepthStore in depth_dir), the
+    # depth saved with each image is replayed too.
+
+    name = "replay"
+
+    def __init__(self, session_id=None, realtime=True, loop=False, image_dir=None, session_log_dir=None,
+                 width=None, height=None, rotation_option=1, depth_dir=None):
+        super().__init__(width, height, fps=0, rotation_option=rotation_option)
+        self.resize_frames = width is not None or height is not None
+        self.session_id = session_id
+        self.realtime = realtime
+        self.loop = loop
+        self.image_dir = image_dir or config.IMAGE_LOGS_PATH
+        self.session_log_dir = session_log_dir or config.SESSION_LOGS_PATH
+        self.depth_dir = depth_dir or config.DEPTH_LOGS_PATH
+        self.depth_store = None
+        self.frames = [] # (path, seconds since first frame)
+        self._index = 0
+        self._clock_start = None
+
+    @property
+    def acquisition_fps(self):
+        return 0 # Paces itself from the recorded timestamps (or runs flat out)
+
+    def describe(self):
+        return f"replay of session {self.session_id} ({len(self.frames)} frames, {'original timing' if self.realtime else 'max speed'})"
+
+    def open(self):
+        if self.session_id is None:
+            recorded_sessions = list_recorded_sessions(self.image_dir)
+            if not recorded_sessions:
+                raise FileNotFoundError(f"No recorded sessions found in {self.image_dir}")
+            self.session_id = recorded_sessions[-1]
+        self.frames = load_recorded_session_frames(self.session_id, self.image_dir, self.session_log_dir)
+        if not self.frames:
+            raise FileNotFoundError(f"No recorded images found for session {self.session_id}")
+        self._index = 0
+        self._clock_start = None
+        if not self.resize_frames:
+            import cv2
+
+            first = cv2.imread(self.frames[0][0], cv2.IMREAD_COLOR)
+            if first is None:
+                raise FileNotFoundError(f"Could not read recorded image {self.frames[0][0]}")
+            self._set_resolution(first.shape[1], first.shape[0])
+        from app.src.utils.depth_store import DepthStore, has_depth_store
+        if has_depth_store(self.session_id, self.depth_dir):
+            self.depth_store = DepthStore(self.session_id, self.depth_dir)
+            self.has_depth = True
+
+    def read_into(self, out):
+        import cv2
+
+        if self._index >= len(self.frames):
+            if not self.loop:
+                return False
+            self._index = 0
+            self._clock_start = None
+        path, offset_s = self.frames[self._index]
+        self._index += 1
+
+        if self.realtime:
+            now = time.monotonic()
+            if self._clock_start is None:
+                self._clock_start = now - offset_s
+            delay = self._clock_start + offset_s - now
+            if delay > 0 and self.wait(delay):
+                self._index -= 1 # Interrupted: this frame was not read
+                return False
+
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            return False
+        target = self._native_target(out)
+        if image.shape == target.shape:
+            np.copyto(target, image)
+        elif self.resize_frames:
+            cv2.resize(image, (target.shape[1], target.shape[0]), dst=target, interpolation=cv2.INTER_AREA)
+        else:
+            return False # Recorded at another size than the first frame; stretching it would distort it
+        self._finish_rotation(out)
+        return True
+
+    def read_depth_into(self, out):
+        # Frames recorded without depth replay as all zeros (no data).
+        import cv2
+
+        depth_index = self.depth_store.find(os.path.basename(self.frames[self._index - 1][0]))
+        if depth_index is None:
+            out.fill(0)
+            return True
+        depth = self.depth_store.read(depth_index)
+        if depth.shape == out.shape:
+            np.copyto(out, depth)
+        else:
+            cv2.resize(depth, (out.shape[1], out.shape[0]), dst=out, interpolation=cv2.INTER_NEAREST)
+        return True
+
+    def release(self):
+        if self.depth_store is not None:
+            self.depth_store.close()
+            self.depth_store = None
+            self.has_depth = False
+
+    @property
+    def finished(self):
+        return not self.loop and self._index >= len(self.frames)
+
+
+class RealSenseFrameSource(FrameSource):
+    # With DEPTH_CAPTURE_ENABLED the depth stream is enabled too and aligned
+    # to the color stream, so depth pixels line up with color pixels (z16, in
+    # the device depth unit: 1 mm by default on D400 cameras).
+
+    name = "realsense"
+
+    def __init__(self, width=None, height=None, fps=None, rotation_option=None):
+        super().__init__(width, height, fps, rotation_option)
+        self.has_depth = config.DEPTH_CAPTURE_ENABLED
+        self._pipeline = None
+        self._align = None
+        self._depth_frame = None
+
+    @property
+    def acquisition_fps(self):
+        return 0 # wait_for_frames() already blocks at the device frame rate
+
+    def open(self):
+        import pyrealsense2 as rs
+
+        self._pipeline = rs.pipeline()
+        rs_config = rs.config()
+        rs_config.enable_stream(rs.stream.color, self.width, self.height, rs.format.bgr8, self.fps)
+        if self.has_depth:
+            rs_config.enable_stream(rs.stream.depth, self.width, self.height, rs.format.z16, self.fps)
+            self._align = rs.align(rs.stream.color)
+        self._pipeline.start(rs_config)
+
+    def read_into(self, out):
+        frames = self._pipeline.wait_for_frames()
+        if self._align is not None:
+            frames = self._align.process(frames)
+            self._depth_frame = frames.get_depth_frame()
+        color_frame = frames.get_color_frame()
+        if not color_frame:
+            return False
+        np.copyto(self._native_target(out), np.asanyarray(color_frame.get_data()))
+        self._finish_rotation(out)
+        return True
+
+    def read_depth_into(self, out):
+        if not self._depth_frame:
+            return False
+        self._copy_depth(np.asanyarray(self._depth_frame.get_data()), out)
+        return True
+
+    def release(self):
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+            self._align = None
+            self._depth_frame = None
+
+
+FRAME_SOURCES = {
+    SyntheticFrameSource.name: SyntheticFrameSource,
+    ReplayFrameSource.name: ReplayFrameSource,
+    RealSenseFrameSource.name: RealSenseFrameSource,
+}
+
+
+def create_frame_source(kind=None, **kwargs):
+    kind = kind or config.CAMERA_SOURCE
+    if kind not in FRAME_SOURCES:
+        raise ValueError(f"Unknown frame source '{kind}'. Expected one of: {', '.join(FRAME_SOURCES)}")
+    return FRAME_SOURCES[kind](**kwargs)
+
+
+# --- Recorded Session Discovery ---
+def list_recorded_sessions(image_dir=None):
+    image_dir = image_dir or config.IMAGE_LOGS_PATH
+    session_ids = set()
+    for path in glob.glob(os.path.join(image_dir, "session_*_img_*.png")):
+        name = os.path.basename(path)
+        session_ids.add(name[len("session_"):name.rindex("_img_")])
+    return sorted(session_ids)
+
+
+def load_recorded_session_frames(session_id, image_dir=None, session_log_dir=None):
+    image_dir = image_dir or config.IMAGE_LOGS_PATH
+    session_log_dir = session_log_dir or config.SESSION_LOGS_PATH
+    timed_paths = []
+
+    image_log_path = os.path.join(session_log_dir, f"images_{session_id}.csv")
+    if os.path.exists(image_log_path):
+        with open(image_log_path, newline='') as f:
+            for row in csv.DictReader(f):
+                path = os.path.join(image_dir, row["filename"])
+                if not os.path.exists(path):
+                    continue
+                timestamp = datetime.datetime.fromisoformat(row["timestamp"]).timestamp()
+                timed_paths.append((timestamp, path))
+
+    if not timed_paths:
+        for path in glob.glob(os.path.join(image_dir, f"session_{session_id}_img_*.png")):
+            timed_paths.append((os.path.getmtime(path), path))
+
+    timed_paths.sort()
+    if not timed_paths:
+        return []
+    first = timed_paths[0][0]
+    return [(path, timestamp - first) for timestamp, path in timed_paths]
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from app.src.utils.tracing import get_tracer
+
+
+class ImageWriterPool:
+    # Background PNG encode/write workers fed through a bounded set of
+    # preallocated frame slots. submit() copies the frame into a free slot and
+    # returns immediately; when every slot is in flight the backpressure policy
+    # decides whether the caller blocks ("block") or the capture is refused
+    # ("refuse"). on_done(result) is called from the worker thread.
+
+    def __init__(self, frame_shape, queue_size=None, num_workers=None, policy=None):
+        self.queue_size = queue_size or config.IMAGE_WRITER_QUEUE_SIZE
+        self.policy = policy or config.CAPTURE_BACKPRESSURE_POLICY
+        if self.policy not in ("block", "refuse"):
+            raise ValueError(f"Unknown capture backpressure policy '{self.policy}'.")
+        self._slots = np.empty((self.queue_size,) + tuple(frame_shape), dtype=np.uint8)
+        self._free_slots = queue.Queue()
+        for index in range(self.queue_size):
+            self._free_slots.put(index)
+        self._jobs = queue.Queue()
+        self._encode_params = [cv2.IMWRITE_PNG_COMPRESSION, config.IMAGE_PNG_COMPRESSION]
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.refused = 0
+        self.max_in_flight = 0
+        self.tracer = get_tracer()
+
+        self._workers = []
+        for i in range(num_workers or config.IMAGE_WRITER_WORKERS):
+            worker = threading.Thread(target=self._worker_loop, name=f"ImageWriter-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @property
+    def in_flight(self):
+        return self.queue_size - self._free_slots.qsize()
+
+    def submit(self, frame, path, on_done=None, block=None):
+        if block is None:
+            block = self.policy == "block"
+        try:
+            if block:
+                slot = self._free_slots.get()
+            else:
+                slot = self._free_slots.get_nowait()
+        except queue.Empty:
+            with self._stats_lock:
+                self.refused += 1
+            return False
+
+        np.copyto(self._slots[slot], frame)
+        with self._stats_lock:
+            self.submitted += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self._jobs.put((slot, path, on_done))
+        return True
+
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                self._jobs.task_done()
+                return
+            slot, path, on_done = job
+            result = {"path": path, "file_size_bytes": 0, "encode_ms": 0.0, "write_ms": 0.0, "error": None}
+            try:
+                started = time.perf_counter()
+                ok, encoded = cv2.imencode(os.path.splitext(path)[1] or ".png", self._slots[slot], self._encode_params)
+                encoded_at = time.perf_counter()
+                self._free_slots.put(slot) # Pixels no longer needed once encoded
+                slot = None
+                if not ok:
+                    raise IOError(f"Failed to encode image for {path}")
+                temp_path = path + ".part"
+                with open(temp_path, "wb") as f:
+                    f.write(encoded.tobytes())
+                os.replace(temp_path, path)
+                result["file_size_bytes"] = int(encoded.size)
+                result["encode_ms"] = round((encoded_at - started) * 1000.0, 2)
+                result["write_ms"] = round((time.perf_counter() - encoded_at) * 1000.0, 2)
+                self.tracer.record("encode", result["encode_ms"])
+                self.tracer.record("persist", result["write_ms"])
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                if slot is not None:
+                    self._free_slots.put(slot)
+
+            with self._stats_lock:
+                if result["error"]:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            if on_done:
+                try:
+                    on_done(result)
+                except Exception as e:
+                    print(f"Warning: Image write callback failed for {path}: {e}")
+            self._jobs.task_done()
+
+    def drain(self):
+        # Blocks until every submitted image has been written (or has failed).
+        self._jobs.join()
+
+    def shutdown(self):
+        self.drain()
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "images_written": self.completed,
+                "image_write_failures": self.failed,
+                "captures_refused": self.refused,
+                "writer_max_in_flight": self.max_in_flight,
+            }
@@ -0,0 +1,314 @@
+import collections
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import config
+from app.src.utils.classifier import label_for_score
+from app.src.utils.preprocess import FramePreprocessor, scaled_roi
+from app.src.utils.tracing import get_tracer
+
+STAGES = ("acquire", "preprocess", "model", "decision", "actuate")
+
+
+class PipelineItem:
+    __slots__ = ("sequence", "acquired_at", "frame_slot", "frame_scale", "input_slot", "score", "decision",
+                 "deadline", "stage_ms")
+
+    def __init__(self, sequence, acquired_at, frame_slot, frame_scale=1.0):
+        self.sequence = sequence
+        self.acquired_at = acquired_at
+        self.frame_slot = frame_slot
+        self.frame_scale = frame_scale
+        self.input_slot = None
+        self.score = None
+        self.decision = None
+        self.deadline = None
+        self.stage_ms = {}
+
+
+class InferencePipeline:
+    # Real-time acquire -> preprocess -> model -> decision -> actuate/log
+    # pipeline for production mode. Each stage after acquisition runs on its
+    # own thread and is fed by a bounded queue (PRODUCTION_QUEUE_SIZE). Frames
+    # and model inputs live in preallocated slot pools, so nothing is
+    # allocated per frame.
+    # Every stage has a latency budget (PRODUCTION_STAGE_BUDGETS_MS) covering
+    # its queue wait and its work. A frame that is past its deadline when a
+    # stage picks it up or finishes with it, or that finds the next queue
+    # full, is dropped and a "drop" record is written, so backlogs never build
+    # up and latency stays bounded. on_decision(item) is the actuator hook.
+    # The model stage hands inputs to a MicroBatchScheduler and moves on to
+    # the next frame; each result re-enters the pipeline from the scheduler
+    # thread when its batch completes. With a FrameProcessPool instead, the
+    # preprocess stage passes frames through and the model stage sends the
+    # full frame to a worker process, which preprocesses and classifies it.
+    # set_frame_scale() makes on_frame downscale frames into the top-left
+    # corner of their slot, trading resolution for throughput under load.
+
+    def __init__(self, frame_shape, scheduler, journal=None, on_decision=None, queue_size=None, budgets_ms=None,
+                 stats_window=None, process_pool=None):
+        self.scheduler = scheduler
+        self.process_pool = process_pool
+        self.stats_window = stats_window or config.PRODUCTION_STATS_WINDOW
+        self.journal = journal
+        self.on_decision = on_decision
+        self.queue_size = queue_size or config.PRODUCTION_QUEUE_SIZE
+        self.budgets_s = {stage: ms / 1000.0 for stage, ms in (budgets_ms or config.PRODUCTION_STAGE_BUDGETS_MS).items()}
+
+        # Enough slots for every queue and every stage to hold one item.
+        slot_count = self.queue_size * (len(STAGES) - 1) + len(STAGES)
+        self.frame_shape = tuple(frame_shape)
+        self.frame_scale = 1.0
+        self.preprocessor = FramePreprocessor(frame_shape) # Used only by the preprocess thread
+        self._scaled_preprocessors = {1.0: self.preprocessor}
+        self._frames = np.empty((slot_count,) + tuple(frame_shape), dtype=np.uint8)
+        self._inputs = np.empty((slot_count,) + self.preprocessor.output_shape, dtype=np.float32)
+        self._free_frames = queue.SimpleQueue()
+        self._free_inputs = queue.SimpleQueue()
+        for index in range(slot_count):
+            self._free_frames.put(index)
+            self._free_inputs.put(index)
+
+        self._queues = {stage: queue.Queue(maxsize=self.queue_size) for stage in STAGES[1:]}
+        self._workers = {
+            "preprocess": self._preprocess,
+            "model": self._model,
+            "decision": self._decision,
+            "actuate": self._actuate,
+        }
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.tracer = get_tracer()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.frames_in = 0
+            self.frames_completed = 0
+            self.drops = collections.Counter() # (stage, reason) -> count
+            self.decisions = collections.Counter()
+            self.last_decision = None
+            window = self.stats_window
+            self._stage_samples = {stage: collections.deque(maxlen=window) for stage in STAGES}
+            self._latency_samples = collections.deque(maxlen=window)
+            self._completion_times = collections.deque(maxlen=window)
+
+    # --- Lifecycle ---
+    def start(self):
+        self._stop_event.clear()
+        for stage, work in self._workers.items():
+            thread = threading.Thread(target=self._stage_loop, args=(stage, work), name=f"Pipeline-{stage}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for stage_queue in self._queues.values():
+            while True:
+                try:
+                    self._release(stage_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+    def set_frame_scale(self, scale):
+        # Takes effect from the next frame; frames already in flight keep theirs.
+        self.frame_scale = scale
+
+    def scaled_size(self, scale):
+        height, width = self.frame_shape[:2]
+        return max(1, int(height * scale)), max(1, int(width * scale))
+
+    def _frame_view(self, item):
+        if item.frame_scale == 1.0:
+            return self._frames[item.frame_slot]
+        height, width = self.scaled_size(item.frame_scale)
+        return self._frames[item.frame_slot, :height, :width]
+
+    # --- Acquire (FrameAcquisitionWorker listener, acquisition thread) ---
+    def on_frame(self, frame, sequence, acquired_at):
+        with self._stats_lock:
+            self.frames_in += 1
+        started = time.monotonic()
+        try:
+            frame_slot = self._free_frames.get_nowait()
+        except queue.Empty:
+            self._drop(PipelineItem(sequence, acquired_at, None), "acquire", "no_free_slot")
+            return
+        item = PipelineItem(sequence, acquired_at, frame_slot, self.frame_scale)
+        if item.frame_scale == 1.0:
+            np.copyto(self._frames[frame_slot], frame)
+        else:
+            # Bilinear: INTER_AREA costs ~4x more at non-integer scales and this
+            # runs on the acquisition thread; the preprocessor area-resizes later.
+            view = self._frame_view(item)
+            cv2.resize(frame, (view.shape[1], view.shape[0]), dst=view, interpolation=cv2.INTER_LINEAR)
+        item.stage_ms["acquire"] = (time.monotonic() - started) * 1000.0
+        self._forward(item, "acquire", "preprocess")
+
+    # --- Stage Workers ---
+    def _preprocess(self, item):
+        if self.process_pool is not None:
+            return # Done by the worker process, together with the model call
+        item.input_slot = self._free_inputs.get()
+        preprocessor = self._scaled_preprocessors.get(item.frame_scale)
+        if preprocessor is None:
+            height, width = self.scaled_size(item.frame_scale)
+            preprocessor = self._scaled_preprocessors[item.frame_scale] = FramePreprocessor(
+                (height, width) + self.frame_shape[2:], roi=scaled_roi(item.frame_scale))
+        preprocessor.process(self._frame_view(item), out=self._inputs[item.input_slot])
+        self._free_frames.put(item.frame_slot) # Full-size pixels are no longer needed
+        item.frame_slot = None
+
+    def _model(self, item):
+        started = time.monotonic()
+        if self.process_pool is not None:
+            future = self.process_pool.submit("classify", self._frame_view(item), scale=item.frame_scale)
+            self._release(item) # The pool copied the frame into its shared memory
+            if future is None:
+                self._drop(item, "model", "no_free_slot")
+                return False
+        else:
+            future = self.scheduler.submit(self._inputs[item.input_slot])
+        future.add_done_callback(lambda future: self._model_done(item, future, started))
+        return False # Forwarded by _model_done once the batch completes
+
+    def _model_done(self, item, future, started):
+        # Runs on the scheduler (or process pool result) thread.
+        self._release(item)
+        finished = time.monotonic()
+        if future.exception() is not None:
+            print(f"Error in model stage for frame {item.sequence}: {future.exception()}")
+            self._drop(item, "model", "error")
+            return
+        if self.process_pool is not None:
+            result = future.result()
+            item.score = result["score"]
+            item.stage_ms["preprocess"] = result["preprocess_ms"]
+        else:
+            item.score = future.result()
+        item.stage_ms["model"] = (finished - started) * 1000.0
+        if finished > item.deadline:
+            self._drop(item, "model", "over_budget")
+            return
+        self._forward(item, "model", "decision")
+
+    def _decision(self, item):
+        item.decision = label_for_score(item.score)
+
+    def _actuate(self, item):
+        if self.on_decision is not None:
+            self.on_decision(item)
+        if self.journal is not None:
+            self.journal.append("decision", {
+                "frame_sequence": item.sequence, "decision": item.decision, "score": round(item.score, 4),
+                "latency_ms": round((time.monotonic() - item.acquired_at) * 1000.0, 2)})
+
+    def _stage_loop(self, stage, work):
+        stage_queue = self._queues[stage]
+        next_stage = STAGES[STAGES.index(stage) + 1] if stage != STAGES[-1] else None
+        while not self._stop_event.is_set():
+            try:
+                item = stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            started = time.monotonic()
+            if started > item.deadline:
+                self._drop(item, stage, "deadline_missed")
+                continue
+            try:
+                if work(item) is False:
+                    continue # The stage forwards the item itself
+            except Exception as e:
+                print(f"Error in {stage} stage for frame {item.sequence}: {e}")
+                self._drop(item, stage, "error")
+                continue
+            finished = time.monotonic()
+            item.stage_ms[stage] = (finished - started) * 1000.0
+            if finished > item.deadline:
+                self._drop(item, stage, "over_budget")
+                continue
+            if next_stage is not None:
+                self._forward(item, stage, next_stage)
+            else:
+                self._complete(item)
+
+    def _forward(self, item, stage, next_stage):
+        item.deadline = time.monotonic() + self.budgets_s[next_stage]
+        try:
+            self._queues[next_stage].put_nowait(item)
+        except queue.Full:
+            self._drop(item, stage, "queue_full")
+
+    # --- Bookkeeping ---
+    def _release(self, item):
+        if item.frame_slot is not None:
+            self._free_frames.put(item.frame_slot)
+            item.frame_slot = None
+        if item.input_slot is not None:
+            self._free_inputs.put(item.input_slot)
+            item.input_slot = None
+
+    def _drop(self, item, stage, reason):
+        self._release(item)
+        age_ms = (time.monotonic() - item.acquired_at) * 1000.0
+        with self._stats_lock:
+            self.drops[(stage, reason)] += 1
+        if self.journal is not None:
+            self.journal.append("drop", {
+                "frame_sequence": item.sequence, "stage": stage, "reason": reason, "age_ms": round(age_ms, 2)})
+
+    def _complete(self, item):
+        now = time.monotonic()
+        self.tracer.record("preprocess", item.stage_ms["preprocess"])
+        self.tracer.record("infer", item.stage_ms["model"])
+        with self._stats_lock:
+            self.frames_completed += 1
+            self.decisions[item.decision] += 1
+            self.last_decision = item.decision
+            self._latency_samples.append((now - item.acquired_at) * 1000.0)
+            self._completion_times.append(now)
+            for stage, ms in item.stage_ms.items():
+                self._stage_samples[stage].append(ms)
+
+    def stage_latency_samples(self):
+        # Recent per-stage service times in ms, plus "end_to_end".
+        with self._stats_lock:
+            samples = {stage: list(values) for stage, values in self._stage_samples.items()}
+            samples["end_to_end"] = list(self._latency_samples)
+        return samples
+
+    def counts(self):
+        # (frames_in, frames_completed, frames_dropped) so far.
+        with self._stats_lock:
+            return self.frames_in, self.frames_completed, sum(self.drops.values())
+
+    def queue_fill(self):
+        # {stage: share of its input queue in use}.
+        return {stage: stage_queue.qsize() / self.queue_size for stage, stage_queue in self._queues.items()}
+
+    def stats(self):
+        with self._stats_lock:
+            times = self._completion_times
+            span = time.monotonic() - times[0] if times else 0.0
+            latencies = np.array(self._latency_samples) if self._latency_samples else None
+            return {
+                "frames_in": self.frames_in,
+                "frames_completed": self.frames_completed,
+                "frames_dropped": sum(self.drops.values()),
+                "drops": {f"{stage}:{reason}": count for (stage, reason), count in self.drops.items()},
+                "decisions": dict(self.decisions),
+                "last_decision": self.last_decision,
+                "throughput_fps": len(times) / span if span > 0 else 0.0,
+                "latency_p50_ms": float(np.percentile(latencies, 50)) if latencies is not None else 0.0,
+                "latency_p95_ms": float(np.percentile(latencies, 95)) if latencies is not None else 0.0,
+                "latency_max_ms": float(latencies.max()) if latencies is not None else 0.0,
+            }
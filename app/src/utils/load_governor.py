@@ -0,0 +1,157 @@
+import threading
+import time
+
+import numpy as np
+
+import config
+
+
+class LoadGovernor:
+    # Keeps production latency bounded when the line produces more frames than
+    # the pipeline can classify. Every LOAD_GOVERNOR_INTERVAL_S it looks at
+    # what happened since the last check: the share of frames dropped, the p95
+    # end-to-end latency of the frames completed and how full the stage queues
+    # are. Overload that lasts LOAD_GOVERNOR_STEP_DOWN_AFTER_S moves one step
+    # down LOAD_GOVERNOR_LEVELS (a lower frame rate into the pipeline, then a
+    # lower processing resolution); clear headroom that lasts the longer
+    # LOAD_GOVERNOR_STEP_UP_AFTER_S moves one step back up. Each change is
+    # printed and written to the journal as a "governor" record with its
+    # reason and the metrics behind it.
+    # The camera itself keeps running at CAMERA_FPS / CAMERA_RESOLUTION_*, so
+    # the live preview and recordings are unaffected; only the frames handed
+    # to the pipeline are thinned out and downscaled.
+
+    def __init__(self, acquisition_worker, pipeline, journal=None, base_fps=None, levels=None):
+        self.acquisition_worker = acquisition_worker
+        self.pipeline = pipeline
+        self.journal = journal
+        self.base_fps = base_fps or acquisition_worker.fps or config.CAMERA_FPS
+        self.levels = list(levels or config.LOAD_GOVERNOR_LEVELS)
+        self.level = 0
+        self.steps_down = 0
+        self.steps_up = 0
+        self.last_reason = None
+        self._overloaded_since = None
+        self._underloaded_since = None
+        self._last_counts = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Lifecycle ---
+    def start(self):
+        self._stop_event.clear()
+        self._last_counts = self.pipeline.counts()
+        self._thread = threading.Thread(target=self._run, name="LoadGovernor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(config.LOAD_GOVERNOR_INTERVAL_S):
+            try:
+                self.check(time.monotonic())
+            except Exception as e:
+                print(f"Load governor check failed: {e}")
+
+    # --- Evaluation ---
+    def measure(self):
+        # Metrics over the frames seen since the previous call.
+        counts = self.pipeline.counts()
+        frames_in, completed, dropped = (now - before for now, before in zip(counts, self._last_counts))
+        self._last_counts = counts
+        recent = self.pipeline.stage_latency_samples()["end_to_end"][-completed:] if completed else []
+        return {
+            "frames_in": frames_in,
+            "frames_completed": completed,
+            "frames_dropped": dropped,
+            # Drops can include frames that arrived before this window
+            "drop_rate": min(dropped / frames_in, 1.0) if frames_in else 0.0,
+            "latency_p95_ms": float(np.percentile(recent, 95)) if recent else 0.0,
+            "queue_fill": max(self.pipeline.queue_fill().values(), default=0.0),
+        }
+
+    def classify(self, metrics):
+        # ("overload" | "headroom" | "steady", reason).
+        target_ms = config.LOAD_GOVERNOR_TARGET_LATENCY_MS
+        if metrics["drop_rate"] > config.LOAD_GOVERNOR_MAX_DROP_RATE:
+            return "overload", f"{metrics['drop_rate']:.0%} of frames dropped"
+        if metrics["latency_p95_ms"] > target_ms:
+            return "overload", f"p95 latency {metrics['latency_p95_ms']:.0f} ms over the {target_ms} ms target"
+        if metrics["queue_fill"] >= config.LOAD_GOVERNOR_MAX_QUEUE_FILL:
+            return "overload", f"stage queues {metrics['queue_fill']:.0%} full"
+        if (not metrics["frames_dropped"] and metrics["queue_fill"] < config.LOAD_GOVERNOR_MAX_QUEUE_FILL / 2
+                and metrics["latency_p95_ms"] < target_ms * config.LOAD_GOVERNOR_RECOVER_BELOW):
+            return "headroom", (f"no drops, p95 latency {metrics['latency_p95_ms']:.0f} ms "
+                                f"under {config.LOAD_GOVERNOR_RECOVER_BELOW:.0%} of the target")
+        return "steady", None
+
+    def check(self, now):
+        metrics = self.measure()
+        if not metrics["frames_in"]:
+            return # Nothing arrived (source paused or ended); hold the current level
+        state, reason = self.classify(metrics)
+        if state == "overload":
+            self._underloaded_since = None
+            if self._overloaded_since is None:
+                self._overloaded_since = now
+            if now - self._overloaded_since >= config.LOAD_GOVERNOR_STEP_DOWN_AFTER_S and self.level < len(self.levels) - 1:
+                self.set_level(self.level + 1, f"overload: {reason}", metrics)
+        elif state == "headroom":
+            self._overloaded_since = None
+            if self._underloaded_since is None:
+                self._underloaded_since = now
+            if now - self._underloaded_since >= config.LOAD_GOVERNOR_STEP_UP_AFTER_S and self.level > 0:
+                self.set_level(self.level - 1, f"recovered: {reason}", metrics)
+        else:
+            self._overloaded_since = self._underloaded_since = None
+
+    def set_level(self, level, reason="manual", metrics=None):
+        previous = self.level
+        fps_factor, resolution_scale = self.levels[level]
+        self.acquisition_worker.set_listener_fps(0 if fps_factor >= 1.0 else self.base_fps * fps_factor)
+        self.pipeline.set_frame_scale(resolution_scale)
+        self.level = level
+        if level > previous:
+            self.steps_down += 1
+        elif level < previous:
+            self.steps_up += 1
+        self.last_reason = reason
+        # Each step has to prove itself over a full hold period before the next.
+        self._overloaded_since = self._underloaded_since = None
+        self._last_counts = self.pipeline.counts()
+        print(f"Load governor: level {previous} -> {level} ({self.describe()}); {reason}")
+        if self.journal is not None:
+            record = {"level": level, "previous_level": previous, "fps": round(self.effective_fps, 2),
+                      "resolution_scale": resolution_scale, "reason": reason}
+            if metrics is not None:
+                record.update({key: round(value, 4) if isinstance(value, float) else value
+                               for key, value in metrics.items()})
+            self.journal.append("governor", record)
+
+    # --- Reporting ---
+    @property
+    def effective_fps(self):
+        return self.base_fps * self.levels[self.level][0]
+
+    def describe(self):
+        fps_factor, resolution_scale = self.levels[self.level]
+        if fps_factor >= 1.0 and resolution_scale >= 1.0:
+            return "full rate"
+        height, width = self.pipeline.scaled_size(resolution_scale)
+        return f"{self.effective_fps:.0f} fps at {width}x{height}"
+
+    def stats(self):
+        _, resolution_scale = self.levels[self.level]
+        return {
+            "governor_level": self.level,
+            "governor_fps": round(self.effective_fps, 2),
+            "governor_resolution_scale": resolution_scale,
+            "governor_steps_down": self.steps_down,
+            "governor_steps_up": self.steps_up,
+            "governor_frames_skipped": self.acquisition_worker.frames_decimated,
+        }
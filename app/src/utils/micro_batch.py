@@ -0,0 +1,126 @@
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import config
+
+
+class MicroBatchScheduler:
+    # Groups single-frame classification requests into batches. A batch is
+    # dispatched when it reaches max_batch_size or when its oldest request
+    # has waited max_wait_ms, whichever comes first, so batching never adds
+    # more than max_wait_ms of latency. submit() returns a
+    # concurrent.futures.Future resolved with that input's score. The caller
+    # must leave the input array untouched until the future is done.
+    # predict_batch(inputs) takes an (N, *input_shape) float32 array and returns N
+    # scores; it always runs on the scheduler's own thread.
+
+    def __init__(self, predict_batch, input_shape, max_batch_size=None, max_wait_ms=None, name="classifier"):
+        self.predict_batch = predict_batch
+        self.name = name
+        self.max_batch_size = max_batch_size or config.CLASSIFIER_MAX_BATCH_SIZE
+        self.max_wait_ms = config.CLASSIFIER_MAX_BATCH_WAIT_MS if max_wait_ms is None else max_wait_ms
+        self._batch = np.empty((self.max_batch_size,) + tuple(input_shape), dtype=np.float32)
+        self._requests = queue.SimpleQueue()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="MicroBatchScheduler", daemon=True)
+        self._thread.start()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.batches = 0
+            self.frames = 0
+            self.failures = 0
+            self._batch_sizes = collections.Counter()
+            self._wait_ms_total = 0.0
+            self._predict_ms_total = 0.0
+
+    def submit(self, inputs):
+        future = Future()
+        self._requests.put((inputs, future, time.monotonic()))
+        return future
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            pending = [request]
+            dispatch_at = request[2] + self.max_wait_ms / 1000.0
+            while len(pending) < self.max_batch_size:
+                timeout = dispatch_at - time.monotonic()
+                try:
+                    request = self._requests.get(timeout=timeout) if timeout > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._requests.put(None) # Finish this batch, then stop
+                    break
+                pending.append(request)
+            self._dispatch(pending)
+
+    def _dispatch(self, pending):
+        count = len(pending)
+        started = time.monotonic()
+        for index, (inputs, future, _) in enumerate(pending):
+            np.copyto(self._batch[index], inputs)
+        try:
+            scores = self.predict_batch(self._batch[:count])
+        except Exception as e:
+            with self._stats_lock:
+                self.failures += count
+            for _, future, _ in pending:
+                future.set_exception(e)
+            return
+        finished = time.monotonic()
+        with self._stats_lock:
+            self.batches += 1
+            self.frames += count
+            self._batch_sizes[count] += 1
+            self._wait_ms_total += sum(started - submitted for _, _, submitted in pending) * 1000.0
+            self._predict_ms_total += (finished - started) * 1000.0
+        for (_, future, _), score in zip(pending, scores):
+            future.set_result(float(score))
+
+    def shutdown(self):
+        if not self._stopped:
+            self._stopped = True
+            self._requests.put(None)
+            self._thread.join()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batch_max_size": self.max_batch_size,
+                "batch_max_wait_ms": self.max_wait_ms,
+                "batches": self.batches,
+                "batched_frames": self.frames,
+                "batch_failures": self.failures,
+                "batch_mean_size": round(self.frames / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "batch_mean_wait_ms": round(self._wait_ms_total / self.frames, 2) if self.frames else 0.0,
+                "batch_mean_predict_ms": round(self._predict_ms_total / self.batches, 2) if self.batches else 0.0,
+            }
+
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_classification_scheduler():
+    # Process-wide scheduler in front of the classifier, shared by production
+    # mode and offline classification so both feed the same batches.
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            from app.src.utils.classifier import load_classifier
+            from app.src.utils.preprocess import model_input_shape
+            classifier = load_classifier()
+            _shared_scheduler = MicroBatchScheduler(classifier.predict_batch, model_input_shape(), name=classifier.name)
+        return _shared_scheduler
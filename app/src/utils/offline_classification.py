@@ -0,0 +1,346 @@
+import argparse
+import collections
+import csv
+import datetime
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+import config
+from app.src.utils.classifier import label_for_score, prepare_input
+from app.src.utils.micro_batch import get_classification_scheduler
+from app.src.utils.session_journal import update_image_log_classifications
+
+CLASSIFICATION_LOG_FIELDS = ["filename", "classification", "score", "model", "classified_at"]
+
+
+def classification_log_path(session_id, session_logs_dir=None):
+    # Per-session classification results; the images' classification_log_link.
+    return os.path.join(session_logs_dir or config.SESSION_LOGS_PATH, f"classifications_{session_id}.csv")
+
+
+def _file_fingerprint(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def _record_results(catalog, session_id, results, model):
+    # results: (filename, score, mtime, file_size_bytes). Appends them to the
+    # session's classification log and records them in the catalog; each call
+    # is committed on its own, so an interrupted run keeps what it finished.
+    log_path = classification_log_path(session_id)
+    classified_at = datetime.datetime.now().isoformat()
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    new_log = not os.path.exists(log_path)
+    with open(log_path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new_log:
+            writer.writerow(CLASSIFICATION_LOG_FIELDS)
+        writer.writerows((filename, label_for_score(score), round(score, 4), model, classified_at)
+                         for filename, score, _, _ in results)
+    catalog.record_classifications(
+        session_id, ((filename, label_for_score(score), score, mtime, size) for filename, score, mtime, size in results),
+        model, log_link=log_path)
+
+
+def sync_image_logs(catalog, session_ids=None):
+    # Copies recorded classifications into images_<id>.csv for sessions whose
+    # log is behind the catalog (all such sessions when session_ids is None).
+    pending = set(catalog.unsynced_log_sessions())
+    for session_id in pending if session_ids is None else pending.intersection(session_ids):
+        synced_at = datetime.datetime.now()
+        classifications = {row["filename"]: (row["classification"], row["classification_log_link"])
+                           for row in catalog.find_images(session_id=session_id) if row["classification"]}
+        try:
+            update_image_log_classifications(session_id, classifications)
+        except (IOError, csv.Error) as e:
+            print(f"Warning: Could not update image log of session {session_id}: {e}")
+            continue
+        catalog.mark_logs_synced(session_id, synced_at)
+
+
+def _load_input(path):
+    frame = cv2.imread(path, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise IOError(f"Could not read image {path}")
+    return prepare_input(frame)
+
+
+def classify_session_images(session_id, catalog=None, scheduler=None):
+    # Classifies a session's stored images that have no classification yet
+    # and records the results in the catalog. Reader threads decode and
+    # preprocess images while the shared MicroBatchScheduler batches them, so
+    # a large session is classified at batch throughput rather than one
+    # model call per image. Returns the number of images classified.
+    # For whole archives use ClassificationBackfill, which spreads the work
+    # over worker processes.
+    if catalog is None:
+        from app.src.utils.catalog import get_catalog
+        catalog = get_catalog()
+    scheduler = scheduler or get_classification_scheduler()
+    rows = [row for row in catalog.find_images(session_id=session_id, unclassified=True)
+            if row["path_or_link"] and os.path.exists(row["path_or_link"])]
+    if not rows:
+        return 0
+
+    classified = 0
+    chunk_size = config.CLASSIFY_CHUNK_SIZE # Bounds the decoded inputs held in memory
+    with ThreadPoolExecutor(max_workers=config.CLASSIFY_READER_THREADS, thread_name_prefix="ClassifyReader") as readers:
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            loaded = []
+            for row, future in zip(chunk, [readers.submit(_load_input, row["path_or_link"]) for row in chunk]):
+                try:
+                    loaded.append((row, _file_fingerprint(row["path_or_link"]), future.result()))
+                except Exception as e:
+                    print(f"Warning: Could not classify {row['filename']}: {e}")
+            # Submitted together so the scheduler can form full batches.
+            scored = [(row, fingerprint, scheduler.submit(inputs)) for row, fingerprint, inputs in loaded]
+            results = []
+            for row, (mtime, size), future in scored:
+                try:
+                    results.append((row["filename"], float(future.result()), mtime, size))
+                except Exception as e:
+                    print(f"Warning: Could not classify {row['filename']}: {e}")
+            if results:
+                _record_results(catalog, session_id, results, scheduler.name)
+                classified += len(results)
+    sync_image_logs(catalog, [session_id])
+    print(f"Classified {classified} image(s) from session {session_id}.")
+    return classified
+
+
+# --- Archive Back-fill ---
+_worker_classifier = None
+
+
+def _init_backfill_worker():
+    # One OpenCV thread per process: the parallelism comes from the processes.
+    global _worker_classifier
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # The parent stops the run cleanly
+    cv2.setNumThreads(1)
+    from app.src.utils.classifier import load_classifier
+    _worker_classifier = load_classifier()
+
+
+def _classify_batch(paths):
+    # Runs in a back-fill worker process: decodes and preprocesses a batch of
+    # images and classifies them with a single model call. Returns
+    # (model name, [(score or None, error or None)] in the order of paths).
+    from app.src.utils.preprocess import model_input_shape, preprocessor_for
+    inputs = np.empty((len(paths),) + model_input_shape(), dtype=np.float32)
+    outcomes = [None] * len(paths)
+    loaded = []
+    for index, path in enumerate(paths):
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            outcomes[index] = (None, f"Could not read image {path}")
+            continue
+        preprocessor_for(frame.shape).process(frame, out=inputs[len(loaded)])
+        loaded.append(index)
+    if loaded:
+        for index, score in zip(loaded, _worker_classifier.predict_batch(inputs[:len(loaded)])):
+            outcomes[index] = (float(score), None)
+    return _worker_classifier.name, outcomes
+
+
+class ClassificationBackfill:
+    # Classifies every stored image in the catalog that has not been
+    # classified yet, or whose file changed (mtime or size) since it was,
+    # using CLASSIFY_BACKFILL_WORKERS processes (every core by default).
+    # Images are sent to the workers by path in batches of
+    # CLASSIFY_BACKFILL_BATCH_SIZE; each worker decodes, preprocesses and
+    # classifies a batch with one model call, so only paths and scores cross
+    # process boundaries. At most two batches per worker are in flight.
+    # Results are committed to the catalog and the session's
+    # classifications_<id>.csv as each batch completes, and images_<id>.csv
+    # is updated once a session is done, so a run stopped (or killed) part
+    # way picks up where it left off. run() blocks; start() runs it on a
+    # thread and the progress attributes can be polled meanwhile.
+
+    def __init__(self, session_ids=None, workers=None, batch_size=None, force=False, catalog=None):
+        if catalog is None:
+            from app.src.utils.catalog import get_catalog
+            catalog = get_catalog()
+        self.catalog = catalog
+        self.session_ids = session_ids
+        self.worker_count = workers or config.CLASSIFY_BACKFILL_WORKERS or os.cpu_count() or 1
+        self.batch_size = batch_size or config.CLASSIFY_BACKFILL_BATCH_SIZE
+        self.force = force
+        self.total = 0
+        self.classified = 0
+        self.failed = 0
+        self.skipped = 0
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    # --- Progress ---
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def done(self):
+        return self.classified + self.failed
+
+    def images_per_second(self):
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta_seconds(self):
+        rate = self.images_per_second()
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def stats(self):
+        return {
+            "backfill_images_total": self.total,
+            "backfill_images_classified": self.classified,
+            "backfill_images_failed": self.failed,
+            "backfill_images_skipped": self.skipped,
+            "backfill_workers": self.worker_count,
+            "backfill_images_per_second": round(self.images_per_second(), 1),
+            "backfill_stopped_early": self._stop_event.is_set() and self.done < self.total,
+        }
+
+    # --- Lifecycle ---
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="ClassificationBackfill", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # Finishes the batches already in flight, then returns from run().
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _pending_images(self):
+        # {session_id: [(filename, path, mtime, size)]} of images to classify.
+        self.catalog.import_csv_logs() # Sessions only known from their CSV logs
+        fingerprints = {} if self.force else self.catalog.classification_fingerprints()
+        pending = collections.defaultdict(list)
+        for session_id in self.session_ids or [None]:
+            for row in self.catalog.find_images(session_id=session_id):
+                path = row["path_or_link"]
+                try:
+                    fingerprint = _file_fingerprint(path) if path else None
+                except OSError:
+                    fingerprint = None # Uploaded (a link) or deleted
+                if fingerprint is None:
+                    continue
+                if fingerprints.get((row["session_id"], row["filename"])) == fingerprint:
+                    self.skipped += 1
+                    continue
+                pending[row["session_id"]].append((row["filename"], path) + fingerprint)
+        return pending
+
+    def run(self):
+        self.started_at = time.monotonic()
+        try:
+            sync_image_logs(self.catalog, self.session_ids) # Left behind by an interrupted run
+            pending = self._pending_images()
+            self.total = sum(len(images) for images in pending.values())
+            print(f"Classification back-fill: {self.total} image(s) in {len(pending)} session(s) to classify, "
+                  f"{self.skipped} unchanged, {self.worker_count} worker process(es).")
+            if self.total:
+                self._classify(pending)
+            sync_image_logs(self.catalog, self.session_ids)
+        except Exception as e:
+            self.error = e
+            print(f"Classification back-fill failed: {e}")
+        finally:
+            self.finished_at = time.monotonic()
+        print(f"Classification back-fill {'stopped' if self._stop_event.is_set() else 'finished'}: "
+              f"{self.classified} classified, {self.failed} failed, {self.images_per_second():.1f} images/s.")
+        return self.stats()
+
+    def _classify(self, pending):
+        batches = ((session_id, images[start:start + self.batch_size])
+                   for session_id, images in pending.items()
+                   for start in range(0, len(images), self.batch_size))
+        remaining = {session_id: len(images) for session_id, images in pending.items()}
+        in_flight = {}
+        # Spawned, not forked: forking a process that runs Qt and camera threads is unsafe.
+        with ProcessPoolExecutor(max_workers=self.worker_count, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_backfill_worker) as executor:
+            while True:
+                while not self._stop_event.is_set() and len(in_flight) < 2 * self.worker_count:
+                    batch = next(batches, None)
+                    if batch is None:
+                        break
+                    session_id, images = batch
+                    in_flight[executor.submit(_classify_batch, [path for _, path, _, _ in images])] = batch
+                if not in_flight:
+                    return
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    session_id, images = in_flight.pop(future)
+                    self._batch_done(session_id, images, future)
+                    remaining[session_id] -= len(images)
+                    if not remaining[session_id]:
+                        sync_image_logs(self.catalog, [session_id])
+
+    def _batch_done(self, session_id, images, future):
+        try:
+            model, outcomes = future.result()
+        except Exception as e:
+            print(f"Warning: Could not classify a batch of session {session_id}: {e}")
+            self.failed += len(images)
+            return
+        results = []
+        for (filename, _, mtime, size), (score, error) in zip(images, outcomes):
+            if error is None:
+                results.append((filename, score, mtime, size))
+            else:
+                print(f"Warning: Could not classify {filename}: {error}")
+                self.failed += 1
+        if results:
+            _record_results(self.catalog, session_id, results, model)
+            self.classified += len(results)
+
+
+# --- Command Line Tooling ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Classify every unclassified (or changed) stored image.")
+    parser.add_argument("--session", action="append", dest="sessions", help="Only this session (repeatable)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CLASSIFY_BACKFILL_WORKERS, else every core)")
+    parser.add_argument("--batch-size", type=int, help="Images per model call")
+    parser.add_argument("--force", action="store_true", help="Reclassify images that already have a classification")
+    args = parser.parse_args(argv)
+
+    from app.src.utils.catalog import SessionCatalog
+    catalog = SessionCatalog()
+    backfill = ClassificationBackfill(session_ids=args.sessions, workers=args.workers, batch_size=args.batch_size,
+                                      force=args.force, catalog=catalog)
+    signal.signal(signal.SIGINT, lambda signum, frame: backfill.stop())
+    try:
+        backfill.start()
+        next_report = time.monotonic() + 10.0
+        while backfill.running:
+            backfill.join(0.5)
+            if time.monotonic() >= next_report and backfill.total:
+                eta = backfill.eta_seconds()
+                print(f"{backfill.done}/{backfill.total} images, {backfill.images_per_second():.1f} images/s"
+                      + (f", about {eta / 60.0:.0f} min left" if eta is not None else ""))
+                next_report += 10.0
+        return 1 if backfill.error is not None or backfill.failed else 0
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import threading
+
+import cv2
+import numpy as np
+
+import config
+
+_CV2_ROTATIONS = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+class FramePreprocessor:
+    # Turns BGR uint8 frames into model-ready float32 tensors:
+    #   rotate -> ROI crop -> resize -> color conversion -> normalize
+    # All intermediate and output buffers are allocated once, in __init__;
+    # process() only writes into them (cv2 dst= / NumPy out=), so the hot
+    # loop does no per-frame allocation.
+    # The ROI is given in rotated-frame coordinates, but the work is done in
+    # the cheapest order: the ROI is mapped back onto the unrotated frame and
+    # cropped as a view, resized, and only the small result is rotated.
+    # Frames from a FrameSource already have CAMERA_ROTATION_OPTION applied,
+    # so rotation_degrees defaults to 0; pass it for raw sensor frames.
+    # Not thread-safe: use one instance per thread.
+
+    def __init__(self, frame_shape, output_size=None, rotation_degrees=0, roi=None, color=None,
+                 mean=None, std=None, layout=None):
+        self.frame_shape = tuple(frame_shape)
+        self.output_width, self.output_height = output_size or config.CLASSIFIER_INPUT_SIZE
+        self.rotation_degrees = rotation_degrees % 360
+        if self.rotation_degrees not in (0, 90, 180, 270):
+            raise ValueError(f"Rotation must be a multiple of 90 degrees, got {rotation_degrees}.")
+        self.color = color or config.PREPROCESS_COLOR
+        if self.color not in ("bgr", "rgb", "gray"):
+            raise ValueError(f"Unknown color conversion '{self.color}'.")
+        self.layout = layout or config.PREPROCESS_LAYOUT
+        if self.layout not in ("hwc", "chw"):
+            raise ValueError(f"Unknown tensor layout '{self.layout}'.")
+        channels = 1 if self.color == "gray" else 3
+
+        source_height, source_width = self.frame_shape[:2]
+        rotated_width, rotated_height = (source_height, source_width) if self.rotation_degrees in (90, 270) else (source_width, source_height)
+        roi = roi if roi is not None else config.PREPROCESS_ROI
+        self.roi = tuple(roi) if roi else (0, 0, rotated_width, rotated_height)
+        x, y, w, h = self.roi
+        if x < 0 or y < 0 or w <= 0 or h <= 0 or x + w > rotated_width or y + h > rotated_height:
+            raise ValueError(f"ROI {self.roi} does not fit a {rotated_width}x{rotated_height} frame.")
+        self._source_rows, self._source_cols = self._roi_in_source(x, y, w, h, source_height, source_width)[self.rotation_degrees]
+
+        # Resize straight to the pre-rotation output size, then rotate the small image.
+        if self.rotation_degrees in (90, 270):
+            self._resize_size = (self.output_height, self.output_width)
+        else:
+            self._resize_size = (self.output_width, self.output_height)
+        self._resized = np.empty((self._resize_size[1], self._resize_size[0], 3), dtype=np.uint8)
+        self._rotated = np.empty((self.output_height, self.output_width, 3), dtype=np.uint8) if self.rotation_degrees else self._resized
+        self._converted = np.empty((self.output_height, self.output_width), dtype=np.uint8) if self.color == "gray" else self._rotated
+
+        # Normalization folded into one multiply-add: (x / 255 - mean) / std
+        mean = np.asarray(config.PREPROCESS_MEAN if mean is None else mean, dtype=np.float32)[:channels]
+        std = np.asarray(config.PREPROCESS_STD if std is None else std, dtype=np.float32)[:channels]
+        self._scale = (1.0 / (255.0 * std)).astype(np.float32)
+        self._offset = (-mean / std).astype(np.float32)
+        if self.color == "gray":
+            self._scale, self._offset = self._scale[0], self._offset[0]
+        self.output_shape = model_input_shape((self.output_width, self.output_height), self.color, self.layout)
+        self._output = np.empty(self.output_shape, dtype=np.float32)
+
+    @staticmethod
+    def _roi_in_source(x, y, w, h, source_height, source_width):
+        # Maps an (x, y, w, h) ROI on the clockwise-rotated frame to row/column
+        # slices of the unrotated frame.
+        return {
+            0: (slice(y, y + h), slice(x, x + w)),
+            90: (slice(source_height - x - w, source_height - x), slice(y, y + h)),
+            180: (slice(source_height - y - h, source_height - y), slice(source_width - x - w, source_width - x)),
+            270: (slice(x, x + w), slice(source_width - y - h, source_width - y)),
+        }
+
+    def process(self, frame, out=None):
+        # Returns `out` (or the internal output buffer) holding the tensor.
+        if out is None:
+            out = self._output
+        crop = frame[self._source_rows, self._source_cols] # A view, not a copy
+        cv2.resize(crop, self._resize_size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        if self.rotation_degrees:
+            cv2.rotate(self._resized, _CV2_ROTATIONS[self.rotation_degrees], dst=self._rotated)
+
+        if self.color == "gray":
+            cv2.cvtColor(self._rotated, cv2.COLOR_BGR2GRAY, dst=self._converted)
+            pixels = self._converted[..., None] if self.layout == "hwc" else self._converted[None]
+        elif self.color == "rgb":
+            pixels = self._rotated[..., ::-1] # Channel swap as a view, fused into the multiply below
+        else:
+            pixels = self._rotated
+        if self.layout == "chw" and self.color != "gray":
+            pixels = pixels.transpose(2, 0, 1)
+            scale, offset = self._scale[:, None, None], self._offset[:, None, None]
+        else:
+            scale, offset = self._scale, self._offset
+        np.multiply(pixels, scale, out=out, casting="unsafe")
+        np.add(out, offset, out=out)
+        return out
+
+
+def model_input_shape(output_size=None, color=None, layout=None):
+    width, height = output_size or config.CLASSIFIER_INPUT_SIZE
+    channels = 1 if (color or config.PREPROCESS_COLOR) == "gray" else 3
+    if (layout or config.PREPROCESS_LAYOUT) == "chw":
+        return (channels, height, width)
+    return (height, width, channels)
+
+
+_thread_local = threading.local()
+
+
+def scaled_roi(scale, roi=None):
+    # The configured ROI (in full-resolution frame coordinates) for a frame
+    # downscaled by `scale`.
+    roi = roi if roi is not None else config.PREPROCESS_ROI
+    if not roi or scale == 1.0:
+        return roi
+    return tuple(int(value * scale) for value in roi)
+
+
+def preprocessor_for(frame_shape, scale=1.0):
+    # Per-thread preprocessor using the configured settings, reused for every
+    # frame of the same shape. `scale` is how far the frame was downscaled
+    # from full resolution (see LoadGovernor), so the ROI can follow it.
+    cache = getattr(_thread_local, "preprocessors", None)
+    if cache is None:
+        cache = _thread_local.preprocessors = {}
+    key = (tuple(frame_shape), scale)
+    preprocessor = cache.get(key)
+    if preprocessor is None:
+        preprocessor = cache[key] = FramePreprocessor(frame_shape, roi=scaled_roi(scale))
+    return preprocessor
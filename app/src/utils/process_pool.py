@@ -0,0 +1,296 @@
+import atexit
+import collections
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import config
+
+
+class WorkerFailedError(RuntimeError):
+    # Set on the futures of tasks a worker was running when it died or hung.
+    pass
+
+
+# --- Worker Side ---
+def _quality_task(frame, params, state):
+    # Cheap per-image quality metrics for data collection: focus (variance
+    # of the Laplacian), mean brightness and the share of clipped pixels.
+    import cv2
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    sharpness = cv2.Laplacian(gray, cv2.CV_32F).var()
+    clipped = int(np.count_nonzero((gray <= 2) | (gray >= 253)))
+    return {
+        "sharpness": round(float(sharpness), 2),
+        "brightness": round(float(gray.mean()), 2),
+        "clipped_fraction": round(clipped / gray.size, 4),
+    }
+
+
+def _classify_task(frame, params, state):
+    # Preprocess and classify one frame, with per-step timings so the
+    # caller can attribute latency to pipeline stages.
+    from app.src.utils.classifier import load_classifier
+    from app.src.utils.preprocess import preprocessor_for
+    if "classifier" not in state:
+        state["classifier"] = load_classifier()
+    started = time.monotonic()
+    inputs = preprocessor_for(frame.shape, params.get("scale", 1.0)).process(frame)
+    preprocessed = time.monotonic()
+    score = state["classifier"].predict_batch(inputs[None])[0]
+    return {
+        "score": float(score),
+        "model": state["classifier"].name,
+        "preprocess_ms": (preprocessed - started) * 1000.0,
+        "model_ms": (time.monotonic() - preprocessed) * 1000.0,
+    }
+
+
+TASKS = {
+    "quality": _quality_task,
+    "classify": _classify_task,
+}
+
+
+def _worker_main(worker_index, shm_name, slot_shape, slot_count, tasks, results):
+    # Entry point of each worker process. Frames are read straight out of the
+    # shared slots; only the task header and the small result dict are pickled.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    slots = np.ndarray((slot_count,) + tuple(slot_shape), dtype=np.uint8, buffer=shm.buf)
+    state = {}
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            task_id, name, slot, (height, width), params = task
+            try:
+                results.put((worker_index, task_id, TASKS[name](slots[slot, :height, :width], params, state), None))
+            except Exception as e:
+                results.put((worker_index, task_id, None, f"{type(e).__name__}: {e}"))
+    finally:
+        del slots
+        shm.close()
+
+
+# --- Parent Side ---
+class FrameProcessPool:
+    # Runs per-frame work (TASKS) in separate worker processes, so image
+    # processing does not compete with the Qt thread for the GIL.
+    # Frames are handed over through a fixed set of multiprocessing
+    # shared_memory slots: submit() copies the frame into a free slot and
+    # sends only (task id, task name, slot, size, params) to a worker. Frames
+    # smaller than frame_shape (e.g. downscaled under load) use the top-left
+    # corner of their slot. The slot is
+    # recycled as soon as the worker's result comes back. submit() returns a
+    # concurrent.futures.Future resolved with the task's result dict, or None
+    # if no slot frees up within `timeout`.
+    # A monitor thread checks worker health: a worker that has exited, or
+    # whose oldest task has run longer than task_timeout_s, is terminated and
+    # restarted, and its in-flight tasks fail with WorkerFailedError.
+
+    def __init__(self, frame_shape, workers=None, slots=None, task_timeout_s=None, name="frames"):
+        self.frame_shape = tuple(frame_shape)
+        self.name = name
+        self.worker_count = workers or config.PROCESS_POOL_WORKERS
+        self.slot_count = slots or config.PROCESS_POOL_SLOTS
+        self.task_timeout_s = task_timeout_s or config.PROCESS_POOL_TASK_TIMEOUT_S
+        frame_bytes = int(np.prod(self.frame_shape))
+        self._shm = shared_memory.SharedMemory(create=True, size=frame_bytes * self.slot_count)
+        self._slots = np.ndarray((self.slot_count,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._free_slots = queue.Queue()
+        for index in range(self.slot_count):
+            self._free_slots.put(index)
+
+        # Spawned, not forked: forking a process that runs Qt and camera threads is unsafe.
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._in_flight = {} # task_id -> (worker_index, slot, future, submitted_at)
+        self._workers = [None] * self.worker_count
+        self._task_queues = [None] * self.worker_count
+        self._stopped = False
+        self.reset_stats()
+        for index in range(self.worker_count):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(target=self._collect_results, name=f"ProcessPool-{name}-results", daemon=True)
+        self._collector.start()
+        self._monitor_stop = threading.Event()
+        self._monitor = threading.Thread(target=self._monitor_workers, name=f"ProcessPool-{name}-monitor", daemon=True)
+        self._monitor.start()
+
+    def reset_stats(self):
+        with self._lock:
+            self.tasks_completed = 0
+            self.task_failures = 0
+            self.worker_restarts = 0
+            self._task_ms = collections.deque(maxlen=config.PRODUCTION_STATS_WINDOW)
+
+    def _start_worker(self, index):
+        self._task_queues[index] = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main, name=f"ProcessPool-{self.name}-{index}",
+            args=(index, self._shm.name, self.frame_shape, self.slot_count, self._task_queues[index], self._results),
+            daemon=True)
+        process.start()
+        self._workers[index] = process
+
+    # --- Submission ---
+    def submit(self, task, frame, timeout=0.0, **params):
+        if task not in TASKS:
+            raise ValueError(f"Unknown process pool task '{task}'.")
+        height, width = frame.shape[:2]
+        if height > self.frame_shape[0] or width > self.frame_shape[1] or frame.shape[2:] != self.frame_shape[2:]:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit the pool's {self.frame_shape} slots.")
+        try:
+            slot = self._free_slots.get(timeout=timeout) if timeout else self._free_slots.get_nowait()
+        except queue.Empty:
+            return None
+        np.copyto(self._slots[slot, :height, :width], frame)
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                self._free_slots.put(slot)
+                return None
+            task_id = next(self._task_ids)
+            worker_index = self._least_busy_worker()
+            self._in_flight[task_id] = (worker_index, slot, future, time.monotonic())
+            self._task_queues[worker_index].put((task_id, task, slot, (height, width), params))
+        return future
+
+    def _least_busy_worker(self):
+        load = collections.Counter(worker_index for worker_index, _, _, _ in self._in_flight.values())
+        return min(range(self.worker_count), key=lambda index: load[index])
+
+    # --- Results and Health ---
+    def _collect_results(self):
+        while True:
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                if self._stopped:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            _, task_id, result, error = message
+            with self._lock:
+                entry = self._in_flight.pop(task_id, None)
+                if entry is None:
+                    continue # Already failed by the monitor
+                _, slot, future, submitted_at = entry
+                if error is None:
+                    self.tasks_completed += 1
+                    self._task_ms.append((time.monotonic() - submitted_at) * 1000.0)
+                else:
+                    self.task_failures += 1
+            self._free_slots.put(slot)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+
+    def _monitor_workers(self):
+        while not self._monitor_stop.wait(config.PROCESS_POOL_HEALTH_CHECK_INTERVAL_S):
+            now = time.monotonic()
+            for index, process in enumerate(self._workers):
+                with self._lock:
+                    oldest = min((submitted_at for worker_index, _, _, submitted_at in self._in_flight.values()
+                                  if worker_index == index), default=None)
+                if not process.is_alive():
+                    self._restart_worker(index, f"worker exited with code {process.exitcode}")
+                elif oldest is not None and now - oldest > self.task_timeout_s:
+                    self._restart_worker(index, f"task exceeded {self.task_timeout_s:.1f} s")
+
+    def _restart_worker(self, index, reason):
+        print(f"Process pool '{self.name}': restarting worker {index} ({reason}).")
+        process = self._workers[index]
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.kill() # Hung in native code
+        process.join(timeout=2.0)
+        with self._lock:
+            if self._stopped:
+                return
+            failed = [(task_id, entry) for task_id, entry in self._in_flight.items() if entry[0] == index]
+            for task_id, _ in failed:
+                del self._in_flight[task_id]
+            self.task_failures += len(failed)
+            self.worker_restarts += 1
+            self._start_worker(index)
+        for _, (_, slot, future, _) in failed:
+            self._free_slots.put(slot)
+            future.set_exception(WorkerFailedError(f"Worker {index} failed: {reason}"))
+
+    # --- Lifecycle ---
+    def shutdown(self):
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            pending = list(self._in_flight.values())
+            self._in_flight.clear()
+        self._monitor_stop.set()
+        self._monitor.join()
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for process in self._workers:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join()
+        for _, _, future, _ in pending:
+            future.set_exception(WorkerFailedError("Process pool shut down."))
+        del self._slots
+        self._shm.close()
+        self._shm.unlink()
+
+    def stats(self):
+        with self._lock:
+            task_ms = np.array(self._task_ms) if self._task_ms else None
+            return {
+                "pool_workers": self.worker_count,
+                "pool_workers_alive": sum(1 for process in self._workers if process.is_alive()),
+                "pool_worker_restarts": self.worker_restarts,
+                "pool_tasks_completed": self.tasks_completed,
+                "pool_task_failures": self.task_failures,
+                "pool_slots_in_use": len(self._in_flight),
+                "pool_slot_count": self.slot_count,
+                "pool_task_p50_ms": float(np.percentile(task_ms, 50)) if task_ms is not None else 0.0,
+                "pool_task_p95_ms": float(np.percentile(task_ms, 95)) if task_ms is not None else 0.0,
+            }
+
+
+_shared_pools = {}
+_shared_pools_lock = threading.Lock()
+
+
+def get_process_pool(frame_shape):
+    # Process-wide pool for frames of this shape, shared by data collection
+    # and production mode. Workers start once and live until the app exits.
+    frame_shape = tuple(frame_shape)
+    with _shared_pools_lock:
+        pool = _shared_pools.get(frame_shape)
+        if pool is None:
+            if not _shared_pools:
+                atexit.register(shutdown_process_pools)
+            pool = _shared_pools[frame_shape] = FrameProcessPool(frame_shape)
+        return pool
+
+
+def shutdown_process_pools():
+    with _shared_pools_lock:
+        pools = list(_shared_pools.values())
+        _shared_pools.clear()
+    for pool in pools:
+        pool.shutdown()
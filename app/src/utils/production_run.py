@@ -0,0 +1,172 @@
+import datetime
+
+import config
+from app.src.utils.frame_buffer import FrameRingBuffer
+from app.src.utils.acquisition import FrameAcquisitionWorker
+from app.src.utils.frame_sources import create_frame_source
+from app.src.utils.classifier import classifier_name
+from app.src.utils.micro_batch import get_classification_scheduler
+from app.src.utils.process_pool import get_process_pool
+from app.src.utils.inference_pipeline import InferencePipeline
+from app.src.utils.load_governor import LoadGovernor
+from app.src.utils.session_journal import SessionJournal
+from app.src.utils.catalog import get_catalog
+from app.src.utils.tracing import get_tracer
+
+
+class ProductionRun:
+    # Production line logic without Qt, shared by ProductionModePage and
+    # headless.py: start() opens the camera and journal and starts the
+    # inference pipeline, stop() tears it down and returns the run summary.
+    # Between the two, ring_buffer holds the live frames and pipeline_stats()
+    # / model_stats() feed the displays.
+
+    def __init__(self):
+        self.run_id = None
+        self.run_start_time = None
+        self.permission_level = "N/A"
+        self.run_journal = None
+        self.ring_buffer = None
+        self.acquisition_worker = None
+        self.pipeline = None
+        self.governor = None
+        self.scheduler = None
+        self.process_pool = None
+        self.model_name = None
+
+    @property
+    def running(self):
+        return self.pipeline is not None
+
+    def start(self, permission_level="N/A", frame_source=None):
+        # Raises if the frame source cannot be opened or the run cannot be set
+        # up; in the latter case the source is released and nothing is left
+        # half started, so the camera is free for the next attempt.
+        if self.pipeline is not None:
+            return
+        frame_source = frame_source or create_frame_source()
+        frame_source.open()
+        try:
+            self._start_run(permission_level, frame_source)
+        except Exception as e:
+            self._abort_start(frame_source, e)
+            raise
+
+    def _start_run(self, permission_level, frame_source):
+        self.run_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.run_start_time = datetime.datetime.now()
+        self.permission_level = permission_level
+        if config.PRODUCTION_USE_PROCESS_POOL:
+            self.process_pool = get_process_pool(frame_source.frame_shape)
+            self.process_pool.reset_stats()
+            self.model_name = f"{classifier_name()} ({self.process_pool.worker_count} processes)"
+        else:
+            if self.scheduler is None:
+                self.scheduler = get_classification_scheduler()
+            self.scheduler.reset_stats()
+            self.model_name = self.scheduler.name
+
+        run_start_record = {
+            "session_id": self.run_id,
+            "mode": "Production",
+            "permission_level": self.permission_level,
+            "start_time": self.run_start_time.isoformat(),
+            "data_storage_mode": "Offline" if config.DATA_STORAGE_FLAG == 1 else "Online", #
+            "model": self.model_name,
+        }
+        self.run_journal = SessionJournal(self.run_id)
+        self.run_journal.append("session_start", run_start_record)
+        get_tracer().start_session()
+        get_catalog().upsert_session(run_start_record)
+
+        height, width = frame_source.frame_shape[:2]
+        if self.ring_buffer is None or self.ring_buffer.frame_shape[:2] != (height, width):
+            self.ring_buffer = FrameRingBuffer(config.FRAME_BUFFER_CAPACITY, height, width)
+        else:
+            self.ring_buffer.reset_stats()
+
+        self.pipeline = InferencePipeline(self.ring_buffer.frame_shape, self.scheduler, journal=self.run_journal,
+                                          process_pool=self.process_pool).start()
+        self.acquisition_worker = FrameAcquisitionWorker(frame_source, self.ring_buffer)
+        self.acquisition_worker.frame_listeners.append(self.pipeline.on_frame)
+        self.acquisition_worker.start()
+        if config.LOAD_GOVERNOR_ENABLED:
+            self.governor = LoadGovernor(self.acquisition_worker, self.pipeline, journal=self.run_journal).start()
+        print(f"Production run {self.run_id} started. Frame source: {frame_source.describe()}, model: {self.model_name}")
+
+    def _abort_start(self, frame_source, error):
+        if self.governor is not None:
+            self.governor.stop()
+        if self.acquisition_worker is not None:
+            self.acquisition_worker.stop() # Releases the source
+        else:
+            try:
+                frame_source.release()
+            except Exception as e:
+                print(f"Warning: Error releasing frame source: {e}")
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        if self.run_journal is not None:
+            self.run_journal.append("session_end", {"session_id": self.run_id, "start_error": str(error)})
+            self.run_journal.close()
+        print(f"Production run {self.run_id} could not start: {error}")
+        self.acquisition_worker = None
+        self.governor = None
+        self.pipeline = None
+        self.process_pool = None
+        self.run_journal = None
+        self.run_id = None
+
+    @property
+    def source_exhausted(self):
+        return self.acquisition_worker is not None and self.acquisition_worker.source_exhausted
+
+    def pipeline_stats(self):
+        return self.pipeline.stats()
+
+    def model_stats(self):
+        return self.process_pool.stats() if self.process_pool is not None else self.scheduler.stats()
+
+    def stop(self):
+        # Returns the run summary (None if no run was active).
+        if self.pipeline is None:
+            return None
+        if self.governor is not None:
+            self.governor.stop()
+        self.acquisition_worker.stop()
+        self.pipeline.stop()
+
+        run_end_time = datetime.datetime.now()
+        stats = self.pipeline.stats()
+        run_summary = {
+            "session_id": self.run_id,
+            "mode": "Production",
+            "permission_level": self.permission_level,
+            "start_time": self.run_start_time.isoformat(),
+            "end_time": run_end_time.isoformat(),
+            "total_duration_seconds": int((run_end_time - self.run_start_time).total_seconds()),
+            "images_captured": 0,
+            "data_storage_mode": "Offline" if config.DATA_STORAGE_FLAG == 1 else "Online", #
+            "model": self.model_name,
+        }
+        run_summary.update(self.ring_buffer.stats())
+        run_summary.update(stats)
+        run_summary.update(self.model_stats())
+        if self.governor is not None:
+            run_summary.update(self.governor.stats())
+        self.run_journal.append("session_end", run_summary)
+        self.run_journal.close()
+        latency_path = get_tracer().end_session(self.run_id)
+        if latency_path:
+            print(f"Latency histograms saved to: {latency_path}")
+        get_catalog().upsert_session(run_summary)
+        print(f"Production run {self.run_id} ended. Decisions: {stats['frames_completed']}, dropped: {stats['frames_dropped']} {stats['drops']}, "
+              f"latency p50/p95: {stats['latency_p50_ms']:.1f}/{stats['latency_p95_ms']:.1f} ms.")
+
+        self.acquisition_worker = None
+        self.governor = None
+        self.pipeline = None
+        self.process_pool = None # Shared pool; left running for the next run
+        self.run_journal = None
+        self.run_id = None
+        return run_summary
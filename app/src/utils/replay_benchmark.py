@@ -0,0 +1,360 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+import config
+from app.src.utils.acquisition import FrameAcquisitionWorker
+from app.src.utils.frame_buffer import FrameRingBuffer
+from app.src.utils.frame_sources import ReplayFrameSource
+from app.src.utils.image_writer import ImageWriterPool
+from app.src.utils.inference_pipeline import InferencePipeline
+from app.src.utils.micro_batch import get_classification_scheduler
+
+# Metrics compared between runs: (path in the run file, True if higher is better)
+COMPARED_METRICS = [
+    ("results.throughput_fps", True),
+    ("results.frames_dropped", False),
+    ("results.pipeline_frames_dropped", False),
+    ("results.storage_refused", False),
+    ("results.latency.end_to_end.p50", False),
+    ("results.latency.end_to_end.p95", False),
+    ("results.latency.end_to_end.p99", False),
+    ("results.latency.preprocess.p95", False),
+    ("results.latency.model.p95", False),
+    ("results.storage.encode_ms.p95", False),
+    ("results.storage.write_ms.p95", False),
+    ("results.cpu_percent", False),
+    ("results.rss_peak_mb", False),
+]
+
+
+class ResourceSampler(threading.Thread):
+    # Samples this process's CPU time and resident memory while a benchmark
+    # runs. Uses psutil when it is installed, /proc or resource otherwise.
+
+    def __init__(self, interval_s=0.1):
+        super().__init__(name="ResourceSampler", daemon=True)
+        self.interval_s = interval_s
+        self.rss_peak_bytes = 0
+        self.rss_last_bytes = 0
+        self._stop_event = threading.Event()
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def cpu_time_s(self):
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        times = os.times()
+        return times.user + times.system
+
+    def rss_bytes(self):
+        if self._process is not None:
+            return self._process.memory_info().rss
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, AttributeError):
+            try:
+                import resource
+                return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Peak only, in KiB on Linux
+            except ImportError:
+                return 0
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.rss_last_bytes = self.rss_bytes()
+            self.rss_peak_bytes = max(self.rss_peak_bytes, self.rss_last_bytes)
+            self._stop_event.wait(self.interval_s)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentiles(samples):
+    if not len(samples):
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": int(values.size), "mean": round(float(values.mean()), 3), "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3), "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+
+
+def software_version():
+    if config.APP_VERSION:
+        return config.APP_VERSION
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=config.PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+class ReplayBenchmark:
+    # Replays a recorded data collection session through the production path:
+    # acquisition worker -> inference pipeline (micro-batched classifier) and,
+    # in parallel, the image writer (every frame encoded and written to a
+    # scratch directory, deleted afterwards). realtime=True keeps the recorded
+    # frame timing; False feeds frames as fast as they can be read.
+    # run() returns a result dict that save_run() writes as a run file.
+
+    def __init__(self, session_id, realtime=True, include_storage=True, output_dir=None):
+        self.session_id = session_id
+        self.realtime = realtime
+        self.include_storage = include_storage
+        self.output_dir = output_dir or config.BENCHMARK_RESULTS_PATH
+        self.progress = (0, 0) # (frames acquired, frames in the recording)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        source = ReplayFrameSource(self.session_id, realtime=self.realtime, loop=False)
+        source.open()
+        total_frames = len(source.frames)
+        height, width = source.frame_shape[:2]
+        ring_buffer = FrameRingBuffer(config.FRAME_BUFFER_CAPACITY, height, width)
+        scheduler = get_classification_scheduler()
+        scheduler.reset_stats()
+
+        scratch_dir = os.path.join(self.output_dir, "_scratch")
+        pipeline = writer = worker = None
+        sampler = ResourceSampler()
+        storage_samples = {"encode_ms": [], "write_ms": []}
+        samples_lock = threading.Lock()
+
+        def record_storage(result):
+            if not result["error"]:
+                with samples_lock:
+                    storage_samples["encode_ms"].append(result["encode_ms"])
+                    storage_samples["write_ms"].append(result["write_ms"])
+
+        def store_frame(frame, sequence, acquired_at):
+            writer.submit(frame, os.path.join(scratch_dir, f"frame_{sequence:06d}.png"), on_done=record_storage, block=False)
+
+        # Everything started below is stopped again in the finally block,
+        # whether the run completes, is cancelled or raises.
+        try:
+            pipeline = InferencePipeline(ring_buffer.frame_shape, scheduler, stats_window=total_frames + 1).start()
+            if self.include_storage:
+                os.makedirs(scratch_dir, exist_ok=True)
+                writer = ImageWriterPool(ring_buffer.frame_shape, policy="refuse")
+
+            worker = FrameAcquisitionWorker(source, ring_buffer)
+            worker.frame_listeners.append(pipeline.on_frame)
+            if writer is not None:
+                worker.frame_listeners.append(store_frame)
+
+            cpu_start = sampler.cpu_time_s()
+            sampler.start()
+            started = time.monotonic()
+            worker.start()
+            while worker.is_alive() and not self._cancel.is_set():
+                self.progress = (ring_buffer.frames_acquired, total_frames)
+                time.sleep(0.05)
+            worker.stop()
+            self.progress = (ring_buffer.frames_acquired, total_frames)
+
+            # Let frames already in the pipeline finish (or be dropped).
+            drain_deadline = time.monotonic() + 5.0
+            while time.monotonic() < drain_deadline:
+                stats = pipeline.stats()
+                if stats["frames_completed"] + stats["frames_dropped"] >= stats["frames_in"]:
+                    break
+                time.sleep(0.01)
+            wall_time_s = time.monotonic() - started
+            pipeline.stop()
+            writer_stats = {}
+            if writer is not None:
+                writer.shutdown()
+                writer_stats = writer.stats()
+            cpu_time_s = sampler.cpu_time_s() - cpu_start
+        finally:
+            if worker is not None:
+                worker.stop()
+            else:
+                source.release()
+            if pipeline is not None:
+                pipeline.stop()
+            if writer is not None:
+                writer.shutdown()
+            if sampler.is_alive():
+                sampler.stop()
+            if self.include_storage:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        stats = pipeline.stats()
+        # frames_dropped counts drops on every path: unreadable frames, frames
+        # the pipeline dropped and frames storage refused (a frame can count
+        # on both of the last two). The ring buffer's own drop count is not
+        # included: nothing consumes the ring here, every listener copies.
+        storage_refused = writer_stats.get("captures_refused", 0)
+        drops = dict(stats["drops"])
+        if worker.read_failures:
+            drops["read_failed"] = worker.read_failures
+        if storage_refused:
+            drops["storage_refused"] = storage_refused
+        latency = {stage: percentiles(samples) for stage, samples in pipeline.stage_latency_samples().items()}
+        return {
+            "run_id": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
+            "created": datetime.datetime.now().isoformat(),
+            "app_version": software_version(),
+            "platform": {"python": platform.python_version(), "system": platform.platform(),
+                         "machine": platform.machine(), "cpu_count": os.cpu_count()},
+            "settings": {
+                "session_id": source.session_id,
+                "realtime": self.realtime,
+                "include_storage": self.include_storage,
+                "frame_shape": list(ring_buffer.frame_shape),
+                "classifier": scheduler.name,
+                "batch_max_size": scheduler.max_batch_size,
+                "batch_max_wait_ms": scheduler.max_wait_ms,
+                "queue_size": pipeline.queue_size,
+                "stage_budgets_ms": config.PRODUCTION_STAGE_BUDGETS_MS,
+                "cancelled": self._cancel.is_set(),
+            },
+            "results": {
+                "recorded_frames": total_frames,
+                "frames_acquired": ring_buffer.frames_acquired,
+                "frames_in": stats["frames_in"],
+                "frames_completed": stats["frames_completed"],
+                "frames_dropped": stats["frames_dropped"] + storage_refused + worker.read_failures,
+                "pipeline_frames_dropped": stats["frames_dropped"],
+                "storage_refused": storage_refused,
+                "read_failures": worker.read_failures,
+                "drops": drops,
+                "wall_time_s": round(wall_time_s, 3),
+                "throughput_fps": round(stats["frames_completed"] / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+                "latency": latency,
+                "batching": scheduler.stats(),
+                "storage": dict(writer_stats, **{name: percentiles(values) for name, values in storage_samples.items()}),
+                "cpu_time_s": round(cpu_time_s, 3),
+                "cpu_percent": round(100.0 * cpu_time_s / wall_time_s, 1) if wall_time_s > 0 else 0.0,
+                "rss_peak_mb": round(sampler.rss_peak_bytes / 2 ** 20, 1),
+                "rss_end_mb": round(sampler.rss_last_bytes / 2 ** 20, 1),
+            },
+        }
+
+    def save_run(self, run):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"run_{run['run_id']}_{run['settings']['session_id']}.json")
+        with open(path, "w") as f:
+            json.dump(run, f, indent=2)
+        return path
+
+
+# --- Run Files ---
+def list_runs(output_dir=None):
+    return sorted(glob.glob(os.path.join(output_dir or config.BENCHMARK_RESULTS_PATH, "run_*.json")))
+
+
+def load_run(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _metric(run, dotted_path):
+    value = run
+    for key in dotted_path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_runs(baseline, candidate, tolerance_percent=None):
+    # Returns one row per compared metric; "regression" is True when the
+    # candidate is worse than the baseline by more than tolerance_percent.
+    tolerance_percent = config.BENCHMARK_REGRESSION_TOLERANCE_PERCENT if tolerance_percent is None else tolerance_percent
+    rows = []
+    for dotted_path, higher_is_better in COMPARED_METRICS:
+        before, after = _metric(baseline, dotted_path), _metric(candidate, dotted_path)
+        if before is None or after is None:
+            continue
+        change_percent = (after - before) / before * 100.0 if before else (0.0 if after == before else float("inf"))
+        worse_percent = -change_percent if higher_is_better else change_percent
+        rows.append({
+            "metric": dotted_path[len("results."):],
+            "baseline": before,
+            "candidate": after,
+            "change_percent": round(change_percent, 1),
+            "regression": worse_percent > tolerance_percent and before != after,
+        })
+    return rows
+
+
+def format_run(run):
+    results = run["results"]
+    settings = run["settings"]
+    lines = [
+        f"Run {run['run_id']}  version {run['app_version']}",
+        f"Session {settings['session_id']}, {'original speed' if settings['realtime'] else 'as fast as possible'}, "
+        f"classifier {settings['classifier']}",
+        f"Frames: {results['frames_completed']} completed, {results.get('pipeline_frames_dropped', results['frames_dropped'])} dropped "
+        f"of {results['frames_in']} ({results['recorded_frames']} recorded), "
+        f"{results.get('storage_refused', 0)} not stored, {results.get('read_failures', 0)} unreadable",
+        f"Throughput: {results['throughput_fps']:.1f} frames/s over {results['wall_time_s']:.1f} s",
+        f"CPU: {results['cpu_percent']:.0f}% of one core, RSS peak {results['rss_peak_mb']:.0f} MB",
+        "",
+        f"{'stage':<14}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    timed = dict(results["latency"])
+    timed.update({f"store:{name}": results["storage"][name] for name in ("encode_ms", "write_ms") if name in results["storage"]})
+    for stage, summary in timed.items():
+        lines.append(f"{stage:<14}{summary['p50']:>10.2f}{summary['p95']:>10.2f}{summary['p99']:>10.2f}{summary['max']:>10.2f}")
+    if results["drops"]:
+        lines.append("")
+        lines.append("Drops: " + ", ".join(f"{reason} {count}" for reason, count in sorted(results["drops"].items())))
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'metric':<32}{'baseline':>12}{'candidate':>12}{'change':>10}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['metric']:<32}{row['baseline']:>12.2f}{row['candidate']:>12.2f}{row['change_percent']:>9.1f}%{flag}")
+    return "\n".join(lines)
+
+
+# --- Command Line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the capture/inference/storage path.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Benchmark a recorded session")
+    run_parser.add_argument("--session", help="Session id (default: most recent recording)")
+    run_parser.add_argument("--asap", action="store_true", help="Replay as fast as possible instead of at original speed")
+    run_parser.add_argument("--no-storage", action="store_true", help="Skip the image writer path")
+    compare_parser = subparsers.add_parser("compare", help="Compare two run files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--tolerance", type=float, help="Allowed slowdown in percent")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        benchmark = ReplayBenchmark(args.session, realtime=not args.asap, include_storage=not args.no_storage)
+        run = benchmark.run()
+        print(format_run(run))
+        print(f"\nSaved to {benchmark.save_run(run)}")
+        return 0
+    rows = compare_runs(load_run(args.baseline), load_run(args.candidate), args.tolerance)
+    print(format_comparison(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
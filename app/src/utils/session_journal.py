@@ -0,0 +1,203 @@
+import csv
+import datetime
+import glob
+import json
+import os
+import threading
+
+import config
+
+# Column order of images_<session>.csv
+IMAGE_LOG_FIELDS = [
+    "filename", "path_or_link", "timestamp", "frame_sequence", "acquired_monotonic_s",
+    "file_size_bytes", "encode_ms", "write_ms", "phash", "duplicate_of",
+    "sharpness", "brightness", "clipped_fraction",
+    "classification_placeholder", "classification_log_link_placeholder",
+]
+
+
+def journal_path_for(session_id, session_logs_dir=None):
+    return os.path.join(session_logs_dir or config.SESSION_LOGS_PATH, f"journal_{session_id}.jsonl")
+
+
+class SessionJournal:
+    # Append-only JSON-lines record of a session, written as it happens so a
+    # crash loses at most JOURNAL_FSYNC_INTERVAL_S of data. Writes go to a
+    # buffered file; a background thread flushes and fsyncs dirty data on the
+    # interval, so captures never wait on the disk.
+    # Record types: session_start, capture (queued for writing), image (final
+    # log row) and session_end. Nothing is kept in memory per image.
+
+    def __init__(self, session_id, session_logs_dir=None, fsync_interval_s=None):
+        self.session_id = session_id
+        self.path = journal_path_for(session_id, session_logs_dir)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.fsync_interval_s = config.JOURNAL_FSYNC_INTERVAL_S if fsync_interval_s is None else fsync_interval_s
+        self.image_records = 0
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(self.path):
+            self._file.write("\n") # Seal off a torn record left by a crash
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="SessionJournalFlush", daemon=True)
+        self._flusher.start()
+
+    def append(self, record_type, data):
+        line = json.dumps(dict(data, type=record_type), separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._dirty = True
+            if record_type == "image":
+                self.image_records += 1
+            if not self.fsync_interval_s:
+                self._sync_locked()
+
+    def _sync_locked(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._dirty = False
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.fsync_interval_s or 1.0):
+            with self._lock:
+                if self._dirty and self._file is not None:
+                    try:
+                        self._sync_locked()
+                    except OSError as e:
+                        print(f"Warning: Journal flush failed for {self.path}: {e}")
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_journal(path):
+    # Yields records in order; a torn final line from a crash is skipped.
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def write_session_logs(session_summary, journal_path, session_logs_dir=None):
+    # Writes summary_<id>.csv and streams the journal's image rows into
+    # images_<id>.csv, so memory use does not depend on the session size.
+    session_logs_dir = session_logs_dir or config.SESSION_LOGS_PATH
+    session_id = session_summary["session_id"]
+    session_log_filename = os.path.join(session_logs_dir, f"summary_{session_id}.csv")
+    image_details_log_filename = os.path.join(session_logs_dir, f"images_{session_id}.csv")
+
+    with open(session_log_filename, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(session_summary.keys())
+        writer.writerow(session_summary.values())
+    print(f"Session summary saved to: {session_log_filename}")
+
+    rows_written = 0
+    with open(image_details_log_filename + ".part", 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=IMAGE_LOG_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for record in read_journal(journal_path):
+            if record.get("type") == "image":
+                writer.writerow(record)
+                rows_written += 1
+    if rows_written:
+        os.replace(image_details_log_filename + ".part", image_details_log_filename)
+        print(f"Image details saved to: {image_details_log_filename}")
+    else:
+        os.remove(image_details_log_filename + ".part")
+    return rows_written
+
+
+def recover_unfinished_sessions(session_logs_dir=None):
+    # Finishes sessions whose journal has no session_end record (crash, power
+    # cut): writes their CSV logs from what reached the disk and closes the
+    # journal. Returns the recovered session ids.
+    session_logs_dir = session_logs_dir or config.SESSION_LOGS_PATH
+    recovered = []
+    for journal_path in sorted(glob.glob(os.path.join(session_logs_dir, "journal_*.jsonl"))):
+        start_record = None
+        last_time = None
+        images_logged = 0
+        captures_queued = 0
+        ended = False
+        for record in read_journal(journal_path):
+            record_type = record.get("type")
+            if record_type == "session_start":
+                start_record = record
+            elif record_type == "capture":
+                captures_queued += 1
+                last_time = record.get("timestamp", last_time)
+            elif record_type == "image":
+                images_logged += 1
+                last_time = record.get("timestamp", last_time)
+            elif record_type == "session_end":
+                ended = True
+        if ended or start_record is None:
+            continue
+
+        end_time = last_time or start_record["start_time"]
+        duration = datetime.datetime.fromisoformat(end_time) - datetime.datetime.fromisoformat(start_record["start_time"])
+        session_summary = {
+            "session_id": start_record["session_id"],
+            "mode": start_record.get("mode", "Data Collection"),
+            "permission_level": start_record.get("permission_level", "N/A"),
+            "start_time": start_record["start_time"],
+            "end_time": end_time,
+            "total_duration_seconds": int(duration.total_seconds()),
+            "images_captured": max(images_logged, captures_queued),
+            "data_storage_mode": start_record.get("data_storage_mode", "Offline"),
+            "images_details_count": images_logged,
+            "recovered": True,
+        }
+        try:
+            write_session_logs(session_summary, journal_path, session_logs_dir)
+            journal = SessionJournal(session_summary["session_id"], session_logs_dir)
+            journal.append("session_end", session_summary)
+            journal.close()
+            recovered.append(session_summary["session_id"])
+            print(f"Recovered unfinished session {session_summary['session_id']}: {images_logged} of {session_summary['images_captured']} images logged.")
+        except (IOError, OSError, KeyError, ValueError) as e:
+            print(f"Error recovering session journal {journal_path}: {e}")
+    return recovered
+
+
+def update_image_log_classifications(session_id, classifications, session_logs_dir=None):
+    # Fills classification_placeholder / classification_log_link_placeholder
+    # in images_<id>.csv from {filename: (classification, log_link)}, streaming
+    # the file through a .part copy. Returns the number of rows updated.
+    session_logs_dir = session_logs_dir or config.SESSION_LOGS_PATH
+    image_details_log_filename = os.path.join(session_logs_dir, f"images_{session_id}.csv")
+    if not os.path.exists(image_details_log_filename):
+        return 0
+    rows_updated = 0
+    with open(image_details_log_filename, newline='') as source, \
+            open(image_details_log_filename + ".part", 'w', newline='') as f:
+        reader = csv.DictReader(source)
+        writer = csv.DictWriter(f, fieldnames=reader.fieldnames or IMAGE_LOG_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row in reader:
+            if row.get("filename") in classifications:
+                classification, log_link = classifications[row["filename"]]
+                row["classification_placeholder"] = classification
+                row["classification_log_link_placeholder"] = log_link or "N/A"
+                rows_updated += 1
+            writer.writerow(row)
+    os.replace(image_details_log_filename + ".part", image_details_log_filename)
+    return rows_updated
@@ -0,0 +1,231 @@
+import builtins
+import contextlib
+import datetime
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+
+# Standard library only at module level: app.py imports this before PyQt6 and
+# config, so that their import time is measured too.
+
+PROFILE_FLAG = "--profile-startup"
+PROFILE_ENV_VAR = "APP_PROFILE_STARTUP"
+SUMMARY_TOP_IMPORTS = 25
+
+
+class StartupProfiler:
+    # Records where launch time goes, relative to start():
+    #   imports      per newly loaded module, with self and cumulative time
+    #                (modules loaded via importlib.import_module, and time spent
+    #                waiting for another thread to finish the same import, count
+    #                towards the importing module's self time)
+    #   spans        timed blocks: widget and page construction, stylesheet
+    #                parsing and polishing (widgets a layout sizes while being
+    #                built are polished inside their construction span),
+    #                warm-up tasks (span() / record()); pages first built
+    #                after the report are not in it
+    #   milestones   points in time, e.g. each watched window's first paint
+    # finish() writes startup_<timestamp>.json and a readable .txt summary to
+    # STARTUP_PROFILE_PATH; it runs on the first paint of the window passed
+    # to watch_first_paint(..., finish=True).
+
+    enabled = True
+
+    def __init__(self):
+        self.imports = []
+        self.spans = []
+        self.milestones = []
+        self.finished = False
+        self._started = None
+        self._original_import = None
+        self._stacks = threading.local()
+        self._lock = threading.Lock()
+        self._paint_watchers = []
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+        return self
+
+    def _now_ms(self):
+        return (time.perf_counter() - self._started) * 1000.0
+
+    # --- Imports ---
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        resolved = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            try:
+                resolved = importlib.util.resolve_name("." * level + name, package)
+            except (ImportError, ValueError):
+                pass
+        candidates = [resolved] + [f"{resolved}.{item}" for item in fromlist or () if item != "*"]
+        new = [candidate for candidate in candidates if candidate not in sys.modules]
+        if not new:
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._stacks, "children", None)
+        if stack is None:
+            stack = self._stacks.children = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            cumulative_ms = (time.perf_counter() - started) * 1000.0
+            children_ms = stack.pop()
+            if stack:
+                stack[-1] += cumulative_ms
+            loaded = [candidate for candidate in new if candidate in sys.modules]
+            if loaded and not self.finished:
+                with self._lock:
+                    self.imports.append({
+                        "module": loaded[0] if len(loaded) == 1 else f"{resolved} (+{len(loaded)} from-imports)",
+                        "modules": loaded,
+                        "start_ms": round((started - self._started) * 1000.0, 3),
+                        "self_ms": round(cumulative_ms - children_ms, 3),
+                        "cumulative_ms": round(cumulative_ms, 3),
+                        "depth": len(stack),
+                        "thread": threading.current_thread().name,
+                    })
+
+    # --- Spans and Milestones ---
+    @contextlib.contextmanager
+    def span(self, name, category="widget"):
+        started_ms = self._now_ms()
+        try:
+            yield
+        finally:
+            self.record(name, category, self._now_ms() - started_ms, started_ms)
+
+    def record(self, name, category, duration_ms, start_ms=None):
+        if self.finished:
+            return
+        with self._lock:
+            self.spans.append({"name": name, "category": category,
+                               "start_ms": round(self._now_ms() - duration_ms if start_ms is None else start_ms, 3),
+                               "duration_ms": round(duration_ms, 3)})
+
+    def mark(self, name):
+        if not self.finished:
+            with self._lock:
+                self.milestones.append({"name": name, "at_ms": round(self._now_ms(), 3)})
+
+    def watch_first_paint(self, widget, name, finish=False):
+        # Marks "<name> first paint" when `widget` first paints; with finish,
+        # also writes the report then.
+        from PyQt6.QtCore import QEvent, QObject, QTimer
+
+        profiler = self
+
+        class FirstPaintWatcher(QObject):
+            def eventFilter(self, obj, event):
+                if event.type() == QEvent.Type.Paint:
+                    obj.removeEventFilter(self)
+                    profiler.mark(f"{name} first paint")
+                    if finish:
+                        QTimer.singleShot(0, profiler.finish)
+                return False
+
+        watcher = FirstPaintWatcher(widget)
+        widget.installEventFilter(watcher)
+        self._paint_watchers.append(watcher)
+
+    # --- Report ---
+    def finish(self, directory=None):
+        # Stops recording, writes the report and prints the summary. Returns the JSON path.
+        if self.finished:
+            return None
+        self.mark("report")
+        self.finished = True
+        builtins.__import__ = self._original_import
+        import config
+
+        report = {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "app_version": config.APP_VERSION,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "total_ms": self.milestones[-1]["at_ms"],
+            "milestones": self.milestones,
+            "spans": self.spans,
+            "imports": self.imports,
+        }
+        directory = directory or config.STARTUP_PROFILE_PATH
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"startup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        with open(f"{stem}.json", "w") as f:
+            json.dump(report, f, indent=1)
+        summary = format_summary(report)
+        with open(f"{stem}.txt", "w") as f:
+            f.write(summary + "\n")
+        print(summary)
+        print(f"Startup profile saved to: {stem}.json")
+        return f"{stem}.json"
+
+
+class NullStartupProfiler:
+    # Stand-in when profiling is off: every call is a no-op.
+
+    enabled = False
+    finished = True
+
+    def span(self, name, category="widget"):
+        return contextlib.nullcontext()
+
+    def record(self, name, category, duration_ms, start_ms=None):
+        pass
+
+    def mark(self, name):
+        pass
+
+    def watch_first_paint(self, widget, name, finish=False):
+        pass
+
+    def finish(self, directory=None):
+        return None
+
+
+def format_summary(report, top_imports=SUMMARY_TOP_IMPORTS):
+    lines = [f"Startup profile {report['created']}: {report['total_ms']:.1f} ms until the report was written",
+             "", "Milestones (ms since start):"]
+    lines += [f"  {milestone['at_ms']:9.1f}  {milestone['name']}" for milestone in report["milestones"]]
+
+    lines += ["", "Construction, stylesheet and warm-up (ms):"]
+    for span in sorted(report["spans"], key=lambda span: span["start_ms"]):
+        lines.append(f"  {span['duration_ms']:9.1f}  {span['category']:<10} {span['name']}  (at {span['start_ms']:.1f})")
+
+    imports = report["imports"]
+    top_level = [entry for entry in imports if entry["depth"] == 0]
+    lines += ["", f"Imports: {len(imports)} modules, {sum(entry['cumulative_ms'] for entry in top_level):.1f} ms "
+                  f"in top-level imports", f"Slowest {top_imports} by self time (self / cumulative ms):"]
+    for entry in sorted(imports, key=lambda entry: entry["self_ms"], reverse=True)[:top_imports]:
+        thread = "" if entry["thread"] == "MainThread" else f"  [{entry['thread']}]"
+        lines.append(f"  {entry['self_ms']:9.1f} / {entry['cumulative_ms']:9.1f}  {entry['module']}{thread}")
+    return "\n".join(lines)
+
+
+_profiler = NullStartupProfiler()
+
+
+def start_startup_profiler(argv=None):
+    # Starts profiling when PROFILE_FLAG is in argv (it is removed from argv)
+    # or PROFILE_ENV_VAR is set to anything but "" / "0". Call it before
+    # anything else is imported.
+    global _profiler
+    flagged = argv is not None and PROFILE_FLAG in argv
+    if flagged:
+        argv.remove(PROFILE_FLAG)
+    if flagged or os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0"):
+        if not _profiler.enabled:
+            _profiler = StartupProfiler().start()
+    return _profiler
+
+
+def get_startup_profiler():
+    # The running StartupProfiler, or a NullStartupProfiler.
+    return _profiler
@@ -0,0 +1,135 @@
+import os
+import shutil
+import threading
+import time
+
+import config
+from app.src.utils.startup_profiler import get_startup_profiler
+
+# Work the application does while the splash screen is up. Each task runs on
+# its own thread, so the slow ones (camera SDK, model) overlap each other and
+# the construction of the main window. A task returns a short status string
+# for the splash / log, or raises; a failed task is reported but never stops
+# startup, since the pages handle a missing camera or model themselves.
+
+
+def check_disk():
+    for path in (config.SESSION_LOGS_PATH, config.IMAGE_LOGS_PATH):
+        os.makedirs(path, exist_ok=True)
+    free_gb = shutil.disk_usage(config.IMAGE_LOGS_PATH).free / 1024 ** 3
+    if free_gb < config.STARTUP_MIN_FREE_DISK_GB:
+        raise RuntimeError(f"only {free_gb:.1f} GB free for image logs (minimum {config.STARTUP_MIN_FREE_DISK_GB} GB)")
+    return f"{free_gb:.0f} GB free"
+
+
+def open_catalog():
+    from app.src.utils.catalog import get_catalog
+    from app.src.utils.session_journal import recover_unfinished_sessions
+
+    recovered_session_ids = recover_unfinished_sessions() # Sessions cut short by a crash or power loss
+    catalog = get_catalog()
+    if catalog.created:
+        return f"created; imported {catalog.import_csv_logs()} existing session log(s)"
+    if recovered_session_ids:
+        catalog.import_csv_logs(session_ids=recovered_session_ids)
+        return f"recovered {len(recovered_session_ids)} unfinished session(s)"
+    return "ready"
+
+
+def load_model():
+    # Builds the shared classification scheduler (and so loads the model) that
+    # production mode and session-end classification use.
+    from app.src.utils.micro_batch import get_classification_scheduler
+
+    return get_classification_scheduler().name
+
+
+def open_camera():
+    # Opens the configured source and reads one frame, which loads the camera
+    # SDK and wakes the device; the pages open it again when they need it.
+    import numpy as np
+    from app.src.utils.frame_sources import create_frame_source
+
+    source = create_frame_source()
+    try:
+        source.open()
+        frame = np.empty(source.frame_shape, dtype=np.uint8)
+        if not source.read_into(frame):
+            raise RuntimeError(f"no frame from {source.describe()}")
+        return source.describe()
+    finally:
+        source.release()
+
+
+WARMUP_TASKS = (
+    ("disk", "Checking disk space", check_disk),
+    ("catalog", "Opening session catalog", open_catalog),
+    ("model", "Loading classification model", load_model),
+    ("camera", "Opening camera", open_camera),
+)
+
+
+class StartupWarmup:
+    # Runs the warm-up tasks on background threads. The splash polls status()
+    # for its progress text and done() to know when it may close; results
+    # holds (name, ok, message, seconds) per finished task, in finish order.
+
+    def __init__(self, tasks=None):
+        self.tasks = [task for task in (WARMUP_TASKS if tasks is None else tasks)
+                      if task[0] not in config.STARTUP_WARMUP_SKIP]
+        self.results = []
+        self._running = {}
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._threads = []
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for name, label, function in self.tasks:
+            self._running[name] = label
+            thread = threading.Thread(target=self._run_task, args=(name, function), name=f"Warmup-{name}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        return self
+
+    def _run_task(self, name, function):
+        started = time.monotonic()
+        try:
+            with get_startup_profiler().span(name, "warmup"):
+                message, ok = function() or "", True
+        except Exception as e:
+            message, ok = str(e), False
+            print(f"Warning: Startup task '{name}' failed: {e}")
+        with self._lock:
+            del self._running[name]
+            self.results.append((name, ok, message, time.monotonic() - started))
+
+    def done(self):
+        with self._lock:
+            return not self._running
+
+    def timed_out(self):
+        return (self._started_at is not None
+                and time.monotonic() - self._started_at > config.STARTUP_WARMUP_TIMEOUT_S)
+
+    def status(self):
+        # Progress text: the first unfinished task, with the overall count.
+        with self._lock:
+            if not self._running:
+                return "Ready"
+            label = next(iter(self._running.values()))
+            return f"{label}... ({len(self.results) + 1}/{len(self.tasks)})"
+
+    def failures(self):
+        with self._lock:
+            return [(name, message) for name, ok, message, _ in self.results if not ok]
+
+    def wait(self, timeout=None):
+        for thread in self._threads:
+            thread.join(timeout)
+        return self.done()
+
+    def summary(self):
+        with self._lock:
+            return ", ".join(f"{name} {seconds * 1000.0:.0f} ms" + (f" ({message})" if ok else f" (failed: {message})")
+                             for name, ok, message, seconds in self.results)
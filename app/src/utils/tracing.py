@@ -0,0 +1,160 @@
+import json
+import os
+import threading
+
+import config
+
+TRACE_STAGES = ("acquire", "preprocess", "infer", "display", "encode", "persist")
+
+# Log-linear bucket layout as in HdrHistogram: values (in microseconds) below
+# 2 * _SUB_BUCKET_HALF are counted exactly; above that every power of two is
+# split into _SUB_BUCKET_HALF equal buckets, for ~1.6% worst-case error.
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_HALF = 1 << (_SUB_BUCKET_BITS - 1)
+
+
+def _bucket_index(value_us):
+    if value_us < 2 * _SUB_BUCKET_HALF:
+        return value_us
+    shift = value_us.bit_length() - _SUB_BUCKET_BITS
+    return (shift + 1) * _SUB_BUCKET_HALF + (value_us >> shift) - _SUB_BUCKET_HALF
+
+
+def _bucket_bounds(index):
+    # (lowest, highest) microsecond value counted in a bucket.
+    if index < 2 * _SUB_BUCKET_HALF:
+        return index, index
+    shift = index // _SUB_BUCKET_HALF - 1
+    sub_bucket = index % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+    return sub_bucket << shift, ((sub_bucket + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    # Fixed-size HDR-style latency histogram. record() is a couple of integer
+    # operations and a list increment; percentiles are read from the buckets,
+    # so memory and cost do not grow with the number of samples.
+    # Not thread-safe on its own; FrameTracer serializes access.
+
+    def __init__(self, max_ms=None):
+        self.max_us = int((max_ms or config.TRACING_MAX_LATENCY_MS) * 1000)
+        self.counts = [0] * (_bucket_index(self.max_us) + 1)
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_seen_us = 0
+
+    def record(self, value_ms):
+        value_us = min(max(int(value_ms * 1000.0), 0), self.max_us)
+        self.counts[_bucket_index(value_us)] += 1
+        self.total_count += 1
+        self.total_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_seen_us:
+            self.max_seen_us = value_us
+
+    def percentile(self, percent):
+        # Upper bound of the bucket holding the percentile, in ms.
+        if not self.total_count:
+            return 0.0
+        target = max(1, -(-self.total_count * percent // 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_bounds(index)[1], self.max_seen_us) / 1000.0
+        return self.max_seen_us / 1000.0
+
+    def to_dict(self):
+        return {
+            "count": self.total_count,
+            "min_ms": (self.min_us or 0) / 1000.0,
+            "mean_ms": round(self.total_us / self.total_count / 1000.0, 3) if self.total_count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "p999_ms": self.percentile(99.9),
+            "max_ms": self.max_seen_us / 1000.0,
+            # Non-empty buckets as [lowest value in us, count]
+            "buckets": [[_bucket_bounds(index)[0], count] for index, count in enumerate(self.counts) if count],
+        }
+
+
+class FrameTracer:
+    # Per-stage frame latency histograms (TRACE_STAGES). Producers call
+    # record(stage, ms) with durations they already measure. Two sets of
+    # histograms are kept: one per session, dumped next to the session
+    # summary by end_session(), and a short-lived one behind the live
+    # readout, restarted by each take_recent() call.
+
+    enabled = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session = {stage: LatencyHistogram() for stage in TRACE_STAGES}
+        self._recent = {stage: LatencyHistogram() for stage in TRACE_STAGES}
+
+    def record(self, stage, ms):
+        with self._lock:
+            self._session[stage].record(ms)
+            self._recent[stage].record(ms)
+
+    def start_session(self):
+        with self._lock:
+            self._session = {stage: LatencyHistogram() for stage in TRACE_STAGES}
+
+    def end_session(self, session_id, directory=None):
+        # Writes latency_<session_id>.json and returns its path.
+        with self._lock:
+            histograms = self._session
+            self._session = {stage: LatencyHistogram() for stage in TRACE_STAGES}
+        directory = directory or config.SESSION_LOGS_PATH
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"latency_{session_id}.json")
+        with open(path, "w") as f:
+            json.dump({"session_id": session_id, "stages": {stage: histogram.to_dict()
+                                                            for stage, histogram in histograms.items()}}, f, indent=1)
+        return path
+
+    def take_recent(self):
+        # {stage: (p50_ms, p99_ms)} for stages with samples since the last call.
+        with self._lock:
+            recent = self._recent
+            self._recent = {stage: LatencyHistogram() for stage in TRACE_STAGES}
+        return {stage: (histogram.percentile(50), histogram.percentile(99))
+                for stage, histogram in recent.items() if histogram.total_count}
+
+
+class NullTracer:
+    # Stand-in when TRACING_ENABLED is off: every call is a no-op.
+
+    enabled = False
+
+    def record(self, stage, ms):
+        pass
+
+    def start_session(self):
+        pass
+
+    def end_session(self, session_id, directory=None):
+        return None
+
+    def take_recent(self):
+        return {}
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer():
+    # Process-wide tracer; a NullTracer when tracing is disabled.
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = FrameTracer() if config.TRACING_ENABLED else NullTracer()
+        return _tracer
+
+
+def format_readout(recent):
+    return "  ".join(f"{stage} {p50:.1f}/{p99:.1f}" for stage, (p50, p99) in recent.items())
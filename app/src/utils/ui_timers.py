@@ -0,0 +1,171 @@
+import threading
+
+from PyQt6.QtCore import QAbstractAnimation, QEvent, QObject, QTimer
+
+# Every periodic UI timer and animation goes through UiTimerRegistry, so none
+# of them runs while nobody can see its result: a timer or animation is tied
+# to an owner widget and is suspended while that widget is hidden (its page
+# is not the current one, its dialog is closed) or its window is minimized,
+# and resumed when it is on screen again. Background work is unaffected;
+# only the GUI-thread polling and repainting stop.
+
+
+class ManagedTimer(QTimer):
+    # QTimer that only runs while its owner widget is on screen. start() and
+    # stop() record whether the timer is wanted; the registry starts and
+    # suspends the underlying QTimer accordingly. isActive() tells whether it
+    # is running right now, `wanted` whether it would run if visible.
+
+    def __init__(self, owner, timeout=None):
+        super().__init__(owner)
+        self.owner = owner
+        self.wanted = False
+        self.timeout.connect(self._on_timeout) # First, so single shots are done before their slot runs
+        if timeout is not None:
+            self.timeout.connect(timeout)
+        get_ui_timers().register(self)
+
+    def start(self, interval=None):
+        if interval is not None:
+            self.setInterval(interval)
+        self.wanted = True
+        get_ui_timers().refresh(self)
+
+    def stop(self):
+        self.wanted = False
+        super().stop()
+
+    def _on_timeout(self):
+        if self.isSingleShot():
+            self.wanted = False
+
+    def set_running(self, running):
+        if running and not self.isActive():
+            super().start()
+        elif not running and self.isActive():
+            super().stop()
+
+
+class ManagedAnimation:
+    # Pauses a running QAbstractAnimation while its owner is off screen and
+    # resumes it (from where it was) once it is back.
+
+    def __init__(self, animation, owner):
+        self.animation = animation
+        self.owner = owner
+        self.wanted = True
+        self._paused_by_registry = False
+
+    def isActive(self):
+        try:
+            return self.animation.state() == QAbstractAnimation.State.Running
+        except RuntimeError: # Deleted on the C++ side (it signals stateChanged while being destroyed)
+            return False
+
+    def set_running(self, running):
+        try:
+            state = self.animation.state()
+        except RuntimeError:
+            return
+        if not running and state == QAbstractAnimation.State.Running:
+            self.animation.pause()
+            self._paused_by_registry = True
+        elif running and self._paused_by_registry:
+            self._paused_by_registry = False
+            if state == QAbstractAnimation.State.Paused:
+                self.animation.resume()
+
+
+class UiTimerRegistry(QObject):
+    # Watches each owner widget for show/hide events, and each owner's
+    # top-level window for minimize/restore, and runs or suspends the
+    # owner's timers and animations to match. GUI thread only.
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = {}  # Owner widget -> [ManagedTimer | ManagedAnimation]
+        self._windows = set()
+        self.suspensions = 0
+
+    def register(self, entry):
+        owner = entry.owner
+        if owner not in self._entries:
+            self._entries[owner] = []
+            owner.installEventFilter(self)
+            owner.destroyed.connect(lambda _=None, owner=owner: self._forget_owner(owner))
+        self._entries[owner].append(entry)
+        return entry
+
+    def manage_animation(self, animation, owner):
+        # Registers `animation`; it keeps its own start()/stop() and is only
+        # paused and resumed with the owner's visibility.
+        entry = self.register(ManagedAnimation(animation, owner))
+        animation.destroyed.connect(lambda _=None, entry=entry: self._forget(entry))
+        animation.stateChanged.connect(lambda *_: self.refresh(entry))
+        return entry
+
+    def _forget(self, entry):
+        entries = self._entries.get(entry.owner)
+        if entries and entry in entries:
+            entries.remove(entry)
+
+    def _forget_owner(self, owner):
+        self._entries.pop(owner, None)
+
+    @staticmethod
+    def on_screen(widget):
+        try:
+            return widget.isVisible() and not widget.window().isMinimized()
+        except RuntimeError: # Deleted on the C++ side
+            return False
+
+    def refresh(self, entry):
+        running = entry.wanted and self.on_screen(entry.owner)
+        if not running and entry.isActive():
+            self.suspensions += 1
+        entry.set_running(running)
+
+    def _refresh_owner(self, owner):
+        for entry in list(self._entries.get(owner, ())):
+            self.refresh(entry)
+
+    def _watch_window(self, window):
+        if window not in self._windows:
+            self._windows.add(window)
+            window.installEventFilter(self)
+            window.destroyed.connect(lambda _=None, window=window: self._windows.discard(window))
+
+    def eventFilter(self, obj, event):
+        event_type = event.type()
+        if event_type in (QEvent.Type.Show, QEvent.Type.Hide):
+            if obj in self._entries:
+                if event_type == QEvent.Type.Show:
+                    self._watch_window(obj.window())
+                self._refresh_owner(obj)
+        elif event_type == QEvent.Type.WindowStateChange and obj in self._windows:
+            for owner in list(self._entries):
+                if owner.window() is obj:
+                    self._refresh_owner(owner)
+        return False
+
+    def stats(self):
+        entries = [entry for owner_entries in self._entries.values() for entry in owner_entries]
+        return {
+            "ui_timers_registered": len(entries),
+            "ui_timers_wanted": sum(1 for entry in entries if entry.wanted),
+            "ui_timers_running": sum(1 for entry in entries if entry.isActive()),
+            "ui_timer_suspensions": self.suspensions,
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_ui_timers():
+    # Process-wide registry for the GUI thread's timers and animations.
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = UiTimerRegistry()
+        return _registry
@@ -0,0 +1,477 @@
+import argparse
+import heapq
+import http.client
+import http.server
+import itertools
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.parse
+import uuid
+
+import config
+
+# Resumable upload protocol (spoken by the spooler and LocalUploadServer):
+#   POST   <endpoint>            X-Upload-Name, X-Upload-Length  -> 201, Location: <upload url>
+#   HEAD   <upload url>                                          -> 200, Upload-Offset: <bytes received>
+#   PUT    <upload url>          Content-Range: bytes a-b/total  -> 308 + Upload-Offset while incomplete,
+#                                                                   200 + {"link": ...} once complete
+# A HEAD or PUT answered with 404 / 410 means the server no longer knows the
+# upload url (expired or purged); the upload then starts over with a POST.
+# Network errors, 5xx and the statuses below are retried with backoff; any
+# other 4xx, a POST without a Location, or a spool file that no longer exists
+# fails the job for good.
+
+UPLOAD_GONE_STATUSES = (404, 410)
+UPLOAD_RETRY_STATUSES = (408, 429)
+
+
+class UploadHTTPError(IOError):
+    # An upload request answered with an HTTP error status.
+
+    def __init__(self, method, path, status):
+        super().__init__(f"{method} {path} -> HTTP {status}")
+        self.status = status
+
+
+class UploadRejected(Exception):
+    # The upload can never succeed as queued (e.g. the server answered a POST
+    # without an upload url); the job is failed instead of retried.
+    pass
+
+
+class TokenBucket:
+    # Shared bandwidth cap across all upload workers (bytes per second).
+
+    def __init__(self, rate_bytes_per_s):
+        self.rate = rate_bytes_per_s
+        self._tokens = float(rate_bytes_per_s or 0)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= amount or self._tokens >= self.rate:
+                    self._tokens -= amount
+                    return
+                wait = (min(amount, self.rate) - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class HTTPConnectionPool:
+    # Keep-alive connections to the upload host, reused across chunks and files.
+
+    def __init__(self, endpoint_url, max_connections, timeout_s):
+        parsed = urllib.parse.urlsplit(endpoint_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.timeout_s = timeout_s
+        self._idle = queue.LifoQueue(maxsize=max_connections)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            return connection_class(self.host, self.port, timeout=self.timeout_s)
+
+    def release(self, connection, reusable=True):
+        if not reusable:
+            connection.close()
+            return
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class UploadSpooler:
+    # Persistent upload queue for online storage mode. Each file to upload has
+    # a job file in the spool directory recording its upload url and confirmed
+    # offset, so uploads survive network outages and restarts and resume where
+    # they stopped. Workers share a keep-alive connection pool and a bandwidth
+    # cap; failures are retried with exponential backoff and jitter. Jobs
+    # waiting out a backoff sit in a heap ordered by due time, so workers
+    # keep uploading whatever is due instead of sleeping on a held job.
+    # Jobs that fail permanently move to the failed/ subdirectory of the
+    # spool, with the error recorded in the job file, and are not retried.
+    # on_uploaded(job, link) is called from a worker thread when a file lands.
+
+    def __init__(self, spool_dir=None, endpoint_url=None, concurrency=None, chunk_bytes=None,
+                 bandwidth_limit_bps=None, on_uploaded=None, delete_after_upload=True):
+        self.spool_dir = spool_dir or config.UPLOAD_SPOOL_PATH
+        self.endpoint_url = endpoint_url or config.UPLOAD_ENDPOINT_URL
+        self.concurrency = concurrency or config.UPLOAD_CONCURRENCY
+        self.chunk_bytes = chunk_bytes or config.UPLOAD_CHUNK_BYTES
+        self.on_uploaded = on_uploaded
+        self.delete_after_upload = delete_after_upload
+        self.bandwidth = TokenBucket(config.UPLOAD_BANDWIDTH_LIMIT_BPS if bandwidth_limit_bps is None else bandwidth_limit_bps)
+        self.pool = HTTPConnectionPool(self.endpoint_url, self.concurrency, config.UPLOAD_TIMEOUT_S)
+        self._endpoint_path = urllib.parse.urlsplit(self.endpoint_url).path or "/"
+        self._jobs = [] # Heap of (not_before, sequence, job)
+        self._jobs_sequence = itertools.count()
+        self._jobs_condition = threading.Condition()
+        self._unfinished_jobs = 0 # Queued plus being uploaded
+        self._stop_event = threading.Event()
+        self._workers = []
+        self._stats_lock = threading.Lock()
+        self.uploaded = 0
+        self.bytes_uploaded = 0
+        self.retries = 0
+        self.failed = 0
+        self.failed_dir = os.path.join(self.spool_dir, "failed")
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    # --- Job Files ---
+    def _job_path(self, job_id):
+        return os.path.join(self.spool_dir, f"{job_id}.job.json")
+
+    def _save_job(self, job):
+        path = self._job_path(job["id"])
+        with open(path + ".part", "w") as f:
+            json.dump(job, f)
+        os.replace(path + ".part", path)
+
+    def enqueue_file(self, local_path, remote_name=None, **metadata):
+        job = {
+            "id": uuid.uuid4().hex,
+            "file": local_path,
+            "remote_name": remote_name or os.path.basename(local_path),
+            "upload_url": None,
+            "offset": 0,
+            "attempts": 0,
+            "metadata": metadata,
+        }
+        self._save_job(job)
+        self._put_job(job)
+        return job["id"]
+
+    def pending_count(self):
+        with self._jobs_condition:
+            return len(self._jobs)
+
+    # --- Due-Time Queue ---
+    def _put_job(self, job, not_before=0.0, new=True):
+        with self._jobs_condition:
+            heapq.heappush(self._jobs, (not_before, next(self._jobs_sequence), job))
+            if new:
+                self._unfinished_jobs += 1
+            self._jobs_condition.notify()
+
+    def _take_job(self):
+        # The job that is due first, once it is due; None when stopping.
+        with self._jobs_condition:
+            while not self._stop_event.is_set():
+                if self._jobs:
+                    delay = self._jobs[0][0] - time.monotonic()
+                    if delay <= 0:
+                        return heapq.heappop(self._jobs)[2]
+                else:
+                    delay = None
+                self._jobs_condition.wait(delay)
+            return None
+
+    def _job_done(self):
+        with self._jobs_condition:
+            self._unfinished_jobs -= 1
+
+    # --- Lifecycle ---
+    def start(self):
+        # Re-queue jobs left over from a previous run before taking new ones.
+        for name in sorted(os.listdir(self.spool_dir)):
+            if name.endswith(".job.json"):
+                try:
+                    with open(os.path.join(self.spool_dir, name)) as f:
+                        job = json.load(f)
+                    job["attempts"] = 0
+                    self._put_job(job)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Skipping unreadable upload job {name}: {e}")
+        for i in range(self.concurrency):
+            worker = threading.Thread(target=self._worker_loop, name=f"Uploader-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        with self._jobs_condition:
+            self._jobs_condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self.pool.close()
+
+    def wait_until_empty(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._unfinished_jobs:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    # --- Workers ---
+    def _worker_loop(self):
+        while True:
+            job = self._take_job()
+            if job is None:
+                return
+            try:
+                link = self._upload(job)
+            except Exception as e:
+                if not self._is_retryable(e, job):
+                    self._fail(job, e)
+                    self._job_done()
+                    continue
+                job["attempts"] += 1
+                backoff = min(config.UPLOAD_MAX_BACKOFF_S, config.UPLOAD_BASE_BACKOFF_S * (2 ** (job["attempts"] - 1)))
+                backoff *= random.uniform(0.5, 1.0)
+                with self._stats_lock:
+                    self.retries += 1
+                print(f"Upload of {job['remote_name']} failed (attempt {job['attempts']}): {e}. Retrying in {backoff:.1f}s.")
+                self._save_job(job)
+                self._put_job(job, time.monotonic() + backoff, new=False)
+            else:
+                self._finish(job, link)
+                self._job_done()
+
+    @staticmethod
+    def _is_retryable(error, job):
+        if isinstance(error, UploadHTTPError):
+            if error.status in UPLOAD_GONE_STATUSES:
+                return job["upload_url"] is not None # The resume starts it over; a POST 404 won't improve
+            return error.status >= 500 or error.status in UPLOAD_RETRY_STATUSES
+        if isinstance(error, FileNotFoundError):
+            return False
+        return isinstance(error, (OSError, http.client.HTTPException))
+
+    def _request(self, method, path, body=None, headers=None):
+        connection = self.pool.acquire()
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException):
+            self.pool.release(connection, reusable=False)
+            raise
+        self.pool.release(connection, reusable=not response.will_close)
+        if response.status >= 400:
+            raise UploadHTTPError(method, path, response.status)
+        return response, payload
+
+    def _auth_headers(self):
+        return {"Authorization": f"Bearer {config.UPLOAD_AUTH_TOKEN}"} if config.UPLOAD_AUTH_TOKEN else {}
+
+    def _upload(self, job):
+        total = os.path.getsize(job["file"])
+        if job["upload_url"] is not None:
+            # Resuming: ask the server how much it already has.
+            try:
+                response, _ = self._request("HEAD", job["upload_url"], headers=self._auth_headers())
+                job["offset"] = int(response.getheader("Upload-Offset", "0"))
+            except UploadHTTPError as e:
+                if e.status not in UPLOAD_GONE_STATUSES:
+                    raise
+                print(f"Upload of {job['remote_name']} is unknown to the server (HTTP {e.status}); starting it over.")
+                job["upload_url"] = None
+                job["offset"] = 0
+                self._save_job(job)
+        if job["upload_url"] is None:
+            headers = dict(self._auth_headers(), **{"X-Upload-Name": job["remote_name"], "X-Upload-Length": str(total)})
+            response, _ = self._request("POST", self._endpoint_path, headers=headers)
+            job["upload_url"] = response.getheader("Location")
+            if not job["upload_url"]:
+                job["upload_url"] = None
+                raise UploadRejected(f"POST {self._endpoint_path} -> HTTP {response.status} without a Location header")
+            job["offset"] = 0
+            self._save_job(job)
+
+        with open(job["file"], "rb") as f:
+            while True:
+                f.seek(job["offset"])
+                chunk = f.read(self.chunk_bytes)
+                end = job["offset"] + len(chunk) - 1
+                self.bandwidth.consume(len(chunk))
+                headers = dict(self._auth_headers(), **{"Content-Range": f"bytes {job['offset']}-{end}/{total}"})
+                response, payload = self._request("PUT", job["upload_url"], body=chunk, headers=headers)
+                with self._stats_lock:
+                    self.bytes_uploaded += len(chunk)
+                job["attempts"] = 0 # Progress was made; backoff starts over
+                if response.status == 308:
+                    job["offset"] = int(response.getheader("Upload-Offset", str(end + 1)))
+                    self._save_job(job)
+                    continue
+                return json.loads(payload or b"{}").get("link") or job["upload_url"]
+
+    def _fail(self, job, error):
+        job["error"] = repr(error)
+        try:
+            os.makedirs(self.failed_dir, exist_ok=True)
+            with open(os.path.join(self.failed_dir, f"{job['id']}.job.json"), "w") as f:
+                json.dump(job, f)
+            os.remove(self._job_path(job["id"]))
+        except OSError as e:
+            print(f"Warning: Could not move failed upload job {job['id']}: {e}")
+        with self._stats_lock:
+            self.failed += 1
+        print(f"Error: Upload of {job['remote_name']} failed permanently: {error}. Job kept in {self.failed_dir}.")
+
+    def _finish(self, job, link):
+        try:
+            os.remove(self._job_path(job["id"]))
+        except OSError:
+            pass
+        if self.delete_after_upload:
+            try:
+                os.remove(job["file"])
+            except OSError:
+                pass
+        with self._stats_lock:
+            self.uploaded += 1
+        if self.on_uploaded:
+            try:
+                self.on_uploaded(job, link)
+            except Exception as e:
+                print(f"Warning: Upload callback failed for {job['remote_name']}: {e}")
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "uploads_completed": self.uploaded,
+                "upload_bytes": self.bytes_uploaded,
+                "upload_retries": self.retries,
+                "uploads_failed": self.failed,
+                "uploads_pending": self.pending_count(),
+            }
+
+
+# --- Local Stand-in Upload Server (testing / development) ---
+class _UploadRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _upload_state(self):
+        upload_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        return upload_id, self.server.uploads.get(upload_id)
+
+    def do_POST(self):
+        upload_id = uuid.uuid4().hex
+        name = os.path.basename(self.headers.get("X-Upload-Name", upload_id))
+        self.server.uploads[upload_id] = {"name": name, "length": int(self.headers.get("X-Upload-Length", "0"))}
+        open(os.path.join(self.server.storage_dir, upload_id + ".part"), "wb").close()
+        self._reply(201, {"Location": f"{self.path.rstrip('/')}/{upload_id}"})
+
+    def do_HEAD(self):
+        upload_id, state = self._upload_state()
+        if state is None:
+            return self._reply(404)
+        offset = os.path.getsize(os.path.join(self.server.storage_dir, upload_id + ".part"))
+        self._reply(200, {"Upload-Offset": str(offset)})
+
+    def do_PUT(self):
+        upload_id, state = self._upload_state()
+        body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        if state is None:
+            return self._reply(404)
+        if self.server.fail_every and random.random() < 1.0 / self.server.fail_every:
+            return self._reply(503)
+        start = int(self.headers["Content-Range"].split()[1].split("-")[0])
+        part_path = os.path.join(self.server.storage_dir, upload_id + ".part")
+        if start != os.path.getsize(part_path):
+            return self._reply(308, {"Upload-Offset": str(os.path.getsize(part_path))})
+        with open(part_path, "ab") as f:
+            f.write(body)
+        received = os.path.getsize(part_path)
+        if received < state["length"]:
+            return self._reply(308, {"Upload-Offset": str(received)})
+        final_path = os.path.join(self.server.storage_dir, state["name"])
+        os.replace(part_path, final_path)
+        link = f"http://{self.server.server_address[0]}:{self.server.server_address[1]}/files/{state['name']}"
+        self._reply(200, {"Content-Type": "application/json"}, json.dumps({"link": link}).encode())
+
+
+class LocalUploadServer(http.server.ThreadingHTTPServer):
+    # Minimal in-process implementation of the upload protocol. fail_every=N
+    # makes roughly one in N chunk uploads fail with 503 to exercise retries.
+
+    daemon_threads = True
+
+    def __init__(self, storage_dir, host="127.0.0.1", port=0, fail_every=0):
+        super().__init__((host, port), _UploadRequestHandler)
+        os.makedirs(storage_dir, exist_ok=True)
+        self.storage_dir = storage_dir
+        self.fail_every = fail_every
+        self.uploads = {}
+
+    @property
+    def endpoint_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/uploads"
+
+    def start_in_background(self):
+        threading.Thread(target=self.serve_forever, name="LocalUploadServer", daemon=True).start()
+        return self
+
+
+_shared_spooler = None
+_shared_spooler_lock = threading.Lock()
+
+
+def get_upload_spooler():
+    # Process-wide spooler; uploaded links are back-filled into the catalog.
+    global _shared_spooler
+    with _shared_spooler_lock:
+        if _shared_spooler is None:
+            from app.src.utils.catalog import get_catalog
+            from app.src.utils.db_sink import get_database_sink
+
+            def backfill_link(job, link):
+                metadata = job.get("metadata", {})
+                if metadata.get("session_id") and metadata.get("filename"):
+                    get_catalog().update_image_link(metadata["session_id"], metadata["filename"], link)
+                    get_database_sink().update_image_link(metadata["session_id"], metadata["filename"], link)
+
+            _shared_spooler = UploadSpooler(on_uploaded=backfill_link).start()
+        return _shared_spooler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the local stand-in upload server.")
+    parser.add_argument("--dir", default=os.path.join(config.PROJECT_ROOT, config.LOGS_DIR_NAME, "upload_server"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args(argv)
+    server = LocalUploadServer(args.dir, args.host, args.port, args.fail_every)
+    print(f"Upload server listening on {server.endpoint_url}, storing into {args.dir}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import time
+
+from PyQt6.QtWidgets import QFrame
+from PyQt6.QtGui import QImage, QPainter
+from PyQt6.QtCore import Qt, QRect, QSize
+
+import config
+from app.src.utils.tracing import get_tracer
+
+
+class FramePreviewWidget(QFrame):
+    # Paints a NumPy BGR frame straight from its buffer: the QImage wraps the
+    # array memory (no copy, no QPixmap) and is scaled by the painter into a
+    # target rect that is only recomputed on resize or frame size change.
+    # Scaling mode is "auto", "fast" or "smooth"; in "auto" mode smooth scaling
+    # is used while its measured cost fits the GUI-thread budget and fast
+    # scaling otherwise. While fast scaling is in use, one frame in
+    # PREVIEW_SMOOTH_PROBE_FRAMES is still painted smooth to keep its cost
+    # current, and the frame rate falls off when frames stop arriving, so a
+    # lighter load (or a still image) switches back to smooth.
+    # setText()/clear() mirror QLabel so it can stand in for the old labels.
+
+    def __init__(self, text="", parent=None, scaling_mode=None):
+        super().__init__(parent)
+        self._text = text
+        self._frame = None        # Array backing self._image; kept alive while painted
+        self._image = None
+        self._target_rect = None  # Cached scale transform (destination rect)
+        self.scaling_mode = scaling_mode or config.PREVIEW_SCALING_MODE
+        self._use_smooth = True
+
+        # --- Measurements ---
+        self.preview_fps = 0.0
+        self.gui_ms_per_frame = 0.0
+        self._smooth_paint_ms = 0.0
+        self._paints_since_smooth = 0
+        self._frames_in_window = 0
+        self._window_start = time.perf_counter()
+        self._pending_set_ms = 0.0
+        self.tracer = get_tracer()
+
+    # --- Content ---
+    def set_frame(self, frame):
+        started = time.perf_counter()
+        height, width = frame.shape[:2]
+        if self._frame is not frame or self._image is None or self._image.size() != QSize(width, height):
+            self._image = QImage(frame.data, width, height, frame.strides[0], QImage.Format.Format_BGR888)
+            self._frame = frame
+            self._target_rect = None
+        self._text = ""
+        self._count_frame()
+        self._pending_set_ms = (time.perf_counter() - started) * 1000.0
+        self.update()
+
+    def setText(self, text):
+        self._text = text
+        self._frame = None
+        self._image = None
+        self._target_rect = None
+        self.update()
+
+    def text(self):
+        return self._text
+
+    def clear(self):
+        self.setText("")
+
+    # --- Measurements ---
+    def _count_frame(self):
+        self._frames_in_window += 1
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.preview_fps = self._frames_in_window / elapsed
+            self._frames_in_window = 0
+            self._window_start = now
+
+    def _refresh_fps(self):
+        # No set_frame() for a second or more: count the rate over the open window.
+        elapsed = time.perf_counter() - self._window_start
+        if elapsed >= 1.0:
+            self.preview_fps = min(self.preview_fps, self._frames_in_window / elapsed)
+
+    def stats(self):
+        self._refresh_fps()
+        return {
+            "preview_fps": round(self.preview_fps, 1),
+            "preview_gui_ms_per_frame": round(self.gui_ms_per_frame, 2),
+            "preview_smooth_scaling": self._use_smooth,
+        }
+
+    def _choose_smoothing(self):
+        if self.scaling_mode != "auto":
+            return self.scaling_mode == "smooth"
+        # Estimated GUI-thread milliseconds per second spent on smooth scaling.
+        budget_ms_per_s = config.PREVIEW_GUI_BUDGET_PERCENT * 10.0
+        self._refresh_fps()
+        smooth_load = self._smooth_paint_ms * max(self.preview_fps, 1.0)
+        if self._use_smooth:
+            return smooth_load <= budget_ms_per_s
+        # Hysteresis: only go back to smooth with clear headroom (e.g. a static image).
+        return smooth_load <= budget_ms_per_s * 0.7
+
+    # --- Qt Event Handlers ---
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._target_rect = None
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        painter = QPainter(self)
+        contents = self.contentsRect()
+
+        if self._image is None:
+            if self._text:
+                painter.setPen(self.palette().color(self.foregroundRole()))
+                painter.setFont(self.font())
+                painter.drawText(contents, Qt.AlignmentFlag.AlignCenter | Qt.TextFlag.TextWordWrap, self._text)
+            return
+
+        started = time.perf_counter()
+        if self._target_rect is None:
+            scaled = self._image.size().scaled(contents.size(), Qt.AspectRatioMode.KeepAspectRatio)
+            self._target_rect = QRect(0, 0, scaled.width(), scaled.height())
+            self._target_rect.moveCenter(contents.center())
+
+        self._use_smooth = self._choose_smoothing()
+        smooth = self._use_smooth or (self.scaling_mode == "auto"
+                                      and self._paints_since_smooth >= config.PREVIEW_SMOOTH_PROBE_FRAMES)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, smooth)
+        painter.drawImage(self._target_rect, self._image)
+        painter.end()
+
+        paint_ms = (time.perf_counter() - started) * 1000.0
+        if smooth:
+            # A probe stands alone, so one measurement is enough to switch back.
+            probe = not self._use_smooth or not self._smooth_paint_ms
+            self._smooth_paint_ms = paint_ms if probe else 0.8 * self._smooth_paint_ms + 0.2 * paint_ms
+            self._paints_since_smooth = 0
+        else:
+            self._paints_since_smooth += 1
+        frame_ms = paint_ms + self._pending_set_ms
+        self._pending_set_ms = 0.0
+        self.tracer.record("display", frame_ms)
+        self.gui_ms_per_frame = frame_ms if not self.gui_ms_per_frame else 0.9 * self.gui_ms_per_frame + 0.1 * frame_ms
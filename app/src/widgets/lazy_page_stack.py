@@ -0,0 +1,46 @@
+from PyQt6.QtWidgets import QStackedWidget, QWidget
+from PyQt6.QtCore import pyqtSignal
+
+
+class LazyPageStack(QStackedWidget):
+    # QStackedWidget whose pages are built on first navigation. add_lazy_page()
+    # reserves the page's index with an empty placeholder and keeps a factory;
+    # the factory (which should do its own heavy imports) runs the first time
+    # the page is shown or asked for through page(), and the placeholder is
+    # swapped for the result in place, so page indices never shift.
+    page_created = pyqtSignal(int, QWidget)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._factories = {} # Index -> factory for pages not built yet
+
+    def add_lazy_page(self, factory):
+        index = self.addWidget(QWidget())
+        self._factories[index] = factory
+        return index
+
+    def is_page_created(self, index):
+        return index not in self._factories
+
+    def page(self, index):
+        # The page at `index`, building it first if needed.
+        factory = self._factories.pop(index, None)
+        if factory is None:
+            return self.widget(index)
+        placeholder = self.widget(index)
+        page = factory()
+        was_current = self.currentIndex() == index
+        self.insertWidget(index, page)
+        self.removeWidget(placeholder)
+        placeholder.deleteLater()
+        if was_current:
+            super().setCurrentIndex(index)
+        self.page_created.emit(index, page)
+        return page
+
+    def created_pages(self):
+        return [self.widget(index) for index in range(self.count()) if index not in self._factories]
+
+    def setCurrentIndex(self, index):
+        self.page(index)
+        super().setCurrentIndex(index)
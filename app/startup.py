@@ -1,16 +1,22 @@
-import os
+import time
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QGraphicsOpacityEffect
 )
 from PyQt6.QtGui import QFont, QColor, QLinearGradient, QBrush, QPainter, QPixmap, QPen
 from PyQt6.QtCore import (
-    Qt, QPropertyAnimation, QEasingCurve, QSequentialAnimationGroup,
+    Qt, QPropertyAnimation, QEasingCurve, QSequentialAnimationGroup, QParallelAnimationGroup,
     QRect, QPoint, pyqtSignal, QTimer, pyqtProperty, QPointF
 )
 
-from config import LOGO_PATH, COMPANY_NAME, DEPARTMENT_NAME
+from config import LOGO_PATH, COMPANY_NAME, DEPARTMENT_NAME, SPLASH_MIN_DISPLAY_MS, STARTUP_WARMUP_TIMEOUT_S
+from app.src.utils.asset_cache import get_asset_cache
+from app.src.utils.startup_profiler import get_startup_profiler
+from app.src.utils.ui_timers import ManagedTimer, get_ui_timers
 
 class LoadingSpinner(QWidget):
+    # The spinner only ever shows `lines` distinct images (one per rotation
+    # step), so they are drawn once into pixmaps and each tick just blits the
+    # next one. The frames are redrawn when color, size or pixel ratio change.
     def __init__(self, parent=None, color=Qt.GlobalColor.white, minimumTrailOpacity=3.0, rotationSpeed=60, diameter=30, lines=12):
         super().__init__(parent)
         self._color = QColor(color)
@@ -18,12 +24,13 @@ class LoadingSpinner(QWidget):
         self._rotationSpeed = rotationSpeed
         self._diameter = diameter
         self._lines = max(1, lines)
+        self._frames = []
+        self._frames_key = None
         
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self.rotate)
+        self._timer = ManagedTimer(self, self.rotate) # Stops while the spinner is hidden or minimized
         self._timer.start(int(self._rotationSpeed))
         
-        self._current_rotation_angle = 0.0
+        self._current_step = 0
         self.setFixedSize(diameter + 10, diameter + 10)
 
     @pyqtProperty(QColor)
@@ -33,6 +40,7 @@ class LoadingSpinner(QWidget):
     @color.setter
     def color(self, color):
         self._color = QColor(color)
+        self._frames_key = None
         self.update() 
 
     @pyqtProperty(int)
@@ -42,15 +50,28 @@ class LoadingSpinner(QWidget):
     @diameter.setter
     def diameter(self, diameter):
         self._diameter = diameter
+        self._frames_key = None
         self.setFixedSize(diameter + 10, diameter + 10)
         self.update()
 
     def rotate(self):
-        self._current_rotation_angle = (self._current_rotation_angle + (360.0 / self._lines)) % 360.0
+        self._current_step = (self._current_step + 1) % self._lines
         self.update()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def _render_frames(self):
+        ratio = self.devicePixelRatioF()
+        self._frames = []
+        for step in range(self._lines):
+            frame = QPixmap(round(self.width() * ratio), round(self.height() * ratio))
+            frame.setDevicePixelRatio(ratio)
+            frame.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(frame)
+            self._draw_lines(painter, step * (360.0 / self._lines))
+            painter.end()
+            self._frames.append(frame)
+        self._frames_key = (self.width(), self.height(), ratio)
+
+    def _draw_lines(self, painter, rotation_angle):
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         centerX = self.width() / 2.0
         centerY = self.height() / 2.0
@@ -60,7 +81,7 @@ class LoadingSpinner(QWidget):
         pen.setWidth(max(2, self._diameter // 10))
 
         for i in range(self._lines):
-            angle_diff = (i * (360.0 / self._lines)) - self._current_rotation_angle
+            angle_diff = (i * (360.0 / self._lines)) - rotation_angle
             if angle_diff < 0:
                 angle_diff += 360.0
             opacity_factor = 1.0 - (angle_diff / 360.0)
@@ -74,12 +95,19 @@ class LoadingSpinner(QWidget):
             outer_radius = self._diameter / 2.0
             painter.drawLine(QPointF(0, inner_radius), QPointF(0, outer_radius))
 
+    def paintEvent(self, event):
+        if self._frames_key != (self.width(), self.height(), self.devicePixelRatioF()):
+            self._render_frames()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._frames[self._current_step])
+
 class SplashScreen(QWidget):
     animation_finished_signal = pyqtSignal()
 
     def __init__(self):
         super().__init__()
         self.main_window_instance = None
+        self.warmup = None
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.SplashScreen)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
@@ -92,10 +120,9 @@ class SplashScreen(QWidget):
         self.logo_label = QLabel()
         self.logo_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
-        pixmap = QPixmap(LOGO_PATH) 
+        pixmap = get_asset_cache().pixmap(LOGO_PATH, 200, 100)
         if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaled(200, 100, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            self.logo_label.setPixmap(scaled_pixmap)
+            self.logo_label.setPixmap(pixmap)
         else:
             self.logo_label.setText("LOGO (Not Found)")
             self.logo_label.setFont(QFont("Arial", 20, QFont.Weight.Bold))
@@ -148,7 +175,7 @@ class SplashScreen(QWidget):
         self.loading_text_opacity_effect.setOpacity(0.0)
         
         self.center_on_screen()
-        self.overall_animation = QSequentialAnimationGroup(self)
+        self.fade_out_animation = None
 
     def paintEvent(self, event):
         painter = QPainter(self)
@@ -170,63 +197,75 @@ class SplashScreen(QWidget):
                  desktop = screens[0].availableGeometry()
                  self.move(desktop.center() - self.rect().center())
 
-    def start_animation(self, main_window):
-        self.main_window_instance = main_window
-        anim_logo_fadein = QPropertyAnimation(self.logo_opacity_effect, b"opacity")
-        anim_logo_fadein.setDuration(800)
-        anim_logo_fadein.setStartValue(0.0)
-        anim_logo_fadein.setEndValue(1.0)
-        anim_logo_fadein.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        anim_company_fadein = QPropertyAnimation(self.company_name_opacity_effect, b"opacity")
-        anim_company_fadein.setDuration(800)
-        anim_company_fadein.setStartValue(0.0)
-        anim_company_fadein.setEndValue(1.0)
-        anim_company_fadein.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        anim_department_fadein = QPropertyAnimation(self.department_opacity_effect, b"opacity")
-        anim_department_fadein.setDuration(600)
-        anim_department_fadein.setStartValue(0.0)
-        anim_department_fadein.setEndValue(1.0)
-        anim_department_fadein.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        anim_spinner_fadein = QPropertyAnimation(self.spinner_opacity_effect, b"opacity")
-        anim_spinner_fadein.setDuration(500)
-        anim_spinner_fadein.setStartValue(0.0)
-        anim_spinner_fadein.setEndValue(1.0)
-        anim_spinner_fadein.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        anim_loading_text_fadein = QPropertyAnimation(self.loading_text_opacity_effect, b"opacity")
-        anim_loading_text_fadein.setDuration(500)
-        anim_loading_text_fadein.setStartValue(0.0)
-        anim_loading_text_fadein.setEndValue(1.0)
-        anim_loading_text_fadein.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        anim_splash_fadeout = QPropertyAnimation(self, b"windowOpacity")
-        anim_splash_fadeout.setDuration(500)
-        anim_splash_fadeout.setStartValue(1.0)
-        anim_splash_fadeout.setEndValue(0.0)
-        anim_splash_fadeout.setEasingCurve(QEasingCurve.Type.InOutQuad)
-
-        self.overall_animation.addAnimation(anim_logo_fadein)
-        self.overall_animation.addPause(100)
-        self.overall_animation.addAnimation(anim_company_fadein)
-        self.overall_animation.addPause(50)
-        self.overall_animation.addAnimation(anim_department_fadein)
-        self.overall_animation.addPause(300)
-        self.overall_animation.addAnimation(anim_spinner_fadein)
-        self.overall_animation.addAnimation(anim_loading_text_fadein)
-        self.overall_animation.addPause(2000)
-        self.overall_animation.addAnimation(anim_splash_fadeout)
-        
-        self.overall_animation.finished.connect(self._on_animation_finished)
-        
+    def start(self, warmup, main_window_factory):
+        # Shows the splash, starts the warm-up tasks and builds the main window
+        # behind it; the splash closes (and the main window shows) once every
+        # task has finished and SPLASH_MIN_DISPLAY_MS has passed.
+        self.warmup = warmup
+        self._main_window_factory = main_window_factory
+        fade_ins = QParallelAnimationGroup(self)
+        # (effect, start delay ms, duration ms): staggered, all in within ~1 s
+        for effect, delay, duration in ((self.logo_opacity_effect, 0, 400),
+                                        (self.company_name_opacity_effect, 150, 400),
+                                        (self.department_opacity_effect, 300, 350),
+                                        (self.spinner_opacity_effect, 400, 300),
+                                        (self.loading_text_opacity_effect, 400, 300)):
+            fade_in = QPropertyAnimation(effect, b"opacity")
+            fade_in.setDuration(duration)
+            fade_in.setStartValue(0.0)
+            fade_in.setEndValue(1.0)
+            fade_in.setEasingCurve(QEasingCurve.Type.InOutQuad)
+            staggered = QSequentialAnimationGroup(fade_ins)
+            staggered.addPause(delay)
+            staggered.addAnimation(fade_in)
+            fade_ins.addAnimation(staggered)
+
+        self.profiler = get_startup_profiler()
+        self.profiler.watch_first_paint(self, "splash")
         self.setWindowOpacity(1.0)
         self.show()
-        self.overall_animation.start()
+        self._shown_at = time.monotonic()
+        get_ui_timers().manage_animation(fade_ins, self)
+        fade_ins.start()
+        self.warmup.start()
+        QTimer.singleShot(0, self._create_main_window) # After the splash has painted
+
+        self._progress_timer = ManagedTimer(self, self._update_progress)
+        self._progress_timer.start(100)
+
+    def _create_main_window(self):
+        with self.profiler.span("MainWindow", "widget"):
+            self.main_window_instance = self._main_window_factory()
+        with self.profiler.span("MainWindow polish", "stylesheet"):
+            self.main_window_instance.ensurePolished() # Style sheet applied here rather than at first show
+        self.profiler.watch_first_paint(self.main_window_instance, "main window", finish=True)
+
+    def _update_progress(self):
+        self.loading_text_label.setText(self.warmup.status())
+        if self.main_window_instance is None:
+            return
+        if not self.warmup.done():
+            if not self.warmup.timed_out():
+                return
+            print(f"Warning: Startup warm-up still running after {STARTUP_WARMUP_TIMEOUT_S} s "
+                  f"({self.warmup.status()}); opening the main window anyway.")
+        elif (time.monotonic() - self._shown_at) * 1000.0 < SPLASH_MIN_DISPLAY_MS:
+            return
+        self._progress_timer.stop()
+        self.profiler.mark("warm-up done")
+        print(f"Startup warm-up: {self.warmup.summary()}")
+
+        self.fade_out_animation = QPropertyAnimation(self, b"windowOpacity", self)
+        self.fade_out_animation.setDuration(300)
+        self.fade_out_animation.setStartValue(1.0)
+        self.fade_out_animation.setEndValue(0.0)
+        self.fade_out_animation.setEasingCurve(QEasingCurve.Type.InOutQuad)
+        self.fade_out_animation.finished.connect(self._on_animation_finished)
+        get_ui_timers().manage_animation(self.fade_out_animation, self)
+        self.fade_out_animation.start()
 
     def _on_animation_finished(self):
         if self.main_window_instance:
             self.main_window_instance.showMaximized()
         self.animation_finished_signal.emit()
-        self.close()
\ No newline at end of file
+        self.close()
@@ -0,0 +1,100 @@
+"""Benchmark: depth chunk store vs. one 16-bit PNG per depth frame.
+
+Run from the repository root:
+    python -m benchmarks.depth_store_bench [--frames N]
+
+Writes synthetic depth frames through DepthStoreWriter and as 16-bit PNGs,
+then reads them back (the store in random order). Exits non-zero if any
+frame does not round-trip exactly or the store is larger than the PNGs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.src.utils.depth_store import DepthStore, DepthStoreWriter
+from app.src.utils.frame_sources import SyntheticFrameSource
+
+
+def synthetic_depth_frames(count, noise):
+    # Synthetic depth with per-pixel sensor noise of +/- `noise` mm on the valid pixels.
+    source = SyntheticFrameSource()
+    source.open()
+    color = np.empty(source.frame_shape, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(count):
+        source.read_into(color)
+        depth = np.empty(source.depth_shape, dtype=np.uint16)
+        source.read_depth_into(depth)
+        if noise:
+            valid = depth > 0
+            depth[valid] += rng.integers(0, 2 * noise + 1, int(valid.sum()), dtype=np.uint16) - noise
+        frames.append(depth)
+    return frames
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=60, help="Depth frames per run")
+    args = parser.parse_args(argv)
+    failures = 0
+
+    for noise in (0, 2):
+        frames = synthetic_depth_frames(args.frames, noise)
+        raw_bytes = frames[0].nbytes * len(frames)
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            writer = DepthStoreWriter("bench", frames[0].shape, directory=directory, chunk_frames=32)
+            for sequence, depth in enumerate(frames):
+                writer.submit(depth, sequence, f"img_{sequence:04d}.png", 0.0, block=True)
+            writer.close()
+            store_write_ms = (time.perf_counter() - started) * 1000.0 / len(frames)
+            store_bytes = directory_size(directory)
+
+            store = DepthStore("bench", directory=directory)
+            order = np.random.default_rng(1).permutation(len(frames))
+            out = np.empty_like(frames[0])
+            started = time.perf_counter()
+            exact = all(np.array_equal(store.read(store.find(f"img_{index:04d}.png"), out=out), frames[index])
+                        for index in order)
+            store_read_ms = (time.perf_counter() - started) * 1000.0 / len(frames)
+            store.close()
+
+            png_dir = os.path.join(directory, "png")
+            os.makedirs(png_dir)
+            started = time.perf_counter()
+            for index, depth in enumerate(frames):
+                cv2.imwrite(os.path.join(png_dir, f"{index}.png"), depth)
+            png_write_ms = (time.perf_counter() - started) * 1000.0 / len(frames)
+            png_bytes = directory_size(png_dir)
+            started = time.perf_counter()
+            for index in order:
+                cv2.imread(os.path.join(png_dir, f"{index}.png"), cv2.IMREAD_UNCHANGED)
+            png_read_ms = (time.perf_counter() - started) * 1000.0 / len(frames)
+
+        print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]}, noise +/-{noise} mm:")
+        print(f"  chunk store: {raw_bytes / store_bytes:5.2f}x smaller than raw, write {store_write_ms:6.2f} ms/frame "
+              f"(2 threads), random read {store_read_ms:6.2f} ms/frame, round trip {'exact' if exact else 'DIFFERS'}")
+        print(f"  16-bit PNG:  {raw_bytes / png_bytes:5.2f}x smaller than raw, write {png_write_ms:6.2f} ms/frame, "
+              f"read {png_read_ms:6.2f} ms/frame")
+        if not exact or store_bytes > png_bytes:
+            failures += 1
+
+    if failures:
+        print(f"FAILED: {failures} run(s) did not round-trip or were larger than PNG")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Check: CPU used by the GUI while idle, and that hidden UI stops its timers.
+
+Run from the repository root:
+    python -m benchmarks.idle_cpu_check [--seconds S] [--budget-percent P]
+
+Uses the offscreen Qt platform unless QT_QPA_PLATFORM is set. Measures the
+process CPU time while the event loop idles on the home page, with the main
+window minimized, and with the splash spinner turning; checks that timers
+owned by hidden or minimized widgets are suspended; and compares the
+spinner's cached-frame paint with drawing every line each frame. Exits
+non-zero if an idle case exceeds the budget or a hidden timer keeps running.
+"""
+import argparse
+import os
+import sys
+import time
+
+IDLE_CPU_BUDGET_PERCENT = 2.0
+
+
+def idle_cpu_percent(app, seconds):
+    # Process CPU time (all threads) per wall-clock time while the event loop runs.
+    from PyQt6.QtCore import QTimer
+
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    QTimer.singleShot(int(seconds * 1000), app.exit) # quit() would also try to close the windows
+    app.exec()
+    return (time.process_time() - cpu_started) / (time.perf_counter() - wall_started) * 100.0
+
+
+def settle(app, seconds=0.5):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def paint_ms(spinner, frames, cached):
+    # Mean cost of producing one spinner frame into an offscreen pixmap.
+    from PyQt6.QtGui import QPainter, QPixmap
+    from PyQt6.QtCore import Qt
+
+    target = QPixmap(spinner.size())
+    started = time.perf_counter()
+    for frame in range(frames):
+        target.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(target)
+        if cached:
+            painter.drawPixmap(0, 0, spinner._frames[frame % len(spinner._frames)])
+        else:
+            spinner._draw_lines(painter, (frame % spinner._lines) * 360.0 / spinner._lines)
+        painter.end()
+    return (time.perf_counter() - started) * 1000.0 / frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0, help="Idle time measured per case")
+    parser.add_argument("--budget-percent", type=float, default=IDLE_CPU_BUDGET_PERCENT, help="Idle CPU budget")
+    args = parser.parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv[:1])
+    from app.main_window import MainWindow
+    from app.src.style import ACCENT_STYLESHEET
+    from app.src.utils.ui_timers import get_ui_timers
+    from app.startup import LoadingSpinner
+    app.setStyleSheet(ACCENT_STYLESHEET)
+    registry = get_ui_timers()
+    failures = []
+
+    window = MainWindow()
+    window.show()
+    settle(app)
+    home_cpu = idle_cpu_percent(app, args.seconds)
+    print(f"home page:      {home_cpu:5.2f}% CPU, timers {registry.stats()}")
+
+    spinner = LoadingSpinner(diameter=30, rotationSpeed=60)
+    spinner.show()
+    settle(app)
+    spinner_cpu = idle_cpu_percent(app, args.seconds)
+    print(f"spinner shown:  {spinner_cpu:5.2f}% CPU, timers {registry.stats()}")
+    cached_ms, direct_ms = paint_ms(spinner, 2000, True), paint_ms(spinner, 2000, False)
+    print(f"spinner frame:  {cached_ms * 1000:6.1f} us cached vs {direct_ms * 1000:6.1f} us drawing every line")
+    spinner.hide()
+    settle(app)
+    if spinner._timer.isActive():
+        failures.append("spinner timer still running while the spinner is hidden")
+
+    window.showMinimized()
+    settle(app)
+    minimized_cpu = idle_cpu_percent(app, args.seconds)
+    print(f"minimized:      {minimized_cpu:5.2f}% CPU, timers {registry.stats()}")
+    if window.latency_timer.wanted and window.latency_timer.isActive():
+        failures.append("status bar latency timer still running while the window is minimized")
+    window.showNormal()
+    settle(app)
+    if window.latency_timer.wanted and not window.latency_timer.isActive():
+        failures.append("status bar latency timer did not resume after the window was restored")
+
+    for name, cpu in (("home page", home_cpu), ("minimized", minimized_cpu)):
+        if cpu > args.budget_percent:
+            failures.append(f"{name} idles at {cpu:.2f}% CPU (budget {args.budget_percent}%)")
+    if cached_ms > direct_ms:
+        failures.append("cached spinner frames are slower than drawing them")
+
+    window.hide()
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
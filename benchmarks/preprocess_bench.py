@@ -0,0 +1,82 @@
+"""Microbenchmark: FramePreprocessor vs. a naive per-frame implementation.
+
+Run from the repository root:
+    python -m benchmarks.preprocess_bench [--frames N]
+
+Exits non-zero if the outputs differ or the preallocated path is slower.
+"""
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from app.src.utils.preprocess import FramePreprocessor
+
+FRAME_SHAPE = (720, 1280, 3)
+OUTPUT_SIZE = (224, 224)
+ROI = (100, 40, 560, 600) # On the rotated frame; fits both orientations
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+NUMPY_ROTATIONS = {0: 0, 90: -1, 180: 2, 270: 1} # np.rot90 k for a clockwise rotation
+
+
+def naive_preprocess(frame, rotation_degrees, roi, output_size, mean, std):
+    # The straightforward version: every step allocates a new full-size array.
+    rotated = np.ascontiguousarray(np.rot90(frame, NUMPY_ROTATIONS[rotation_degrees]))
+    x, y, w, h = roi
+    cropped = rotated[y:y + h, x:x + w].copy()
+    resized = cv2.resize(cropped, output_size, interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    scaled = rgb.astype(np.float32) / 255.0
+    return (scaled - np.array(mean, dtype=np.float32)) / np.array(std, dtype=np.float32)
+
+
+def time_per_frame(function, frames):
+    start = time.perf_counter()
+    for frame in frames:
+        function(frame)
+    return (time.perf_counter() - start) * 1000.0 / len(frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300, help="Frames to time per implementation")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, FRAME_SHAPE, dtype=np.uint8) for _ in range(8)]
+    frames = [frames[i % len(frames)] for i in range(args.frames)]
+    failures = 0
+
+    print(f"Frame {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]} -> {OUTPUT_SIZE[0]}x{OUTPUT_SIZE[1]}, ROI {ROI}, {args.frames} frames")
+    for rotation in (0, 90, 180, 270):
+        preprocessor = FramePreprocessor(FRAME_SHAPE, output_size=OUTPUT_SIZE, rotation_degrees=rotation, roi=ROI,
+                                         color="rgb", mean=MEAN, std=STD, layout="hwc")
+        out = np.empty(preprocessor.output_shape, dtype=np.float32)
+        naive = lambda frame: naive_preprocess(frame, rotation, ROI, OUTPUT_SIZE, MEAN, STD)
+        vectorized = lambda frame: preprocessor.process(frame, out=out)
+
+        expected = naive(frames[0])
+        actual = vectorized(frames[0])
+        # INTER_AREA on the unrotated crop can differ from the rotated crop by one level after rounding.
+        matches = expected.shape == actual.shape and np.allclose(expected, actual, atol=1.0 / (255.0 * min(STD)) + 1e-5)
+
+        naive_ms = time_per_frame(naive, frames)
+        vectorized_ms = time_per_frame(vectorized, frames)
+        speedup = naive_ms / vectorized_ms if vectorized_ms else float("inf")
+        print(f"  rotation {rotation:3d}: naive {naive_ms:6.3f} ms/frame, preallocated {vectorized_ms:6.3f} ms/frame, "
+              f"{speedup:4.1f}x, outputs {'match' if matches else 'DIFFER'}")
+        if not matches or vectorized_ms > naive_ms:
+            failures += 1
+
+    if failures:
+        print(f"FAILED: {failures} configuration(s) mismatched or were slower")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
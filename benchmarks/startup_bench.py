@@ -0,0 +1,128 @@
+"""Benchmark: time from interpreter start to the first paint of the main window.
+
+Run from the repository root:
+    python -m benchmarks.startup_bench [--runs N] [--budget-ms MS]
+
+Starts a fresh interpreter per run (offscreen Qt platform unless
+QT_QPA_PLATFORM is set) that launches the application through app.py, the
+real path: QApplication, stylesheet, splash, warm-up, MainWindow, the
+splash fade-out and the window shown maximized. The fixture skips the
+warm-up tasks (STARTUP_WARMUP_SKIP) and the splash's minimum display time
+(SPLASH_MIN_DISPLAY_MS), which are waits rather than launch cost; the
+fade-out still counts. Times come from the startup profiler's first-paint
+milestones, so they include its import hook. Exits non-zero if the median
+run exceeds the budget or if the home page pulled in a mode page, NumPy or
+OpenCV.
+"""
+import argparse
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+STARTUP_BUDGET_MS = 1000.0
+# Modules the home page must not import; mode pages build on first navigation.
+DEFERRED_MODULES = (
+    "numpy",
+    "cv2",
+    "app.src.modes.data_collection_mode",
+    "app.src.modes.test_mode",
+    "app.src.modes.production_mode",
+    "app.src.pages.classification_backfill_dialog",
+)
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def run_child(spawned_at, profile_dir):
+    # Runs in the child interpreter; launches app.py and writes the timings
+    # to result.json in profile_dir once the main window has painted.
+    started_at = time.time()
+    import config
+    from app.src.utils.startup_warmup import WARMUP_TASKS
+    config.STARTUP_WARMUP_SKIP = tuple(name for name, _, _ in WARMUP_TASKS)
+    config.SPLASH_MIN_DISPLAY_MS = 0
+    config.STARTUP_PROFILE_PATH = profile_dir
+    os.environ["APP_PROFILE_STARTUP"] = "1"
+
+    def report_when_painted():
+        from app.src.utils.startup_profiler import get_startup_profiler
+        deadline = time.monotonic() + 30.0
+        while time.monotonic() < deadline:
+            profiler = get_startup_profiler()
+            if profiler.enabled and profiler.finished: # Finished on the main window's first paint
+                milestones = {milestone["name"]: milestone["at_ms"] for milestone in profiler.milestones}
+                interpreter_ms = (started_at - spawned_at) * 1000.0
+                with open(os.path.join(profile_dir, "result.json"), "w") as f:
+                    json.dump({
+                        "interpreter_ms": interpreter_ms,
+                        "splash_paint_ms": interpreter_ms + milestones.get("splash first paint", float("nan")),
+                        "first_paint_ms": interpreter_ms + milestones["main window first paint"],
+                        "deferred_modules_loaded": [name for name in DEFERRED_MODULES if name in sys.modules],
+                    }, f)
+                os._exit(0) # The window would ask for confirmation before closing
+            time.sleep(0.005)
+        os._exit(1)
+
+    threading.Thread(target=report_when_painted, name="StartupBenchReport", daemon=True).start()
+    sys.argv = [APP_SCRIPT]
+    runpy.run_path(APP_SCRIPT, run_name="__main__")
+    return 1
+
+
+def measure_once():
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    profile_dir = tempfile.mkdtemp(prefix="startup_bench_")
+    spawned_at = time.time()
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup_bench", "--child", repr(spawned_at), "--profile-dir", profile_dir],
+            capture_output=True, text=True, env=env, timeout=60)
+        result_path = os.path.join(profile_dir, "result.json")
+        if os.path.exists(result_path):
+            with open(result_path) as f:
+                return json.load(f)
+    finally:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    raise RuntimeError(f"Startup run failed (exit {completed.returncode}): {completed.stderr.strip()[-2000:]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Median time-to-first-paint budget")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--profile-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return run_child(float(args.child), args.profile_dir)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    for number, run in enumerate(runs, 1):
+        print(f"run {number}: main window first paint {run['first_paint_ms']:7.1f} ms "
+              f"(interpreter {run['interpreter_ms']:6.1f} ms, splash first paint {run['splash_paint_ms']:7.1f} ms)")
+    median_ms = statistics.median(run["first_paint_ms"] for run in runs)
+    loaded = sorted({name for run in runs for name in run["deferred_modules_loaded"]})
+    print(f"median time to first paint: {median_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAILED: startup over budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    if loaded:
+        print(f"FAILED: home page imported deferred modules: {', '.join(loaded)}")
+        failed = True
+    if failed:
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
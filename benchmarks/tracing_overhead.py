@@ -0,0 +1,61 @@
+"""Microbenchmark: cost of latency tracing per frame.
+
+Run from the repository root:
+    python -m benchmarks.tracing_overhead [--frames N]
+
+Times the per-frame tracing calls (one record() per traced stage) with the
+tracer enabled and disabled, and relates them to the per-frame work of the
+preprocessing stage at 1280x720. Exits non-zero if enabled tracing costs 1%
+or more of that work.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from app.src.utils.preprocess import FramePreprocessor
+from app.src.utils.tracing import TRACE_STAGES, FrameTracer, NullTracer
+
+FRAME_SHAPE = (720, 1280, 3)
+BUDGET_PERCENT = 1.0
+
+
+def record_cost_us(tracer, frames):
+    # Microseconds per frame spent recording every traced stage once.
+    samples = np.random.default_rng(0).gamma(2.0, 2.0, size=frames).tolist()
+    start = time.perf_counter()
+    for ms in samples:
+        for stage in TRACE_STAGES:
+            tracer.record(stage, ms)
+    return (time.perf_counter() - start) * 1e6 / frames
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000, help="Frames of tracing calls to time")
+    args = parser.parse_args(argv)
+
+    frame = np.random.default_rng(1).integers(0, 256, FRAME_SHAPE, dtype=np.uint8)
+    preprocessor = FramePreprocessor(FRAME_SHAPE)
+    preprocessor.process(frame)
+    start = time.perf_counter()
+    for _ in range(200):
+        preprocessor.process(frame)
+    work_us = (time.perf_counter() - start) * 1e6 / 200
+
+    enabled_us = record_cost_us(FrameTracer(), args.frames)
+    disabled_us = record_cost_us(NullTracer(), args.frames)
+    enabled_percent = enabled_us / work_us * 100.0
+    print(f"Per-frame work (preprocess {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]}): {work_us:8.1f} us")
+    print(f"Tracing enabled  ({len(TRACE_STAGES)} stages): {enabled_us:8.2f} us/frame ({enabled_percent:.3f}% of work)")
+    print(f"Tracing disabled ({len(TRACE_STAGES)} stages): {disabled_us:8.2f} us/frame ({disabled_us / work_us * 100.0:.3f}% of work)")
+    if enabled_percent >= BUDGET_PERCENT:
+        print(f"FAILED: tracing costs {enabled_percent:.2f}% (budget {BUDGET_PERCENT}%)")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
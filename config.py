@@ -9,11 +9,20 @@ APP_VERSION = ""
 # --- Path Configuration ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 ASSETS_DIR_NAME = "assets"
-LOGO_FILENAME = "Mwlogo.png"
+LOGO_FILENAME = "MwLogo.png"
 LOGO_PATH = os.path.join(PROJECT_ROOT, ASSETS_DIR_NAME, LOGO_FILENAME)
 LOGS_DIR_NAME = "logs"
 SESSION_LOGS_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "sessions")
 IMAGE_LOGS_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "images")
+DEPTH_LOGS_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "depth")
+CATALOG_DB_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "catalog.sqlite3")
+UPLOAD_SPOOL_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "upload_spool")
+DB_OUTBOX_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "db_outbox")
+DB_DEAD_LETTER_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "db_dead_letter.jsonl")
+DEDUP_INDEX_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "dedup_index.npz")
+BENCHMARK_RESULTS_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "benchmarks")
+ASSET_DISK_CACHE_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "asset_cache")
+STARTUP_PROFILE_PATH = os.path.join(PROJECT_ROOT, LOGS_DIR_NAME, "startup") # Reports of python app.py --profile-startup
 
 
 # --- User Configuration ---
@@ -36,10 +45,136 @@ OPERATION_MODE_CONFIG_KEY = "current_operation_mode_id"
 # --- Data Storage Configuration ---
 # 0 for Online (Google Drive/SQL - placeholder), 1 for Offline (Local)
 DATA_STORAGE_FLAG = 1 
-ONLINE_DB_CONFIG = {"host": "your_db_host", "db_name": "your_db", "user": "your_user", "password": "your_password"} 
+# driver: "mysql" (pymysql), "postgres" (psycopg2) or "sqlite" (db_name is the file path)
+ONLINE_DB_CONFIG = {"driver": "mysql", "host": "your_db_host", "db_name": "your_db", "user": "your_user", "password": "your_password"} 
 
 # --- Default Camera Configuration ---
 CAMERA_RESOLUTION_WIDTH = 1280
 CAMERA_RESOLUTION_HEIGHT = 720
 CAMERA_FPS = 30
-CAMERA_ROTATION_OPTION = 1 
\ No newline at end of file
+CAMERA_ROTATION_OPTION = 1
+CAMERA_ROTATION_OPTIONS = {1: 0, 2: 90, 3: 180, 4: 270} # Option -> clockwise rotation in degrees
+# Frame source backend: "realsense" (line camera), "synthetic" (generated frames)
+# or "replay" (a recorded session from IMAGE_LOGS_PATH)
+CAMERA_SOURCE = "synthetic"
+
+# --- Frame Acquisition Configuration ---
+FRAME_BUFFER_CAPACITY = 8 # Preallocated ring buffer slots; oldest frame is dropped when full
+PREVIEW_REFRESH_INTERVAL_MS = 33 # Live feed repaint rate, independent of CAMERA_FPS
+PREVIEW_SCALING_MODE = "auto" # "auto", "fast" or "smooth" scaling of the live feed
+PREVIEW_GUI_BUDGET_PERCENT = 10 # Share of GUI-thread time smooth preview scaling may use in "auto" mode
+PREVIEW_SMOOTH_PROBE_FRAMES = 60 # In "auto" mode, every Nth fast-scaled frame is painted smooth to re-measure its cost
+
+# --- Image Writer Configuration ---
+IMAGE_WRITER_WORKERS = 2 # Background PNG encode/write threads
+IMAGE_WRITER_QUEUE_SIZE = 8 # Preallocated frame slots awaiting encode
+CAPTURE_BACKPRESSURE_POLICY = "refuse" # When the writer queue is full: "block" the capture or "refuse" it
+IMAGE_PNG_COMPRESSION = 3 # 0 (fastest, largest) to 9 (slowest, smallest)
+
+# --- Depth Capture Configuration ---
+DEPTH_CAPTURE_ENABLED = False # Save aligned 16-bit depth with every captured image (sources with depth only)
+DEPTH_CHUNK_FRAMES = 256 # Compressed depth frames per chunk file in DEPTH_LOGS_PATH/<session>/
+DEPTH_WRITER_THREADS = 2 # Background depth encode threads
+DEPTH_WRITER_QUEUE_SIZE = 16 # Preallocated depth frame slots awaiting encode
+
+# --- Capture Mode Configuration ---
+BURST_MAX_FRAMES = 30 # Size of the preallocated burst buffer
+BURST_DEFAULT_FRAMES = 10
+BURST_DEFAULT_RATE_HZ = 10
+CONTINUOUS_DEFAULT_EVERY_K = 5 # Continuous mode keeps every k-th acquired frame
+
+# --- Duplicate Suppression Configuration ---
+DEDUP_MODE = "flag" # Near-duplicate captures: "skip" them, "flag" them in the image log, or "off"
+DEDUP_MAX_HAMMING = 4 # Perceptual hashes (64 bits) this close count as the same scene
+DEDUP_RECENT_WINDOW = 500 # Captures per session compared against
+DEDUP_HISTORY_SIZE = 20000 # Captures from earlier sessions compared against
+
+# --- Session Journal Configuration ---
+JOURNAL_FSYNC_INTERVAL_S = 1.0 # Batched flush+fsync of the session journal; 0 syncs every record
+
+# --- Session Catalog Configuration ---
+CATALOG_BATCH_SIZE = 50 # Image rows buffered before a batched insert
+CATALOG_FLUSH_INTERVAL_S = 2.0 # Maximum time an image row waits before being inserted
+
+# --- Upload Spooler Configuration (Online storage) ---
+# Images are encoded into UPLOAD_SPOOL_PATH and uploaded in the background; run
+# `python -m app.src.utils.upload_spooler` for a local stand-in server.
+UPLOAD_ENDPOINT_URL = "http://127.0.0.1:8765/uploads"
+UPLOAD_AUTH_TOKEN = None # Sent as a Bearer token when set
+UPLOAD_CONCURRENCY = 3 # Parallel uploads, each on a pooled keep-alive connection
+UPLOAD_CHUNK_BYTES = 256 * 1024 # Resumable upload chunk size
+UPLOAD_BANDWIDTH_LIMIT_BPS = 0 # Shared upload cap in bytes/s; 0 for unlimited
+UPLOAD_TIMEOUT_S = 15
+UPLOAD_BASE_BACKOFF_S = 1.0 # Retry backoff doubles per failed attempt...
+UPLOAD_MAX_BACKOFF_S = 60.0 # ...up to this ceiling
+
+# --- Online Database Sink Configuration ---
+DB_INSERT_BATCH_SIZE = 200 # Image rows per multi-row INSERT
+DB_CONNECT_TIMEOUT_S = 5
+DB_RETRY_INTERVAL_S = 30.0 # How often queued records are retried while the database is unreachable
+DB_MAX_ITEM_ATTEMPTS = 5 # Records the database keeps rejecting move to DB_DEAD_LETTER_PATH after this many tries
+
+# --- Classifier Configuration ---
+CLASSIFIER_MODEL_PATH = None # Exported model (e.g. .onnx) run via cv2.dnn; None uses the placeholder classifier
+CLASSIFIER_INPUT_SIZE = (224, 224) # Model input (width, height)
+CLASSIFIER_SIMULATED_CALL_MS = 8.0 # Placeholder only: fixed cost per model call...
+CLASSIFIER_SIMULATED_FRAME_MS = 4.0 # ...plus this much per frame in the call
+# Preprocessing into model input (rotation is already applied by the frame source)
+PREPROCESS_ROI = None # (x, y, width, height) crop of the frame before resizing; None uses the whole frame
+PREPROCESS_COLOR = "rgb" # Model input channels: "rgb", "bgr" or "gray"
+PREPROCESS_MEAN = (0.0, 0.0, 0.0) # Per-channel normalization applied after scaling to [0, 1]...
+PREPROCESS_STD = (1.0, 1.0, 1.0) # ...as (x - mean) / std
+PREPROCESS_LAYOUT = "hwc" # Tensor layout per frame: "hwc" or "chw"
+CLASSIFIER_MAX_BATCH_SIZE = 8 # Micro-batching: dispatch once this many frames are waiting...
+CLASSIFIER_MAX_BATCH_WAIT_MS = 10 # ...or once the oldest has waited this long
+CLASSIFY_ON_SESSION_END = True # Classify a data collection session's images in the background when it ends (offline storage)
+CLASSIFY_READER_THREADS = 2 # Image decode/preprocess threads feeding offline classification
+CLASSIFY_CHUNK_SIZE = 64 # Images decoded ahead of the classifier
+CLASSIFY_BACKFILL_WORKERS = 0 # Archive back-fill worker processes; 0 uses every core
+CLASSIFY_BACKFILL_BATCH_SIZE = 32 # Archive back-fill: images decoded and classified per model call
+
+# --- Worker Process Pool Configuration ---
+PROCESS_POOL_WORKERS = 4 # Worker processes for per-frame image processing (frames shared via shared memory)
+PROCESS_POOL_SLOTS = 16 # Shared-memory frame slots; submissions are refused while all are in use
+PROCESS_POOL_TASK_TIMEOUT_S = 5.0 # A worker whose task runs longer is considered hung and restarted
+PROCESS_POOL_HEALTH_CHECK_INTERVAL_S = 1.0
+CAPTURE_QUALITY_CHECKS = True # Data collection: compute sharpness/brightness/clipping of each image in the pool
+
+# --- Latency Tracing Configuration ---
+TRACING_ENABLED = True # Per-stage frame latency histograms, live status bar readout and per-session dumps
+TRACING_READOUT_INTERVAL_MS = 1000 # Status bar p50/p99 refresh (covers the frames since the last refresh)
+TRACING_MAX_LATENCY_MS = 60000 # Longer samples are counted in the top bucket
+
+# --- Production Pipeline Configuration ---
+PRODUCTION_USE_PROCESS_POOL = False # Preprocess and classify in the worker pool (one frame per call) instead of micro-batching in-process
+PRODUCTION_QUEUE_SIZE = 2 # Bounded queue in front of each pipeline stage
+# Per-stage latency budgets (queue wait + work); frames over budget are dropped and logged
+PRODUCTION_STAGE_BUDGETS_MS = {"preprocess": 30, "model": 60, "decision": 5, "actuate": 10}
+PRODUCTION_DECISION_THRESHOLD = 0.5 # Classifier score at or above which a rib cut is signalled
+PRODUCTION_STATS_WINDOW = 300 # Recent frames behind the throughput/latency readout
+PRODUCTION_STATS_REFRESH_MS = 500
+
+# --- Load Governor Configuration ---
+LOAD_GOVERNOR_ENABLED = True # Production: step frame rate / resolution down under sustained overload
+# Steps as (share of CAMERA_FPS, share of CAMERA_RESOLUTION_*) fed to the pipeline; the first is full quality
+LOAD_GOVERNOR_LEVELS = [(1.0, 1.0), (0.75, 1.0), (0.5, 1.0), (0.5, 0.75), (0.5, 0.5), (0.25, 0.5)]
+LOAD_GOVERNOR_INTERVAL_S = 0.5 # How often load is measured
+LOAD_GOVERNOR_TARGET_LATENCY_MS = 80 # p95 end-to-end latency above this counts as overload
+LOAD_GOVERNOR_MAX_DROP_RATE = 0.05 # Share of frames dropped above which the pipeline counts as overloaded
+LOAD_GOVERNOR_MAX_QUEUE_FILL = 0.75 # Fullest stage queue at or above which the pipeline counts as overloaded
+LOAD_GOVERNOR_RECOVER_BELOW = 0.6 # Headroom: no drops and p95 latency under this share of the target
+LOAD_GOVERNOR_STEP_DOWN_AFTER_S = 2.0 # Sustained overload before stepping down one level
+LOAD_GOVERNOR_STEP_UP_AFTER_S = 10.0 # Sustained headroom before stepping back up one level
+
+# --- Test Mode Benchmark Configuration ---
+BENCHMARK_REGRESSION_TOLERANCE_PERCENT = 10 # Slowdown between runs reported as a regression
+
+# --- Asset Cache Configuration ---
+ASSET_PIXMAP_CACHE_KB = 10240 # In-memory budget (QPixmapCache) for decoded, scaled images
+ASSET_DISK_CACHE_ENABLED = True # Keep scaled variants under ASSET_DISK_CACHE_PATH between launches
+
+# --- Startup Configuration ---
+SPLASH_MIN_DISPLAY_MS = 1200 # Splash stays up at least this long, even when warm-up finishes sooner
+STARTUP_WARMUP_TIMEOUT_S = 30 # Open the main window anyway once warm-up has run this long
+STARTUP_WARMUP_SKIP = () # Warm-up tasks to leave out: "disk", "catalog", "model", "camera"
+STARTUP_MIN_FREE_DISK_GB = 5 # Warn at startup below this much free space for image logs
@@ -0,0 +1,158 @@
+"""Run data collection or production without Qt.
+
+Examples (from the repository root):
+    python headless.py --mode data-collection --source synthetic --duration 60 --output-dir /tmp/run
+    python headless.py --mode production --source replay --replay-session 20250101_120000 --duration 0
+
+Writes the same session journal, CSV logs, catalog rows and latency
+histograms as the GUI. With --output-dir every log path is placed under
+that directory instead of the configured one.
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+import config
+
+MODES = ("data-collection", "production")
+
+
+def redirect_output(output_dir):
+    # Points every path the session writes to under output_dir, keeping the logs/ layout.
+    output_dir = os.path.abspath(output_dir)
+    config.SESSION_LOGS_PATH = os.path.join(output_dir, "sessions")
+    config.IMAGE_LOGS_PATH = os.path.join(output_dir, "images")
+    config.DEPTH_LOGS_PATH = os.path.join(output_dir, "depth")
+    config.CATALOG_DB_PATH = os.path.join(output_dir, "catalog.sqlite3")
+    config.UPLOAD_SPOOL_PATH = os.path.join(output_dir, "upload_spool")
+    config.DB_OUTBOX_PATH = os.path.join(output_dir, "db_outbox")
+    config.DEDUP_INDEX_PATH = os.path.join(output_dir, "dedup_index.npz")
+    config.BENCHMARK_RESULTS_PATH = os.path.join(output_dir, "benchmarks")
+    config.ASSET_DISK_CACHE_PATH = os.path.join(output_dir, "asset_cache")
+    config.STARTUP_PROFILE_PATH = os.path.join(output_dir, "startup")
+
+
+def create_source(args, image_dir, session_log_dir, depth_dir):
+    # Imported here so the frame source modules load only after config is final.
+    from app.src.utils.frame_sources import create_frame_source
+    if args.source == "replay":
+        return create_frame_source("replay", session_id=args.replay_session, realtime=not args.asap,
+                                   image_dir=image_dir, session_log_dir=session_log_dir, depth_dir=depth_dir)
+    return create_frame_source(args.source)
+
+
+def run_until(deadline, ring_buffer, finished, stop_event, report):
+    # Waits for the duration (0 runs until the source ends or Ctrl+C), reporting
+    # progress. Meanwhile it takes the newest frame at the preview rate, standing
+    # in for the live feed so frame drop counts mean the same as in the GUI.
+    import numpy as np
+    preview_frame = np.empty(ring_buffer.frame_shape, dtype=np.uint8)
+    next_report = time.monotonic() + 5.0
+    while not stop_event.is_set() and not finished():
+        if deadline and time.monotonic() >= deadline:
+            return
+        stop_event.wait(config.PREVIEW_REFRESH_INTERVAL_MS / 1000.0)
+        ring_buffer.copy_latest_into(preview_frame)
+        if time.monotonic() >= next_report:
+            report()
+            next_report += 5.0
+
+
+def run_data_collection(args, source, stop_event):
+    from app.src.utils.collection_session import DataCollectionSession
+    from app.src.utils.tracing import format_readout, get_tracer
+
+    session = DataCollectionSession()
+    if not session.start(args.user.capitalize(), frame_source=source):
+        print(f"Failed to start camera: {session.camera_error}")
+        session.end()
+        return 1
+    if args.capture == "continuous":
+        session.capture_controller.arm_continuous(args.every_k)
+    elif args.capture == "burst":
+        session.capture_controller.arm_burst(args.burst_frames, args.burst_rate)
+
+    def report():
+        readout = format_readout(get_tracer().take_recent())
+        print(f"[{session.session_id}] images: {session.images_captured_count}, "
+              f"frames: {session.ring_buffer.frames_acquired}" + (f", latency p50/p99 ms: {readout}" if readout else ""))
+
+    deadline = time.monotonic() + args.duration if args.duration else None
+    run_until(deadline, session.ring_buffer, lambda: session.source_exhausted, stop_event, report)
+    session.end()
+    if session.classification_thread is not None:
+        print("Waiting for session classification to finish...")
+        session.classification_thread.join()
+    return 0
+
+
+def run_production(args, source, stop_event):
+    from app.src.utils.production_run import ProductionRun
+
+    run = ProductionRun()
+    try:
+        run.start(args.user.capitalize(), frame_source=source)
+    except Exception as e:
+        print(f"Failed to start camera: {e}")
+        return 1
+
+    def report():
+        stats = run.pipeline_stats()
+        print(f"[{run.run_id}] {stats['throughput_fps']:.1f} frames/s, decisions: {stats['frames_completed']}, "
+              f"dropped: {stats['frames_dropped']}, latency p50/p95: {stats['latency_p50_ms']:.1f}/{stats['latency_p95_ms']:.1f} ms")
+
+    deadline = time.monotonic() + args.duration if args.duration else None
+    run_until(deadline, run.ring_buffer, lambda: run.source_exhausted, stop_event, report)
+    run.stop()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=MODES, default="data-collection")
+    parser.add_argument("--source", default=config.CAMERA_SOURCE, help="Frame source: synthetic, replay or realsense")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds to run; 0 runs until the source ends or Ctrl+C")
+    parser.add_argument("--output-dir", help="Write all logs under this directory instead of the configured paths")
+    parser.add_argument("--storage", choices=("offline", "online"), help="Override DATA_STORAGE_FLAG")
+    parser.add_argument("--user", default=config.DEFAULT_USER_LEVEL, help="Permission level recorded with the session")
+    parser.add_argument("--capture", choices=("continuous", "burst", "none"), default="continuous",
+                        help="Data collection: how frames are captured")
+    parser.add_argument("--every-k", type=int, default=config.CONTINUOUS_DEFAULT_EVERY_K, help="Continuous capture: keep every k-th frame")
+    parser.add_argument("--burst-frames", type=int, default=config.BURST_DEFAULT_FRAMES)
+    parser.add_argument("--burst-rate", type=int, default=config.BURST_DEFAULT_RATE_HZ)
+    parser.add_argument("--replay-session", help="Replay source: recorded session id (default: most recent)")
+    parser.add_argument("--asap", action="store_true", help="Replay source: ignore recorded timing")
+    parser.add_argument("--depth", action="store_true", help="Save depth with each captured image (sources with depth)")
+    args = parser.parse_args(argv)
+
+    # Recordings are read from the configured logs even when output is redirected.
+    replay_image_dir, replay_log_dir, replay_depth_dir = config.IMAGE_LOGS_PATH, config.SESSION_LOGS_PATH, config.DEPTH_LOGS_PATH
+    if args.output_dir:
+        redirect_output(args.output_dir)
+    if args.storage:
+        config.DATA_STORAGE_FLAG = 1 if args.storage == "offline" else 0
+    config.CAMERA_SOURCE = args.source
+    if args.depth:
+        config.DEPTH_CAPTURE_ENABLED = True
+
+    from app.src.utils.session_journal import recover_unfinished_sessions
+    from app.src.utils.catalog import get_catalog
+    recovered_session_ids = recover_unfinished_sessions() # Sessions cut short by a crash or power loss
+    if recovered_session_ids:
+        get_catalog().import_csv_logs(session_ids=recovered_session_ids)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    source = create_source(args, replay_image_dir, replay_log_dir, replay_depth_dir)
+    if args.mode == "production":
+        return run_production(args, source, stop_event)
+    return run_data_collection(args, source, stop_event)
+
+
+if __name__ == "__main__":
+    sys.exit(main())